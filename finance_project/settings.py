@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "financial_data.middleware.InstrumentationMiddleware",
+    "financial_data.middleware.AdmissionControlMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,6 +54,41 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Per-stage timings (Server-Timing header) and Prometheus metrics served at /metrics
+INSTRUMENTATION_ENABLED = config('INSTRUMENTATION_ENABLED', default=True, cast=bool)
+
+# Threads each gunicorn worker serves requests on (read by gunicorn.conf.py as well)
+GUNICORN_THREADS = config('GUNICORN_THREADS', default=4, cast=int)
+
+# Per worker process, the concurrent and queued requests each expensive endpoint may have. Together,
+# gated requests (running or queued) may hold at most ADMISSION_THREAD_BUDGET threads, which must
+# leave at least one of GUNICORN_THREADS free for other endpoints; requests beyond that get a 429
+ADMISSION_CONTROL_ENABLED = config('ADMISSION_CONTROL_ENABLED', default=True, cast=bool)
+ADMISSION_QUEUE_TIMEOUT = config('ADMISSION_QUEUE_TIMEOUT', default=5.0, cast=float)
+ADMISSION_THREAD_BUDGET = config('ADMISSION_THREAD_BUDGET', default=max(GUNICORN_THREADS - 1, 1), cast=int)
+ADMISSION_LIMITS = {
+    'get_report': (config('ADMISSION_REPORT_CONCURRENCY', default=1, cast=int), 1),
+    'evaluate_model': (1, 1),
+    'run_robustness_test': (1, 1),
+    'predict_stock_prices': (2, 1),
+    'run_portfolio_backtest': (2, 1),
+    'screen_symbols': (2, 1),
+    'export_stock_data': (2, 0),
+}
+
+# Symbols whose price data gunicorn's preloading master caches before forking workers
+# (see gunicorn.conf.py); defaults to every symbol in the model store
+PRELOAD_SYMBOLS = config('PRELOAD_SYMBOLS', default='', cast=Csv())
+
+# Cached daily closes are packed buffers; each process also keeps an LRU of them bounded in bytes
+PRICE_CACHE_MAX_BYTES = config('PRICE_CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int)
+PRICE_CACHE_COMPRESS = config('PRICE_CACHE_COMPRESS', default=False, cast=bool)
+
+# After new bars are stored, the most requested results of each kind (backtest, prediction, report)
+# per updated symbol are recomputed by a pool of this many threads; 0 recomputes them inline
+PREWARM_WORKERS = config('PREWARM_WORKERS', default=2, cast=int)
+PREWARM_TOP_REQUESTS = config('PREWARM_TOP_REQUESTS', default=3, cast=int)
+
 ROOT_URLCONF = "finance_project.urls"
 
 TEMPLATES = [
@@ -84,9 +121,41 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
+        # Keep connections open across requests, checking them before reuse
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional read replica for price data reads on the backtest, report and predict paths
+if config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['financial_data.db_router.ReadReplicaRouter']
+
+# Shared by every gunicorn worker and management command when CACHE_LOCATION is set, so bars versions
+# bumped and results pre-warmed by fetch_stock_data reach the web workers. CACHE_BACKEND defaults to
+# Redis (e.g. CACHE_LOCATION=redis://localhost:6379/0) and can point at Memcached. Without a location
+# each process keeps its own in-memory cache, which only suits a single-process development server
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.redis.RedisCache'),
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
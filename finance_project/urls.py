@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
+from financial_data.views import metrics
 
 # A simple view for the root URL
 def home(request):
@@ -25,6 +26,7 @@ def home(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('financial_data/', include('financial_data.urls')),
+    path('metrics', metrics, name='metrics'),
     path('', home),
 ]
 
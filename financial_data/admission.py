@@ -0,0 +1,92 @@
+import math
+import threading
+import time
+
+from .instrumentation import Counter, Gauge, Histogram, register_metric
+
+ADMISSION_IN_FLIGHT = register_metric(
+    Gauge('financial_data_admission_in_flight', 'Admitted requests in progress by view.'))
+ADMISSION_QUEUED = register_metric(
+    Gauge('financial_data_admission_queued', 'Requests waiting for admission by view.'))
+ADMISSION_REJECTED = register_metric(
+    Counter('financial_data_admission_rejected_total', 'Requests rejected by admission control by view and reason.'))
+ADMISSION_WAIT = register_metric(
+    Histogram('financial_data_admission_wait_seconds', 'Time admitted requests spent queued by view.'))
+
+# Gate shared by all gated endpoints, bounding the threads their requests hold in total
+BUDGET_GATE = 'all_gated'
+
+# Weight of the latest request in the running average of service time used for Retry-After
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class AdmissionGate:
+    """
+    Admits at most `concurrency` requests to an endpoint at a time, with up to
+    `queue_size` more waiting; anything beyond that is turned away immediately.
+    """
+
+    def __init__(self, name, concurrency, queue_size):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.waiting = 0
+        self.service_time = 1.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout):
+        """Admission time (perf_counter) once admitted, or None when the queue is full or the wait times out."""
+        start = time.perf_counter()
+        with self._condition:
+            # Newcomers queue behind waiting requests instead of overtaking them
+            if self.in_flight < self.concurrency and not self.waiting:
+                return self._admit(start)
+            if self.waiting >= self.queue_size:
+                ADMISSION_REJECTED.inc(view=self.name, reason='queue_full')
+                return None
+
+            self.waiting += 1
+            ADMISSION_QUEUED.set(self.waiting, view=self.name)
+            try:
+                admitted = self._condition.wait_for(lambda: self.in_flight < self.concurrency, timeout)
+            finally:
+                self.waiting -= 1
+                ADMISSION_QUEUED.set(self.waiting, view=self.name)
+            if not admitted:
+                ADMISSION_REJECTED.inc(view=self.name, reason='timeout')
+                return None
+            return self._admit(start)
+
+    def _admit(self, start):
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight, view=self.name)
+        admitted = time.perf_counter()
+        ADMISSION_WAIT.observe(admitted - start, view=self.name)
+        return admitted
+
+    def release(self, admitted):
+        with self._condition:
+            self.in_flight -= 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight, view=self.name)
+            elapsed = time.perf_counter() - admitted
+            self.service_time += SERVICE_TIME_SMOOTHING * (elapsed - self.service_time)
+            self._condition.notify()
+
+    def retry_after(self):
+        """Seconds until the requests ahead of a new one are likely done, for the Retry-After header."""
+        with self._condition:
+            return max(1, math.ceil(self.service_time * (self.in_flight + self.waiting) / self.concurrency))
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def get_gate(name, concurrency, queue_size):
+    """The process-wide gate of an endpoint, shared by every middleware instance."""
+    with _gates_lock:
+        gate = _gates.get(name)
+        if gate is None or (gate.concurrency, gate.queue_size) != (concurrency, queue_size):
+            gate = _gates[name] = AdmissionGate(name, concurrency, queue_size)
+        return gate
@@ -1,106 +1,172 @@
 from django.core.exceptions import ValidationError
 from .models import StockData
 import pandas as pd
-from django.core.cache import cache
 import logging
+import numpy as np
 from decimal import Decimal
+from .instrumentation import span
+from .equity import DEFAULT_ROLLING_WINDOW, validate_curve_params, equity_curve_points
+from .strategies import IndicatorCache, MovingAverageStrategy
+from .execution import FRICTIONLESS
+from .price_cache import get_price_series, to_dates
+from .intraday import get_intraday_frame, parse_bar_size, validate_interval
 
 logger = logging.getLogger(__name__)
 
 def calculate_moving_average(data, window):
     return data['close_price'].rolling(window=window).mean()
 
-def validate_backtest_params(symbol, initial_investment, buy_ma_window, sell_ma_window):
+def validate_backtest_target(symbol, initial_investment):
     if not isinstance(symbol, str) or len(symbol) == 0:
         raise ValidationError("Symbol must be a non-empty string")
     if not isinstance(initial_investment, (int, float, Decimal)) or initial_investment <= 0:
         raise ValidationError("Initial investment must be a positive number")
+
+def validate_backtest_params(symbol, initial_investment, buy_ma_window, sell_ma_window):
+    validate_backtest_target(symbol, initial_investment)
     if not isinstance(buy_ma_window, int) or buy_ma_window <= 0:
         raise ValidationError("Buy MA window must be a positive integer")
     if not isinstance(sell_ma_window, int) or sell_ma_window <= 0:
         raise ValidationError("Sell MA window must be a positive integer")
 
 def get_stock_data(symbol):
-    cache_key = f'stock_data_{symbol}'
-    data = cache.get(cache_key)
-    if data is None:
-        data = StockData.objects.filter(symbol=symbol).order_by('date').values('date', 'close_price')
-        if not data:
-            raise ValidationError(f"No data available for symbol {symbol}")
-        cache.set(cache_key, list(data), timeout=3600)  # Cache for 1 hour
-    return pd.DataFrame(data)
-
-def backtest_strategy(symbol, initial_investment, buy_ma_window, sell_ma_window):
+    days, closes = get_price_series(symbol)
+    return pd.DataFrame({'date': to_dates(days), 'close_price': closes})
+
+def backtest_strategy(symbol, initial_investment, buy_ma_window=None, sell_ma_window=None,
+                      equity_curve=False, max_points=None, rolling_window=DEFAULT_ROLLING_WINDOW, strategy=None,
+                      execution=None, bar_size=None, interval=1):
+    """Backtest one strategy; without a strategy, the moving-average rule with the given windows."""
+    if strategy is None:
+        validate_backtest_params(symbol, initial_investment, buy_ma_window, sell_ma_window)
+        strategy = MovingAverageStrategy(buy_ma_window=buy_ma_window, sell_ma_window=sell_ma_window)
+    return backtest_strategies(symbol, initial_investment, [strategy], equity_curve, max_points, rolling_window,
+                               execution, bar_size, interval)[0]
+
+
+def backtest_strategies(symbol, initial_investment, strategies, equity_curve=False, max_points=None,
+                        rolling_window=DEFAULT_ROLLING_WINDOW, execution=None, bar_size=None, interval=1):
+    """
+    Backtest several strategies on one symbol, computing each indicator they need only once.
+
+    Daily StockData closes are used unless bar_size is given, in which case the
+    stored intraday bars of the given interval are resampled to that size.
+    """
     logger.info(f"Starting backtest for {symbol} with initial investment {initial_investment}")
-    validate_backtest_params(symbol, initial_investment, buy_ma_window, sell_ma_window)
-
-    df = get_stock_data(symbol)
-    df['close_price'] = df['close_price'].astype(float)  # Convert to float for calculations
-
-    if (df['close_price'] <= 0).any():
-        logger.warning(f"Zero or negative prices found for {symbol}. Removing these entries.")
-        df = df[df['close_price'] > 0]
-
-    df['buy_ma'] = calculate_moving_average(df, buy_ma_window)
-    df['sell_ma'] = calculate_moving_average(df, sell_ma_window)
+    validate_backtest_target(symbol, initial_investment)
+    if bar_size is not None:
+        validate_interval(interval)
+        parse_bar_size(bar_size)
+    if equity_curve:
+        validate_curve_params(max_points, rolling_window)
+
+    with span('price_fetch'):
+        df = get_stock_data(symbol) if bar_size is None else get_intraday_frame(symbol, bar_size, interval)
+
+    with span('backtest_compute'):
+        df['close_price'] = df['close_price'].astype(float)  # Convert to float for calculations
+
+        if (df['close_price'] <= 0).any():
+            logger.warning(f"Zero or negative prices found for {symbol}. Removing these entries.")
+            df = df[df['close_price'] > 0]
+
+        indicators = IndicatorCache(df['close_price'])
+        all_results = []
+        for strategy in strategies:
+            results, equity = _run_backtest(symbol, df, initial_investment, strategy, indicators,
+                                            execution or FRICTIONLESS)
+            if equity_curve:
+                results['equity_curve'] = equity_curve_points(equity.index, equity.values, rolling_window, max_points)
+            all_results.append(results)
+        return all_results
+
+
+def _run_backtest(symbol, df, initial_investment, strategy, indicators, execution=FRICTIONLESS):
+    """
+    Returns the backtest results and the daily portfolio value as a date-indexed Series.
+
+    Signals are evaluated for every row at once; only rows with a signal are
+    visited to settle trades, and the daily value is filled in between them.
+    """
+    close = df['close_price'].values
+    dates = df['date'].values
+    active = df.index.values >= strategy.warm_up
+    buy, sell = strategy.signals(close, indicators)
+    buy_signal = active & buy
+    sell_signal = active & sell
+    buy_prices, sell_prices = execution.fill_prices(close)
+    record_costs = not execution.frictionless
 
     cash = float(initial_investment)
     shares = 0
     trades = 0
-    max_drawdown = 0
-    peak_value = float(initial_investment)
     transaction_history = []
-
-    for i, row in df.iterrows():
-        if i < max(buy_ma_window, sell_ma_window):
-            continue
-
-        portfolio_value = cash + shares * row['close_price']
-
-        if portfolio_value > peak_value:
-            peak_value = portfolio_value
-        else:
-            drawdown = (peak_value - portfolio_value) / peak_value
-            max_drawdown = max(max_drawdown, drawdown)
-
-
-        if row['close_price'] < row['buy_ma'] and cash > 0:
-            shares_to_buy = cash // row['close_price']
+    cash_balance = np.full(len(df), np.nan)
+    holdings = np.full(len(df), np.nan)
+    if len(df):
+        cash_balance[0] = cash
+        holdings[0] = shares
+
+    for i in np.flatnonzero(buy_signal | sell_signal):
+        if buy_signal[i] and cash > 0:
+            price = buy_prices[i]
+            shares_to_buy = execution.buy_quantity(cash * execution.position_size, price)
             if shares_to_buy > 0:
-                cash -= shares_to_buy * row['close_price']
+                value = shares_to_buy * price
+                commission = execution.cost(value)
+                cash -= value + commission
                 shares += shares_to_buy
                 trades += 1
-                transaction_history.append({
-                    'date': row['date'].isoformat(),
+                transaction = {
+                    'date': dates[i].isoformat(),
                     'action': 'buy',
-                    'price': float(row['close_price']),
-                    'shares': int(shares_to_buy),
-                    'value': float(shares_to_buy * row['close_price'])
-                })
-
-
-        elif row['close_price'] > row['sell_ma'] and shares > 0:
-            sell_value = shares * row['close_price']
-            cash += sell_value
-            transaction_history.append({
-                'date': row['date'].isoformat(),
+                    'price': float(price),
+                    'shares': execution.quantity(shares_to_buy),
+                    'value': float(value)
+                }
+                if record_costs:
+                    transaction['commission'] = float(commission)
+                transaction_history.append(transaction)
+
+        elif sell_signal[i] and shares > 0:
+            price = sell_prices[i]
+            sell_value = shares * price
+            commission = execution.cost(sell_value)
+            cash += sell_value - commission
+            transaction = {
+                'date': dates[i].isoformat(),
                 'action': 'sell',
-                'price': float(row['close_price']),
-                'shares': int(shares),
+                'price': float(price),
+                'shares': execution.quantity(shares),
                 'value': float(sell_value)
-            })
+            }
+            if record_costs:
+                transaction['commission'] = float(commission)
+            transaction_history.append(transaction)
             shares = 0
             trades += 1
 
-    final_value = cash + shares * df.iloc[-1]['close_price']
+        cash_balance[i] = cash
+        holdings[i] = shares
+
+    # Positions only change on signal rows, so carry them forward to value every day
+    cash_balance = pd.Series(cash_balance).ffill().values
+    holdings = pd.Series(holdings).ffill().values
+    equity = pd.Series(cash_balance + holdings * close, index=dates)
+
+    # Drawdown of the post-trade value, which includes the costs paid on the day
+    values = np.concatenate(([float(initial_investment)], equity.values[active]))
+    max_drawdown = float((1.0 - values / np.maximum.accumulate(values)).max())
+
+    final_value = cash + shares * close[-1]
     total_return = (final_value - float(initial_investment)) / float(initial_investment)
 
     logger.info(f"Backtest completed for {symbol}. Total return: {total_return:.2%}")
 
     return {
         'total_return': float(total_return),
-        'max_drawdown': float(max_drawdown),
+        'max_drawdown': max_drawdown,
         'trades_executed': trades,
         'final_value': float(final_value),
         'transaction_history': transaction_history
-    }
\ No newline at end of file
+    }, equity
@@ -0,0 +1,170 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import MinMaxScaler
+
+from .models import StockData
+from .backtesting import backtest_strategy, get_stock_data
+from .ml_integration import StockPredictor
+from .report_generator import generate_report, generate_pdf_report
+
+FEATURES = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+TRADING_DAYS_PER_YEAR = 252
+# Benchmarks clear the cache between runs, so they get a private one instead of the shared default
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmarks'}}
+
+
+def synthetic_symbols(n_symbols):
+    return [f'SYN{i:04d}' for i in range(n_symbols)]
+
+
+def generate_ohlcv(symbol, years, seed=0, end_date=None):
+    """Geometric random walk OHLCV bars on business days ending at end_date."""
+    rng = np.random.default_rng([seed, sum(symbol.encode())])
+    end_date = end_date or timezone.now().date()
+    dates = pd.bdate_range(end=end_date, periods=max(int(years * TRADING_DAYS_PER_YEAR), 1)).date
+    n = len(dates)
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+    open_ = np.concatenate(([close[0]], close[:-1])) * (1 + rng.normal(0, 0.003, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, n)))
+    volume = rng.integers(100_000, 10_000_000, n)
+
+    return pd.DataFrame({
+        'date': dates,
+        'open_price': open_.round(2),
+        'high_price': high.round(2),
+        'low_price': low.round(2),
+        'close_price': close.round(2),
+        'volume': volume,
+    })
+
+
+def load_synthetic_data(n_symbols, years, seed=0, batch_size=5000):
+    symbols = synthetic_symbols(n_symbols)
+    for symbol in symbols:
+        df = generate_ohlcv(symbol, years, seed)
+        StockData.objects.bulk_create(
+            [StockData(symbol=symbol, **row) for row in df.to_dict('records')],
+            batch_size=batch_size
+        )
+    return symbols
+
+
+def fit_model(symbol):
+    """Fit the same model as train_ml_model without writing it to disk."""
+    df = pd.DataFrame(list(StockData.objects.filter(symbol=symbol).order_by('date').values(*FEATURES)))
+    scaler = MinMaxScaler()
+    model = LinearRegression().fit(scaler.fit_transform(df[FEATURES].astype(float)), df['close_price'].astype(float))
+    return model, scaler
+
+
+def time_call(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'mean': statistics.fmean(durations),
+        'max': max(durations),
+        'repeat': repeat,
+    }
+
+
+def import_views():
+    """Import the views in a fresh interpreter, the way a starting worker does."""
+    subprocess.run([sys.executable, '-c', 'import django; django.setup(); import financial_data.views'],
+                   check=True, cwd=settings.BASE_DIR)
+
+
+def _cold(func, symbol, model):
+    """Run func against an empty cache, apart from the in-memory model StockPredictor loads."""
+    def wrapper():
+        cache.clear()
+        cache.set(f'ml_model_{symbol}', model, timeout=None)
+        return func()
+    return wrapper
+
+
+@override_settings(CACHES=BENCHMARK_CACHES)
+def run_benchmarks(n_symbols=1, years=1, repeat=5, seed=0, buy_ma_window=20, sell_ma_window=50):
+    """Load synthetic data into the current database and time the hot paths on its first symbol."""
+    cache.clear()
+    load_start = time.perf_counter()
+    symbols = load_synthetic_data(n_symbols, years, seed)
+    load_seconds = time.perf_counter() - load_start
+
+    symbol = symbols[0]
+    rows_per_symbol = StockData.objects.filter(symbol=symbol).count()
+    model = fit_model(symbol)
+    cache.set(f'ml_model_{symbol}', model, timeout=None)
+    end_date = timezone.now().date()
+    start_date = end_date - timedelta(days=365 * years)
+    report_data, plot_buffer = generate_report(symbol, start_date, end_date, 10000, buy_ma_window, sell_ma_window)
+
+    client = Client()
+    backtest_body = json.dumps({
+        'symbol': symbol, 'initial_investment': 10000,
+        'buy_ma_window': buy_ma_window, 'sell_ma_window': sell_ma_window,
+    })
+    report_body = json.dumps({
+        'symbol': symbol, 'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(),
+        'initial_investment': 10000, 'buy_ma_window': buy_ma_window, 'sell_ma_window': sell_ma_window,
+        'format': 'pdf',
+    })
+
+    def post(name, body):
+        def call():
+            response = client.post(reverse(name), body, content_type='application/json')
+            if response.status_code != 200:
+                raise RuntimeError(f'{name} returned {response.status_code}: {response.content[:200]!r}')
+        return call
+
+    cases = {
+        'import_views': import_views,
+        'get_stock_data': _cold(lambda: get_stock_data(symbol), symbol, model),
+        'backtest_strategy': _cold(lambda: backtest_strategy(symbol, 10000, buy_ma_window, sell_ma_window), symbol, model),
+        'predict_next_30_days': _cold(lambda: StockPredictor(symbol).predict_next_30_days(), symbol, model),
+        'generate_report': _cold(
+            lambda: generate_report(symbol, start_date, end_date, 10000, buy_ma_window, sell_ma_window), symbol, model),
+        'generate_pdf_report': lambda: generate_pdf_report(report_data, plot_buffer),
+        'view_backtest': _cold(post('run_backtest', backtest_body), symbol, model),
+        'view_predict': _cold(post('predict_stock_prices', json.dumps({'symbol': symbol})), symbol, model),
+        'view_report': _cold(post('get_report', report_body), symbol, model),
+    }
+
+    return {
+        'config': {
+            'symbols': n_symbols, 'years': years, 'repeat': repeat, 'seed': seed,
+            'buy_ma_window': buy_ma_window, 'sell_ma_window': sell_ma_window,
+            'rows_per_symbol': rows_per_symbol,
+        },
+        'load_seconds': load_seconds,
+        'results': {name: time_call(func, repeat) for name, func in cases.items()},
+    }
+
+
+def check_thresholds(report, thresholds):
+    """Return (name, median, limit) for every benchmark whose median exceeds its threshold in seconds."""
+    failures = []
+    for name, limit in thresholds.items():
+        result = report['results'].get(name)
+        if result is not None and result['median'] > limit:
+            failures.append((name, result['median'], limit))
+    return failures
@@ -0,0 +1,22 @@
+import time
+
+from django.core.cache import cache
+
+
+def _fresh_version():
+    # Seeded from the clock so a version key evicted from the cache never repeats an old value
+    return time.time_ns() // 1000
+
+
+def bars_version(symbol):
+    """Current version of a symbol's price bars, for building cache keys of derived data."""
+    return cache.get_or_set(f'bars_version_{symbol}', _fresh_version, timeout=None)
+
+
+def bump_bars_version(symbol):
+    """Invalidate every cache entry keyed on the symbol's bars version."""
+    key = f'bars_version_{symbol}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
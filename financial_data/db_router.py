@@ -0,0 +1,48 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+
+# Market data models; every other model and every write stays on the primary
+REPLICA_MODELS = {'stockdata', 'intradaybarchunk'}
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """
+    Send market data reads made inside the block (or decorated view) to the replica.
+
+    A no-op when no replica database is configured.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or model._meta.model_name not in REPLICA_MODELS:
+            return None
+        if REPLICA_ALIAS not in settings.DATABASES:
+            return None
+        # Reads inside a write transaction must see its uncommitted rows
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
@@ -0,0 +1,173 @@
+import json
+from datetime import date, datetime
+
+import msgpack
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+
+JSON_CONTENT_TYPE = 'application/json'
+MSGPACK_CONTENT_TYPE = 'application/x-msgpack'
+
+MEDIA_TYPES = {
+    'application/json': 'json',
+    'application/x-msgpack': 'msgpack',
+    'application/msgpack': 'msgpack',
+    'application/vnd.msgpack': 'msgpack',
+}
+CONTENT_TYPES = {
+    'json': JSON_CONTENT_TYPE,
+    'msgpack': MSGPACK_CONTENT_TYPE,
+}
+
+# Columns are packed as raw little-endian arrays so clients can decode them with np.frombuffer
+EPOCH = date(1970, 1, 1)
+EPOCH_DATETIME = datetime(1970, 1, 1)
+ACTION_CODES = {'buy': 1, 'sell': -1}
+TRANSACTION_DTYPES = {
+    'date': '<i4',  # days since 1970-01-01
+    'action': '<i1',  # 1 = buy, -1 = sell
+    'price': '<f8',
+    'shares': '<i8',
+    'value': '<f8',
+}
+EQUITY_CURVE_DTYPES = {
+    'date': '<i4',
+    'equity': '<f8',
+    'drawdown': '<f8',
+    'rolling_volatility': '<f8',  # NaN until the rolling window fills
+    'rolling_sharpe': '<f8',
+}
+PREDICTION_DTYPES = {
+    'date': '<i4',
+    'predicted_price': '<f8',
+}
+
+
+def negotiate_format(request):
+    """Pick the best supported encoding from the Accept header, defaulting to JSON."""
+    best, best_q = 'json', 0.0
+    for media_range in request.headers.get('Accept', '').split(','):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        fmt = MEDIA_TYPES.get(media_type.lower())
+        if fmt is None:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def _epoch_day(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return (value - EPOCH).days
+
+
+def _epoch_second(value):
+    return int((datetime.fromisoformat(value) - EPOCH_DATETIME).total_seconds())
+
+
+def _date_column(rows, dtypes, converters):
+    # Intraday results carry timestamps, which are packed as seconds since 1970-01-01 instead
+    if rows and 'T' in rows[0]['date']:
+        dtypes['date'] = '<i8'
+        converters['date'] = _epoch_second
+
+
+def _pack_columns(rows, dtypes, converters):
+    columns = {}
+    for name, dtype in dtypes.items():
+        convert = converters.get(name, lambda v: v)
+        columns[name] = np.fromiter((convert(row[name]) for row in rows), dtype=dtype, count=len(rows)).tobytes()
+    return {'columns': columns, 'dtypes': dtypes}
+
+
+def transaction_columns(transactions):
+    dtypes = dict(TRANSACTION_DTYPES)
+    if any(isinstance(t['shares'], float) for t in transactions):
+        dtypes['shares'] = '<f8'  # fractional sizing
+    if transactions and 'commission' in transactions[0]:
+        dtypes['commission'] = '<f8'
+    converters = {
+        'date': _epoch_day,
+        'action': ACTION_CODES.__getitem__,
+    }
+    _date_column(transactions, dtypes, converters)
+    return _pack_columns(transactions, dtypes, converters)
+
+
+def _nan_if_none(value):
+    return float('nan') if value is None else value
+
+
+def equity_curve_columns(points):
+    dtypes = dict(EQUITY_CURVE_DTYPES)
+    converters = {
+        'date': _epoch_day,
+        'rolling_volatility': _nan_if_none,
+        'rolling_sharpe': _nan_if_none,
+    }
+    _date_column(points, dtypes, converters)
+    return _pack_columns(points, dtypes, converters)
+
+
+def prediction_columns(predictions):
+    dtypes = dict(PREDICTION_DTYPES)
+    # Monte Carlo forecasts also carry percentile bands (p5, p25, ...)
+    for key in (predictions[0] if predictions else {}):
+        if key not in dtypes:
+            dtypes[key] = '<f8'
+    return _pack_columns(predictions, dtypes, {'date': _epoch_day})
+
+
+def _backtest_columns(payload):
+    payload = dict(payload)
+    transactions = payload.pop('transaction_history', None)
+    if transactions is not None:
+        payload['transaction_history'] = transaction_columns(transactions)
+    if 'equity_curve' in payload:
+        payload['equity_curve'] = equity_curve_columns(payload['equity_curve'])
+    if 'strategies' in payload:
+        payload['strategies'] = [_backtest_columns(entry) for entry in payload['strategies']]
+    return payload
+
+
+def encode_backtest(payload, fmt):
+    if fmt == 'msgpack':
+        return msgpack.packb(_backtest_columns(payload))
+    return json.dumps(payload, cls=DjangoJSONEncoder).encode()
+
+
+def encode_predictions(symbol, predictions, fmt):
+    if fmt == 'msgpack':
+        return msgpack.packb({'symbol': symbol, 'predictions': prediction_columns(predictions)})
+    return json.dumps({
+        'symbol': symbol,
+        'predictions': [{**pred, 'date': pred['date'].isoformat()} for pred in predictions]
+    }, cls=DjangoJSONEncoder).encode()
+
+
+def encode_bars(symbol, bar_size, bars, fmt):
+    """Intraday bars as columns; MessagePack ships the structured array's fields as raw little-endian buffers."""
+    if fmt == 'msgpack':
+        return msgpack.packb({
+            'symbol': symbol,
+            'bar_size': bar_size,
+            'bars': {
+                'columns': {name: np.ascontiguousarray(bars[name]).tobytes() for name in bars.dtype.names},
+                'dtypes': {name: bars.dtype[name].str for name in bars.dtype.names},
+            },
+        })
+    columns = {name: bars[name].tolist() for name in bars.dtype.names if name != 'timestamp'}
+    timestamps = bars['timestamp'].astype('datetime64[s]').astype(str).tolist()
+    return json.dumps({
+        'symbol': symbol,
+        'bar_size': bar_size,
+        'bars': {'timestamp': timestamps, **columns},
+    }).encode()
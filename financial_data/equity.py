@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_ROLLING_WINDOW = 63
+
+
+def validate_curve_params(max_points, rolling_window):
+    if max_points is not None and (not isinstance(max_points, int) or max_points < 3):
+        raise ValidationError("Max points must be an integer of at least 3")
+    if not isinstance(rolling_window, int) or rolling_window < 2:
+        raise ValidationError("Rolling window must be an integer of at least 2")
+
+
+def lttb_indices(y, max_points):
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps when reducing y to max_points.
+
+    The first and last points are always kept; every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(y)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for b in range(max_points - 2):
+        start, end = edges[b], edges[b + 1]
+        next_start, next_end = end, edges[b + 2] if b + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[b + 1] = previous
+    return selected
+
+
+def rolling_metrics(equity, window=DEFAULT_ROLLING_WINDOW):
+    """Drawdown plus annualized rolling volatility and Sharpe ratio (zero risk-free rate) of an equity series."""
+    equity = np.asarray(equity, dtype=float)
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity)
+    returns = pd.Series(equity).pct_change()
+    rolling = returns.rolling(window)
+    mean, std = rolling.mean().values, rolling.std().values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan)
+    return drawdown, std * np.sqrt(TRADING_DAYS_PER_YEAR), sharpe
+
+
+def _optional(value):
+    return None if np.isnan(value) else float(value)
+
+
+def equity_curve_points(dates, equity, rolling_window=DEFAULT_ROLLING_WINDOW, max_points=None):
+    """The daily equity curve with its rolling metrics, downsampled to at most max_points rows."""
+    equity = np.asarray(equity, dtype=float)
+    drawdown, volatility, sharpe = rolling_metrics(equity, rolling_window)
+    return [
+        {
+            'date': dates[i].isoformat(),
+            'equity': float(equity[i]),
+            'drawdown': float(drawdown[i]),
+            'rolling_volatility': _optional(volatility[i]),
+            'rolling_sharpe': _optional(sharpe[i]),
+        }
+        for i in lttb_indices(equity, max_points)
+    ]
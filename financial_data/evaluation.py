@@ -0,0 +1,135 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+from .models import StockData
+from .instrumentation import span
+
+FEATURES = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+CLOSE = FEATURES.index('close_price')
+VOLUME = FEATURES.index('volume')
+
+# How predict_next_30_days turns a predicted price into the next feature row:
+# open = p, high = 1.01p, low = 0.99p, close = p, volume = last known volume
+NEXT_ROW_MULTIPLIERS = np.array([1.0, 1.01, 0.99, 1.0, 0.0])
+
+
+def validate_evaluation_params(train_window, horizon, step):
+    if not isinstance(train_window, int) or train_window < len(FEATURES) + 1:
+        raise ValidationError(f"Training window must be an integer of at least {len(FEATURES) + 1} bars")
+    if not isinstance(horizon, int) or horizon <= 0:
+        raise ValidationError("Horizon must be a positive integer")
+    if not isinstance(step, int) or step <= 0:
+        raise ValidationError("Step must be a positive integer")
+
+
+def load_feature_arrays(symbol):
+    rows = list(
+        StockData.objects.filter(symbol=symbol, close_price__gt=0)  # skip prediction placeholder rows
+        .order_by('date')
+        .values_list('date', *FEATURES)
+    )
+    if not rows:
+        raise ValidationError(f"No data available for symbol {symbol}")
+    dates = [row[0] for row in rows]
+    X = np.array([row[1:] for row in rows], dtype=float)
+    return dates, X
+
+
+def forecast_folds(X, ends, train_window, horizon):
+    """
+    Refit the linear model on X[end - train_window + 1:end + 1] for every fold end and
+    forecast `horizon` bars ahead the way StockPredictor does.
+
+    Each fold's normal equations come from a running sum of per-row outer products,
+    so fitting all folds costs one cumulative sum plus a batched pseudo-inverse.
+    Returns an (n_folds, horizon) array of predicted closes.
+    """
+    # Standardizing the columns (a linear reparametrization) keeps the Gram matrices well conditioned
+    mu = X.mean(axis=0)
+    sd = X.std(axis=0)
+    sd[sd == 0.0] = 1.0
+    Z = np.column_stack([np.ones(len(X)), (X - mu) / sd])
+    y = X[:, CLOSE]
+
+    gram = np.concatenate([np.zeros((1, Z.shape[1], Z.shape[1])), np.cumsum(Z[:, :, None] * Z[:, None, :], axis=0)])
+    moment = np.concatenate([np.zeros((1, Z.shape[1])), np.cumsum(Z * y[:, None], axis=0)])
+    gram = gram[ends + 1] - gram[ends + 1 - train_window]
+    moment = moment[ends + 1] - moment[ends + 1 - train_window]
+    beta = np.einsum('fij,fj->fi', np.linalg.pinv(gram, rcond=1e-10, hermitian=True), moment)
+
+    # With the next row a linear function of the predicted price, each step is p -> a * p + c
+    weights = beta[:, 1:] / sd
+    a = weights @ NEXT_ROW_MULTIPLIERS
+    c = beta[:, 0] - weights @ mu + weights[:, VOLUME] * X[ends, VOLUME]
+
+    predictions = np.empty((len(ends), horizon))
+    predictions[:, 0] = beta[:, 0] + np.einsum('fj,fj->f', weights, X[ends] - mu)
+    for k in range(1, horizon):
+        predictions[:, k] = a * predictions[:, k - 1] + c
+    return predictions
+
+
+def _chunk_task(X, ends, train_window, horizon):
+    """The rows a chunk of folds trains on, with its fold ends rebased onto them, so workers get no more."""
+    first = ends[0] - train_window + 1
+    return X[first:ends[-1] + 1], ends - first, train_window, horizon
+
+
+def _forecast_chunk(args):
+    return forecast_folds(*args)
+
+
+def walk_forward_evaluate(symbol, train_window=252, horizon=30, step=1, workers=1):
+    validate_evaluation_params(train_window, horizon, step)
+
+    with span('history_fetch'):
+        dates, X = load_feature_arrays(symbol)
+
+    if len(X) < train_window + horizon:
+        raise ValidationError(
+            f"Insufficient historical data for {symbol}: need at least {train_window + horizon} bars, have {len(X)}")
+
+    with span('evaluate'):
+        ends = np.arange(train_window - 1, len(X) - horizon, step)
+        if workers > 1 and len(ends) > workers:
+            context = multiprocessing.get_context('fork')
+            chunks = np.array_split(ends, workers)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                predictions = np.vstack(list(pool.map(
+                    _forecast_chunk, [_chunk_task(X, chunk, train_window, horizon) for chunk in chunks])))
+        else:
+            predictions = forecast_folds(X, ends, train_window, horizon)
+
+        actual = X[ends[:, None] + np.arange(1, horizon + 1), CLOSE]
+        last_close = X[ends, CLOSE][:, None]
+        errors = predictions - actual
+        direction_hits = np.sign(predictions - last_close) == np.sign(actual - last_close)
+
+    metrics = [
+        {
+            'step': k + 1,
+            'mae': float(np.abs(errors[:, k]).mean()),
+            'rmse': float(np.sqrt((errors[:, k] ** 2).mean())),
+            'directional_accuracy': float(direction_hits[:, k].mean()),
+        }
+        for k in range(horizon)
+    ]
+
+    return {
+        'symbol': symbol,
+        'train_window': train_window,
+        'horizon': horizon,
+        'step': step,
+        'folds': len(ends),
+        'first_fold_date': dates[ends[0]].isoformat(),
+        'last_fold_date': dates[ends[-1]].isoformat(),
+        'overall': {
+            'mae': float(np.abs(errors).mean()),
+            'rmse': float(np.sqrt((errors ** 2).mean())),
+            'directional_accuracy': float(direction_hits.mean()),
+        },
+        'metrics': metrics,
+    }
@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+SIZING_MODES = ('whole', 'fractional')
+
+
+class ExecutionModel:
+    """
+    Commission, slippage and position sizing applied when the backtest fills an order.
+
+    Slippage moves every fill against the trade (buys above the close, sells
+    below it) and is applied to whole price arrays up front; the commission is a
+    fixed amount plus a rate on the traded value. Buys spend `position_size` of
+    the available cash, in whole or fractional shares.
+    """
+
+    def __init__(self, commission=0.0, commission_rate=0.0, slippage_bps=0.0, sizing='whole', position_size=1.0):
+        self.commission = commission
+        self.commission_rate = commission_rate
+        self.slippage_bps = slippage_bps
+        self.sizing = sizing
+        self.position_size = position_size
+        self.validate()
+
+    def validate(self):
+        for name in ('commission', 'commission_rate', 'slippage_bps', 'position_size'):
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ValidationError(f"{name} must be a non-negative number")
+        if self.commission_rate >= 1:
+            raise ValidationError("commission_rate must be below 1")
+        if self.slippage_bps >= 10000:
+            raise ValidationError("slippage_bps must be below 10000")
+        if not 0 < self.position_size <= 1:
+            raise ValidationError("position_size must be greater than 0 and at most 1")
+        if self.sizing not in SIZING_MODES:
+            raise ValidationError(f"Sizing must be one of: {', '.join(SIZING_MODES)}")
+
+    @property
+    def frictionless(self):
+        return not (self.commission or self.commission_rate or self.slippage_bps)
+
+    def is_default(self):
+        return self.frictionless and self.sizing == 'whole' and self.position_size == 1
+
+    def fill_prices(self, close):
+        """Buy and sell fill prices for an array of closes."""
+        slippage = self.slippage_bps / 10000
+        return close * (1 + slippage), close * (1 - slippage)
+
+    def buy_quantity(self, budget, price):
+        """Shares `budget` buys at `price` once the commission is paid (0 if it buys nothing)."""
+        spendable = budget - self.commission
+        if spendable <= 0:
+            return 0
+        if self.sizing == 'whole':
+            return spendable // (price * (1 + self.commission_rate))
+        return spendable / (price * (1 + self.commission_rate))
+
+    def buy_quantities(self, budget, price):
+        """buy_quantity for arrays of budgets and prices."""
+        spendable = budget - self.commission
+        per_share = price * (1 + self.commission_rate)
+        quantity = spendable // per_share if self.sizing == 'whole' else spendable / per_share
+        return np.where(spendable > 0, quantity, 0.0)
+
+    def cost(self, value):
+        return self.commission + self.commission_rate * value
+
+    def quantity(self, shares):
+        return int(shares) if self.sizing == 'whole' else float(shares)
+
+    def spec(self):
+        return {
+            'commission': self.commission,
+            'commission_rate': self.commission_rate,
+            'slippage_bps': self.slippage_bps,
+            'sizing': self.sizing,
+            'position_size': self.position_size,
+        }
+
+    def cache_key(self):
+        return json.dumps(self.spec(), sort_keys=True, separators=(',', ':'))
+
+
+FRICTIONLESS = ExecutionModel()
+
+
+def parse_execution(data):
+    """The execution model described by a backtest request's cost and sizing fields."""
+    params = {}
+    for name in ('commission', 'commission_rate', 'slippage_bps', 'position_size'):
+        if data.get(name) is not None:
+            try:
+                params[name] = float(data[name])
+            except (TypeError, ValueError):
+                raise ValidationError(f"{name} must be a number")
+    if data.get('sizing') is not None:
+        params['sizing'] = data['sizing']
+    return ExecutionModel(**params)
@@ -0,0 +1,162 @@
+import csv
+import io
+import logging
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+
+from .models import StockData
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ['symbol', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+EXPORT_FORMATS = ('csv', 'arrow')
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+# Rows per server-side cursor fetch and per emitted chunk
+EXPORT_CHUNK_SIZE = 5000
+
+
+def validate_export_params(symbols, start_date, end_date, export_format):
+    if not isinstance(symbols, list) or not symbols or not all(isinstance(s, str) and s for s in symbols):
+        raise ValidationError("Symbols must be a non-empty list of symbols")
+    if start_date and end_date and start_date > end_date:
+        raise ValidationError("Start date must not be after end date")
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if export_format == 'arrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValidationError("Arrow export requires the pyarrow package")
+
+
+def export_queryset(symbols, start_date=None, end_date=None):
+    data = StockData.objects.filter(symbol__in=symbols, close_price__gt=0)  # skip prediction placeholder rows
+    if start_date:
+        data = data.filter(date__gte=start_date)
+    if end_date:
+        data = data.filter(date__lte=end_date)
+    return data.order_by('symbol', 'date').values_list(*EXPORT_COLUMNS)
+
+
+def iter_row_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    # iterator() reads through a server-side cursor on PostgreSQL, so only one chunk is held at a time
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _Drain:
+    """Write target for the Arrow stream writer whose output is collected between batches."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_arrow(chunks):
+    """An Arrow IPC stream with one record batch per chunk of rows."""
+    import pyarrow as pa
+
+    schema = pa.schema([
+        ('symbol', pa.string()),
+        ('date', pa.date32()),
+        ('open_price', pa.float64()),
+        ('high_price', pa.float64()),
+        ('low_price', pa.float64()),
+        ('close_price', pa.float64()),
+        ('volume', pa.int64()),
+    ])
+    sink = _Drain()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in chunks:
+        columns = list(zip(*chunk))
+        writer.write_batch(pa.record_batch(
+            [pa.array(columns[0], pa.string()), pa.array(columns[1], pa.date32())]
+            + [pa.array([float(value) for value in column], pa.float64()) for column in columns[2:6]]
+            + [pa.array(columns[6], pa.int64())],
+            schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+class ExportStats:
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'seconds': self.seconds,
+            'rows_per_second': self.rows / self.seconds if self.seconds else 0.0,
+            'bytes_per_second': self.bytes / self.seconds if self.seconds else 0.0,
+        }
+
+
+def export_prices(symbols, start_date=None, end_date=None, export_format='csv', chunk_size=EXPORT_CHUNK_SIZE,
+                  stats=None):
+    """Yield the encoded export in chunks, counting rows, bytes and elapsed time in `stats`."""
+    validate_export_params(symbols, start_date, end_date, export_format)
+    queryset = export_queryset(symbols, start_date, end_date)
+    # Pin the database chosen now; a streamed export is consumed after the view has returned
+    queryset = queryset.using(queryset.db)
+    stats = stats if stats is not None else ExportStats()
+
+    def counted(chunks):
+        for chunk in chunks:
+            stats.rows += len(chunk)
+            yield chunk
+
+    encode = iter_arrow if export_format == 'arrow' else iter_csv
+    return _measure(encode(counted(iter_row_chunks(queryset, chunk_size))), stats, symbols)
+
+
+def _measure(chunks, stats, symbols):
+    for chunk in chunks:
+        stats.bytes += len(chunk)
+        yield chunk
+    stats.seconds = time.perf_counter() - stats.started
+    summary = stats.as_dict()
+    logger.info(f"Exported {stats.rows} rows for {len(symbols)} symbols ({stats.bytes} bytes) in "
+                f"{stats.seconds:.2f}s: {summary['rows_per_second']:.0f} rows/s")
@@ -0,0 +1,186 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Metrics are kept per process; scrape every worker or aggregate them in Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+_current_timings = ContextVar('financial_data_request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.stages = {}
+        self.queries = 0
+
+    def add(self, name, duration):
+        self.stages[name] = self.stages.get(name, 0.0) + duration
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def server_timing(self, total):
+        entries = [f'{name};dur={duration * 1000:.1f}' for name, duration in self.stages.items()]
+        entries.append(f'db_queries;desc="{self.queries}"')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Counter:
+    metric_type = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(key)} {value}')
+        return lines
+
+
+class Gauge(Counter):
+    metric_type = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[2] if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ('+Inf',), bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket{_format_labels(key + (("le", bound),))} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+
+REQUEST_LATENCY = Histogram('financial_data_request_duration_seconds', 'Request latency by view.')
+STAGE_LATENCY = Histogram('financial_data_stage_duration_seconds', 'Time spent per request stage.')
+REQUEST_QUERIES = Histogram('financial_data_request_queries', 'Database queries per request.', QUERY_BUCKETS)
+REQUESTS = Counter('financial_data_requests_total', 'Requests by view and status code.')
+CACHE_REQUESTS = Counter('financial_data_cache_requests_total', 'Cache lookups by cache and result.')
+
+METRICS = [REQUEST_LATENCY, STAGE_LATENCY, REQUEST_QUERIES, REQUESTS, CACHE_REQUESTS]
+
+
+def register_metric(metric):
+    METRICS.append(metric)
+    return metric
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def collect_timings():
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Time a stage of the current request; a no-op outside of an instrumented request."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def record_cache(name, hit):
+    CACHE_REQUESTS.inc(cache=name, result='hit' if hit else 'miss')
+
+
+def record_request(view, status, duration, timings):
+    REQUEST_LATENCY.observe(duration, view=view)
+    REQUESTS.inc(view=view, status=status)
+    REQUEST_QUERIES.observe(timings.queries, view=view)
+    for stage, stage_duration in timings.stages.items():
+        STAGE_LATENCY.observe(stage_duration, view=view, stage=stage)
+
+
+def _cache_hit_ratios():
+    totals = {}
+    for key, value in list(CACHE_REQUESTS._values.items()):
+        labels = dict(key)
+        hits, lookups = totals.get(labels['cache'], (0, 0))
+        totals[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), lookups + value)
+    lines = [
+        '# HELP financial_data_cache_hit_ratio Fraction of cache lookups that were hits.',
+        '# TYPE financial_data_cache_hit_ratio gauge',
+    ]
+    for name, (hits, lookups) in sorted(totals.items()):
+        lines.append(f'financial_data_cache_hit_ratio{{cache="{name}"}} {hits / lookups:.6f}')
+    return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(_cache_hit_ratios())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,145 @@
+import re
+from datetime import date, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import IntradayBarChunk
+from .cache_utils import bump_bars_version
+
+# Timestamps are exchange wall-clock times (US/Eastern for Alpha Vantage) counted
+# as seconds since 1970-01-01 00:00, so day buckets line up with trading days
+BAR_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+    ('close', '<f4'),
+    ('volume', '<i8'),
+])
+EPOCH = date(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+INTERVALS = (1, 5, 15, 30, 60)
+BAR_SIZE_UNITS = {'min': 60, 'h': 3600, 'd': SECONDS_PER_DAY}
+BAR_SIZE_PATTERN = re.compile(r'^(\d+)(min|h|d)$')
+
+
+def intraday_version_key(symbol, interval):
+    """Key for the bars version of a symbol's intraday series (see cache_utils)."""
+    return f'{symbol}_intraday_{interval}'
+
+
+def parse_bar_size(bar_size):
+    """Bar length in seconds for sizes such as '5min', '1h' or '1d'."""
+    match = BAR_SIZE_PATTERN.match(bar_size) if isinstance(bar_size, str) else None
+    if match is None or int(match.group(1)) <= 0:
+        raise ValidationError("Bar size must look like '5min', '1h' or '1d'")
+    seconds = int(match.group(1)) * BAR_SIZE_UNITS[match.group(2)]
+    if seconds > SECONDS_PER_DAY or SECONDS_PER_DAY % seconds:
+        raise ValidationError("Bar size must divide a day evenly")
+    return seconds
+
+
+def validate_interval(interval):
+    if interval not in INTERVALS:
+        raise ValidationError(f"Interval must be one of: {', '.join(map(str, INTERVALS))} minutes")
+
+
+def to_timestamp(value):
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def to_datetimes(timestamps):
+    return pd.to_datetime(np.asarray(timestamps), unit='s').to_pydatetime()
+
+
+def make_bars(rows):
+    """Structured bar array from (datetime, open, high, low, close, volume) rows, sorted by time."""
+    bars = np.array([(to_timestamp(row[0]),) + tuple(row[1:]) for row in rows], dtype=BAR_DTYPE)
+    return np.sort(bars, order='timestamp')
+
+
+def _merge(existing, bars):
+    # Newly ingested bars replace stored bars with the same timestamp
+    merged = np.concatenate([bars, existing])
+    _, first = np.unique(merged['timestamp'], return_index=True)
+    return merged[first]
+
+
+def store_intraday_bars(symbol, interval, bars):
+    """Upsert bars as one packed chunk per symbol-day, merging with what is already stored."""
+    validate_interval(interval)
+    if len(bars) == 0:
+        return 0
+    days = bars['timestamp'] // SECONDS_PER_DAY
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    day_bars = {EPOCH + timedelta(days=int(days[start])): chunk
+                for start, chunk in zip(starts, np.split(bars, starts[1:]))}
+
+    with transaction.atomic():
+        existing = dict(IntradayBarChunk.objects.filter(
+            symbol=symbol, interval=interval, date__in=list(day_bars)).values_list('date', 'data'))
+        chunks = []
+        for day, chunk in day_bars.items():
+            if day in existing:
+                chunk = _merge(unpack_bars(existing[day]), chunk)
+            chunks.append(IntradayBarChunk(symbol=symbol, interval=interval, date=day,
+                                           bar_count=len(chunk), data=chunk.tobytes()))
+        IntradayBarChunk.objects.bulk_create(
+            chunks,
+            update_conflicts=True,
+            update_fields=['bar_count', 'data'],
+            unique_fields=['symbol', 'interval', 'date']
+        )
+    bump_bars_version(intraday_version_key(symbol, interval))
+    return len(chunks)
+
+
+def unpack_bars(data):
+    return np.frombuffer(bytes(data), dtype=BAR_DTYPE)
+
+
+def load_intraday_bars(symbol, interval=1, start_date=None, end_date=None):
+    """All stored bars in the date range as one structured array, read blob by blob without per-bar objects."""
+    validate_interval(interval)
+    chunks = IntradayBarChunk.objects.filter(symbol=symbol, interval=interval)
+    if start_date is not None:
+        chunks = chunks.filter(date__gte=start_date)
+    if end_date is not None:
+        chunks = chunks.filter(date__lte=end_date)
+    blobs = list(chunks.order_by('date').values_list('data', flat=True))
+    if not blobs:
+        raise ValidationError(f"No {interval}min intraday data available for symbol {symbol}")
+    return np.concatenate([unpack_bars(blob) for blob in blobs])
+
+
+def resample_bars(bars, bar_size, interval=1):
+    """Aggregate bars into bar_size buckets (open first, high max, low min, close last, volume summed)."""
+    seconds = parse_bar_size(bar_size)
+    if seconds < interval * 60 or seconds % (interval * 60):
+        raise ValidationError(f"Bar size must be a multiple of the {interval}min source bars")
+    if len(bars) == 0 or seconds == interval * 60:
+        return bars
+
+    buckets = bars['timestamp'] // seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+    resampled = np.empty(len(starts), dtype=BAR_DTYPE)
+    resampled['timestamp'] = buckets[starts] * seconds
+    resampled['open'] = bars['open'][starts]
+    resampled['high'] = np.maximum.reduceat(bars['high'], starts)
+    resampled['low'] = np.minimum.reduceat(bars['low'], starts)
+    resampled['close'] = bars['close'][ends]
+    resampled['volume'] = np.add.reduceat(bars['volume'], starts)
+    return resampled
+
+
+def get_intraday_frame(symbol, bar_size, interval=1, start_date=None, end_date=None):
+    """Resampled closes in the date/close_price frame the backtester works on."""
+    bars = resample_bars(load_intraday_bars(symbol, interval, start_date, end_date), bar_size, interval)
+    return pd.DataFrame({
+        'date': pd.Series(to_datetimes(bars['timestamp']), dtype=object),
+        'close_price': bars['close'].astype(float),
+    })
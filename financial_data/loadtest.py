@@ -0,0 +1,193 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+ENDPOINT_PATHS = {
+    'backtest': '/financial_data/backtest/',
+    'predict': '/financial_data/predict/',
+    'report': '/financial_data/report/',
+}
+
+DEFAULT_MIX = {
+    'endpoints': {'backtest': 0.6, 'predict': 0.3, 'report': 0.1},
+    'symbols': ['IBM'],
+    'ma_windows': [[5, 20], [10, 50], [20, 100]],
+    # Share of backtest requests that repeat a previously issued configuration
+    'cache_hit_ratio': 0.8,
+    'report_formats': {'json': 0.8, 'pdf': 0.2},
+    'initial_investment': 10000,
+    'report_days': 90,
+}
+
+
+def load_mix(path=None):
+    mix = dict(DEFAULT_MIX)
+    if path:
+        with open(path) as f:
+            mix.update(json.load(f))
+    return mix
+
+
+def _weighted_choice(rng, weights):
+    names = list(weights)
+    return rng.choices(names, weights=[weights[name] for name in names])[0]
+
+
+def build_requests(mix, count, seed=0, end_date=None):
+    """Generate a reproducible list of {'endpoint', 'path', 'body'} requests following the mix."""
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=mix['report_days'])
+    requests = []
+    miss_counter = 0
+
+    for _ in range(count):
+        endpoint = _weighted_choice(rng, mix['endpoints'])
+        symbol = rng.choice(mix['symbols'])
+        buy_ma, sell_ma = rng.choice(mix['ma_windows'])
+
+        if endpoint == 'backtest':
+            initial_investment = mix['initial_investment']
+            if rng.random() >= mix['cache_hit_ratio']:
+                # A distinct investment amount gives a distinct backtest cache key
+                miss_counter += 1
+                initial_investment += miss_counter
+            body = {
+                'symbol': symbol,
+                'initial_investment': initial_investment,
+                'buy_ma_window': buy_ma,
+                'sell_ma_window': sell_ma,
+            }
+        elif endpoint == 'predict':
+            body = {'symbol': symbol}
+        else:
+            body = {
+                'symbol': symbol,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'initial_investment': mix['initial_investment'],
+                'buy_ma_window': buy_ma,
+                'sell_ma_window': sell_ma,
+                'format': _weighted_choice(rng, mix['report_formats']),
+            }
+        requests.append({'endpoint': endpoint, 'path': ENDPOINT_PATHS[endpoint], 'body': body})
+    return requests
+
+
+def write_traffic(path, requests):
+    with open(path, 'w') as f:
+        for request in requests:
+            f.write(json.dumps(request) + '\n')
+
+
+def read_traffic(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class InProcessTransport:
+    """Sends requests through the Django test client, one client per thread."""
+
+    def __init__(self, host='localhost'):
+        self.host = host
+        self._local = threading.local()
+
+    def post(self, path, body):
+        from django.test import Client
+
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(SERVER_NAME=self.host)
+        response = client.post(path, json.dumps(body), content_type='application/json')
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response.status_code
+
+
+class HttpTransport:
+    """Sends requests to a running server, one connection pool per thread."""
+
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, path, body):
+        import requests
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.post(self.base_url + path, json=body, timeout=self.timeout)
+        return response.status_code
+
+
+def run_load(transport, requests, concurrency=4, rate=None):
+    """
+    Replay requests with the given concurrency, open-loop at `rate` requests per second if set.
+
+    With a rate, each latency runs from the request's scheduled send time rather than the actual one.
+    """
+    results = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def send(index, request):
+        if rate:
+            # Latency counts from the scheduled send time, so requests held back by a stalled
+            # server or a busy pool include their wait instead of hiding it (coordinated omission)
+            sent = start + index / rate
+            delay = sent - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            sent = time.perf_counter()
+        error = None
+        try:
+            status = transport.post(request['path'], request['body'])
+        except Exception as e:
+            status, error = None, str(e)
+        latency = time.perf_counter() - sent
+        with lock:
+            results.append({
+                'endpoint': request['endpoint'],
+                'status': status,
+                'latency': latency,
+                'offset': sent - start,
+                'error': error,
+            })
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, request in enumerate(requests):
+            executor.submit(send, index, request)
+
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    def stats(rows):
+        latencies = np.array([row['latency'] for row in rows])
+        errors = sum(1 for row in rows if row['status'] is None or row['status'] >= 400)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(rows) else (0.0, 0.0, 0.0)
+        return {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': errors / len(rows) if rows else 0.0,
+            'throughput': len(rows) / elapsed if elapsed else 0.0,
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+        }
+
+    endpoints = sorted({row['endpoint'] for row in results})
+    return {
+        'elapsed': elapsed,
+        'overall': stats(results),
+        'endpoints': {endpoint: stats([row for row in results if row['endpoint'] == endpoint])
+                      for endpoint in endpoints},
+    }
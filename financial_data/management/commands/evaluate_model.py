@@ -0,0 +1,42 @@
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from financial_data.evaluation import walk_forward_evaluate
+
+
+class Command(BaseCommand):
+    help = 'Walk-forward evaluation of the prediction model: refit on a sliding window and score each forecast step'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbol', type=str, help='Stock symbol to evaluate')
+        parser.add_argument('--train-window', type=int, default=252, help='Bars per training window (default: 252)')
+        parser.add_argument('--horizon', type=int, default=30, help='Forecast steps per fold (default: 30)')
+        parser.add_argument('--step', type=int, default=1, help='Bars between fold ends (default: 1)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes to spread folds over (default: 1, 0 for one per CPU)')
+        parser.add_argument('--output', type=str, help='Write the JSON results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or os.cpu_count()
+        try:
+            results = walk_forward_evaluate(
+                options['symbol'],
+                train_window=options['train_window'],
+                horizon=options['horizon'],
+                step=options['step'],
+                workers=workers,
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f"Evaluated {results['folds']} folds for {options['symbol']}; results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
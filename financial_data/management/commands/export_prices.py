@@ -0,0 +1,59 @@
+import json
+import sys
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from financial_data.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ExportStats, export_prices
+from financial_data.training import all_symbols
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date {value}; expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Stream stored daily bars for a set of symbols to CSV or Arrow, reporting throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', type=str, help='Stock symbols to export')
+        parser.add_argument('--all', action='store_true', help='Export every symbol with stored data')
+        parser.add_argument('--start', type=str, help='First date to export (YYYY-MM-DD)')
+        parser.add_argument('--end', type=str, help='Last date to export (YYYY-MM-DD)')
+        parser.add_argument('--format', type=str, default='csv', choices=EXPORT_FORMATS,
+                            help='Output format (default: csv)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help=f'Rows fetched from the database cursor at a time (default: {EXPORT_CHUNK_SIZE})')
+        parser.add_argument('--output', type=str, help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        symbols = [symbol.upper() for symbol in options['symbols']]
+        if options['all']:
+            symbols = all_symbols()
+        if not symbols:
+            raise CommandError('Specify at least one symbol or --all')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        start_date = _date(options['start']) if options['start'] else None
+        end_date = _date(options['end']) if options['end'] else None
+
+        stats = ExportStats()
+        try:
+            chunks = export_prices(symbols, start_date, end_date, options['format'], options['chunk_size'], stats)
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+
+        self.stderr.write(json.dumps(stats.as_dict()))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from financial_data.stock_data_fetcher import fetch_intraday_data
+from financial_data.intraday import INTERVALS
+
+
+class Command(BaseCommand):
+    help = 'Fetches intraday bars for a symbol and stores them as packed per-day chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbol', type=str, help='Stock symbol (e.g., IBM)')
+        parser.add_argument('--interval', type=int, default=1, choices=INTERVALS,
+                            help='Bar length in minutes (default: 1)')
+        parser.add_argument('--months', type=str, nargs='*', default=[],
+                            help='Months to fetch as YYYY-MM (default: the most recent bars)')
+
+    def handle(self, *args, **options):
+        symbol = options['symbol'].upper()
+        for month in options['months']:
+            if len(month) != 7 or month[4] != '-' or not (month[:4] + month[5:]).isdigit():
+                raise CommandError(f'Invalid month {month}; expected YYYY-MM')
+
+        for month in options['months'] or [None]:
+            label = month or 'recent bars'
+            self.stdout.write(f"Fetching {options['interval']}min data for {symbol} ({label})")
+            fetch_intraday_data(symbol, options['interval'], month)
+        self.stdout.write(self.style.SUCCESS('Intraday data fetching completed'))
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from financial_data.loadtest import (
+    load_mix, build_requests, write_traffic, read_traffic, run_load, summarize, InProcessTransport, HttpTransport
+)
+
+
+class Command(BaseCommand):
+    help = 'Drive the backtest, predict and report endpoints with a configurable request mix and report latencies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', type=str,
+                            help='Base URL of a running server (e.g., http://localhost:8000); runs in-process if omitted')
+        parser.add_argument('--mix', type=str, help='JSON file overriding the default request mix')
+        parser.add_argument('--requests', type=int, default=200, help='Number of requests to generate (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients (default: 4)')
+        parser.add_argument('--rate', type=float, help='Target requests per second (default: as fast as possible)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the request mix (default: 0)')
+        parser.add_argument('--record', type=str, help='Write the generated traffic to this JSONL file')
+        parser.add_argument('--replay', type=str, help='Replay traffic from a JSONL file instead of generating it')
+        parser.add_argument('--output', type=str, help='Write the JSON summary to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be positive')
+        if options['rate'] is not None and options['rate'] <= 0:
+            raise CommandError('--rate must be positive')
+
+        if options['replay']:
+            requests = read_traffic(options['replay'])
+        else:
+            requests = build_requests(load_mix(options['mix']), options['requests'], seed=options['seed'])
+
+        if options['record']:
+            write_traffic(options['record'], requests)
+            self.stdout.write(f"Recorded {len(requests)} requests to {options['record']}")
+
+        transport = HttpTransport(options['url']) if options['url'] else InProcessTransport()
+        target = options['url'] or 'in-process'
+        self.stderr.write(f"Sending {len(requests)} requests to {target} with concurrency {options['concurrency']}")
+
+        results, elapsed = run_load(transport, requests, options['concurrency'], options['rate'])
+        summary = summarize(results, elapsed)
+
+        output = json.dumps(summary, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Load test summary written to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,39 @@
+import glob
+import os
+
+import joblib
+from django.core.management.base import BaseCommand
+
+from financial_data.model_store import get_model_store, model_dir, pack_row
+
+
+class Command(BaseCommand):
+    help = 'Move per-symbol model and scaler pickles into the packed model store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Delete the pickles once they are packed')
+
+    def handle(self, *args, **options):
+        directory = model_dir()
+        updates = {}
+        packed_files = []
+        for model_path in sorted(glob.glob(os.path.join(directory, '*_model.pkl'))):
+            symbol = os.path.basename(model_path)[:-len('_model.pkl')]
+            scaler_path = os.path.join(directory, f'{symbol}_scaler.pkl')
+            if not os.path.exists(scaler_path):
+                self.stderr.write(self.style.ERROR(f'Missing scaler for {symbol}; skipping'))
+                continue
+            updates[symbol] = pack_row(joblib.load(model_path), joblib.load(scaler_path))
+            packed_files.extend([model_path, scaler_path])
+
+        if not updates:
+            self.stdout.write('No model pickles found')
+            return
+
+        get_model_store().write(updates)
+        self.stdout.write(self.style.SUCCESS(f'Packed {len(updates)} model(s) into {directory}'))
+
+        if options['delete']:
+            for path in packed_files:
+                os.remove(path)
+            self.stdout.write(f'Deleted {len(packed_files)} pickle file(s)')
@@ -0,0 +1,60 @@
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from financial_data.robustness import DEFAULT_BLOCK_SIZE, DEFAULT_RESAMPLES, RESAMPLE_METHODS, robustness_test
+from financial_data.strategies import parse_strategy
+
+
+class Command(BaseCommand):
+    help = 'Run a strategy over resampled versions of a symbol\'s price history and report the spread of outcomes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbol', type=str, help='Stock symbol to test')
+        parser.add_argument('--initial-investment', type=float, default=10000,
+                            help='Starting cash (default: 10000)')
+        parser.add_argument('--strategy', type=str, default='moving_average',
+                            help='Strategy name or JSON object with "name" and "params" (default: moving_average)')
+        parser.add_argument('--method', type=str, default='block', choices=RESAMPLE_METHODS,
+                            help='Resample daily returns in circular blocks or shuffle them (default: block)')
+        parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES,
+                            help=f'Number of resampled price paths (default: {DEFAULT_RESAMPLES})')
+        parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                            help=f'Bars per bootstrap block (default: {DEFAULT_BLOCK_SIZE})')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes to spread resample batches over (default: 1, 0 for one per CPU)')
+        parser.add_argument('--output', type=str, help='Write the JSON results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or os.cpu_count()
+        strategy = options['strategy']
+        if strategy.lstrip().startswith('{'):
+            try:
+                strategy = json.loads(strategy)
+            except json.JSONDecodeError:
+                raise CommandError('--strategy is not valid JSON')
+        try:
+            results = robustness_test(
+                options['symbol'].upper(),
+                options['initial_investment'],
+                parse_strategy(strategy),
+                method=options['method'],
+                resamples=options['resamples'],
+                block_size=options['block_size'],
+                seed=options['seed'],
+                workers=workers,
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f"Ran {results['resamples']} resamples for {results['symbol']}; results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
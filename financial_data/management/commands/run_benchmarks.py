@@ -0,0 +1,91 @@
+import json
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from financial_data.benchmarking import run_benchmarks, check_thresholds
+from financial_data.db_router import REPLICA_ALIAS
+
+
+@contextmanager
+def mirrored_replica():
+    """
+    Point the replica alias at the default connection's database while the block runs.
+
+    Routed reads in the view benchmarks then see the synthetic bars instead of the live replica.
+    """
+    if REPLICA_ALIAS not in settings.DATABASES:
+        yield
+        return
+    replica = connections[REPLICA_ALIAS]
+    old_settings = dict(replica.settings_dict)
+    replica.close()
+    replica.creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        replica.close()
+        replica.settings_dict.clear()
+        replica.settings_dict.update(old_settings)
+
+
+class Command(BaseCommand):
+    help = 'Time the backtest, prediction and report hot paths on synthetic data in a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=int, default=1, help='Number of synthetic symbols to load (default: 1)')
+        parser.add_argument('--years', type=float, default=2, help='Years of daily bars per symbol (default: 2)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark (default: 5)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data (default: 0)')
+        parser.add_argument('--buy-ma', type=int, default=20, help='Buy moving average window (default: 20)')
+        parser.add_argument('--sell-ma', type=int, default=50, help='Sell moving average window (default: 50)')
+        parser.add_argument('--output', type=str, help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--thresholds', type=str,
+                            help='JSON file mapping benchmark names to the maximum allowed median in seconds')
+
+    def handle(self, *args, **options):
+        if options['symbols'] < 1 or options['years'] <= 0 or options['repeat'] < 1:
+            raise CommandError('--symbols, --years and --repeat must be positive')
+
+        thresholds = {}
+        if options['thresholds']:
+            with open(options['thresholds']) as f:
+                thresholds = json.load(f)
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with mirrored_replica():
+                report = run_benchmarks(
+                    n_symbols=options['symbols'],
+                    years=options['years'],
+                    repeat=options['repeat'],
+                    seed=options['seed'],
+                    buy_ma_window=options['buy_ma'],
+                    sell_ma_window=options['sell_ma'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        failures = check_thresholds(report, thresholds)
+        report['threshold_failures'] = [
+            {'benchmark': name, 'median': median, 'threshold': limit} for name, median, limit in failures
+        ]
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if failures:
+            for name, median, limit in failures:
+                self.stderr.write(self.style.ERROR(f"{name}: median {median:.4f}s exceeds threshold {limit:.4f}s"))
+            raise CommandError(f'{len(failures)} benchmark(s) exceeded their thresholds')
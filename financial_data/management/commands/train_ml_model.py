@@ -1,173 +1,64 @@
-import joblib
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import MinMaxScaler
-from datetime import datetime, timedelta
-from django.conf import settings
-from django.core.cache import cache
-from django.core.management.base import BaseCommand
-from financial_data.models import StockData
-from django.db import transaction
-from django.core.exceptions import ValidationError
 import os
-import logging
 
-logger = logging.getLogger(__name__)
+from django.core.management.base import BaseCommand, CommandError
 
-
-class StockPredictor:
-    def __init__(self, symbol):
-        self.symbol = symbol
-        self.model = None
-        self.scaler = None
-        self._load_model()
-
-    def _load_model(self):
-        try:
-            model_path = os.path.join(settings.BASE_DIR, 'financial_data', 'ml_models', f'{self.symbol}_model.pkl')
-            scaler_path = os.path.join(settings.BASE_DIR, 'financial_data', 'ml_models', f'{self.symbol}_scaler.pkl')
-
-            cache_key = f'ml_model_{self.symbol}'
-            cached_model = cache.get(cache_key)
-
-            if cached_model:
-                self.model, self.scaler = cached_model
-            else:
-                self.model = joblib.load(model_path)
-                self.scaler = joblib.load(scaler_path)
-                cache.set(cache_key, (self.model, self.scaler), timeout=3600)
-
-        except FileNotFoundError:
-            raise ValidationError(f"No trained model available for symbol {self.symbol}")
-        except Exception as e:
-            logger.error(f"Error loading model for {self.symbol}: {str(e)}")
-            raise ValidationError(f"Error loading model: {str(e)}")
-
-    def _prepare_features(self, data):
-        features = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
-        X = data[features]
-        return pd.DataFrame(self.scaler.transform(X), columns=features)
-
-    def _get_historical_data(self, days=60):
-        cutoff_date = datetime.now().date() - timedelta(days=days)
-        data = StockData.objects.filter(
-            symbol=self.symbol,
-            date__gte=cutoff_date
-        ).order_by('-date')
-
-        if not data.exists():
-            raise ValidationError(f"Insufficient historical data for {self.symbol}")
-
-        return pd.DataFrame(list(data.values()))
-
-    @transaction.atomic
-    def predict_next_30_days(self):
-        try:
-            historical_data = self._get_historical_data()
-            if len(historical_data) < 30:
-                raise ValidationError(f"Insufficient historical data for {self.symbol}")
-
-            last_known_data = historical_data.iloc[0]
-            current_date = last_known_data['date']
-            predictions = []
-
-            current_features = self._prepare_features(pd.DataFrame([last_known_data]))
-
-            for i in range(30):
-                target_date = current_date + timedelta(days=i + 1)
-
-                predicted_price = self.model.predict(current_features)[0]
-
-                # Store prediction in database
-                stock_data, created = StockData.objects.update_or_create(
-                    symbol=self.symbol,
-                    date=target_date,
-                    defaults={
-                        'predicted_price': round(float(predicted_price), 2),
-                        'open_price': last_known_data['open_price'],
-                        'close_price': last_known_data['close_price'],
-                        'high_price': last_known_data['high_price'],
-                        'low_price': last_known_data['low_price'],
-                        'volume': last_known_data['volume']
-                    }
-                )
-
-                predictions.append({
-                    'date': target_date,
-                    'predicted_price': round(float(predicted_price), 2)
-                })
-
-                # Update features for next prediction
-                last_known_data = {
-                    'open_price': predicted_price,
-                    'high_price': predicted_price * 1.01,
-                    'low_price': predicted_price * 0.99,
-                    'close_price': predicted_price,
-                    'volume': last_known_data['volume']
-                }
-                current_features = self._prepare_features(pd.DataFrame([last_known_data]))
-
-            return predictions
-
-        except Exception as e:
-            logger.error(f"Error making predictions for {self.symbol}: {str(e)}")
-            raise ValidationError(f"Error making predictions: {str(e)}")
+from financial_data.training import TRAINING_CHUNK_SIZE, train_symbols, all_symbols
 
 
 class Command(BaseCommand):
     """
-    Django management command to train and save an ML model for a stock symbol.
+    Django management command to train and save ML models for one or more stock symbols.
     """
-    help = 'Train machine learning model for a specific stock symbol'
+    help = 'Train machine learning models for stock symbols'
 
     def add_arguments(self, parser):
         """
-        Add a command-line argument to specify the stock symbol.
+        Add command-line arguments for the symbols to train and how to train them.
         """
-        parser.add_argument('symbol', type=str, help='Stock symbol to train the model for')  # **NEW**
+        parser.add_argument('symbols', nargs='*', type=str, help='Stock symbols to train models for')
+        parser.add_argument('--all', action='store_true', help='Train every symbol with stored data')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes to train with (default: 1, 0 for one per CPU)')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Update existing models using only bars added since their last training; '
+                                 'a model whose earlier bars were corrected since is retrained from scratch')
+        parser.add_argument('--chunk-size', type=int, default=TRAINING_CHUNK_SIZE,
+                            help=f'Bars loaded into memory at a time (default: {TRAINING_CHUNK_SIZE})')
 
     def handle(self, *args, **kwargs):
         """
-        Main logic for training the model.
+        Main logic for training the models.
         """
-        symbol = kwargs['symbol']
-        self.stdout.write(f'Training model for symbol: {symbol}')
-
-        # Fetch data for training
-        data = StockData.objects.filter(symbol=symbol).order_by('date')
-        if not data.exists():
-            self.stderr.write(self.style.ERROR(f"No data available for symbol {symbol}"))
-            return
-
-        df = pd.DataFrame(list(data.values()))
-
-        # Features and target for ML
-        features = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
-        target = 'close_price'
-
-        try:
-            X = df[features]
-            y = df[target]
-
-            # Scale data
-            scaler = MinMaxScaler()
-            X_scaled = scaler.fit_transform(X)
-
-            # Train model
-            model = LinearRegression()
-            model.fit(X_scaled, y)
-
-            # Save the model and scaler
-            model_dir = os.path.join('financial_data', 'ml_models')
-            os.makedirs(model_dir, exist_ok=True)
-
-            model_path = os.path.join(model_dir, f'{symbol}_model.pkl')
-            scaler_path = os.path.join(model_dir, f'{symbol}_scaler.pkl')
-
-            joblib.dump(model, model_path)
-            joblib.dump(scaler, scaler_path)
+        symbols = kwargs['symbols']
+        if kwargs['all']:
+            symbols = all_symbols()
+        if not symbols:
+            raise CommandError('Specify at least one symbol or --all')
+
+        if kwargs['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        workers = kwargs['workers'] or os.cpu_count()
+        mode = 'Updating' if kwargs['incremental'] else 'Training'
+        self.stdout.write(f'{mode} models for {len(symbols)} symbol(s) with {workers} worker(s)')
+
+        results = train_symbols(symbols, incremental=kwargs['incremental'], workers=workers,
+                                chunk_size=kwargs['chunk_size'])
+
+        failed = 0
+        for result in results:
+            symbol = result['symbol']
+            if result['status'] == 'error':
+                failed += 1
+                self.stderr.write(self.style.ERROR(f"Error training model for {symbol}: {result['error']}"))
+            elif result['status'] == 'no_data':
+                failed += 1
+                self.stderr.write(self.style.ERROR(f"No data available for symbol {symbol}"))
+            elif result['status'] == 'up_to_date':
+                self.stdout.write(f'No new data for {symbol}; model is up to date')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Successfully {result['status']} model for {symbol} ({result['rows']} rows)"))
 
-            self.stdout.write(self.style.SUCCESS(f'Successfully trained and saved model for {symbol}'))
-        except Exception as e:
-            logger.error(f"Error during training for {symbol}: {str(e)}")
-            self.stderr.write(self.style.ERROR(f"Error training model for {symbol}: {str(e)}"))
+        if failed:
+            raise CommandError(f'{failed} of {len(results)} symbol(s) failed')
@@ -0,0 +1,106 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.http import JsonResponse
+
+from .admission import BUDGET_GATE, get_gate
+from .instrumentation import collect_timings, record_request
+
+
+class InstrumentationMiddleware:
+    """Collects per-stage timings and query counts, reported via Server-Timing and /metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'INSTRUMENTATION_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with collect_timings() as timings, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings.count_query))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        record_request(view, response.status_code, duration, timings)
+        response['Server-Timing'] = timings.server_timing(duration)
+        return response
+
+
+def _release(slots):
+    for gate, admitted in slots:
+        gate.release(admitted)
+
+
+def _release_after(content, slots):
+    try:
+        yield from content
+    finally:
+        _release(slots)
+
+
+class AdmissionControlMiddleware:
+    """
+    Caps concurrent requests per endpoint (ADMISSION_LIMITS, per worker process).
+
+    Requests over the cap wait in a short queue for up to ADMISSION_QUEUE_TIMEOUT
+    seconds; once the queue is full they get a 429 with Retry-After straight away.
+    Running and queued gated requests together hold at most ADMISSION_THREAD_BUDGET
+    threads, so expensive endpoints cannot take every thread from cheap ones.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'ADMISSION_CONTROL_ENABLED', True)
+        self.limits = getattr(settings, 'ADMISSION_LIMITS', {})
+        self.timeout = getattr(settings, 'ADMISSION_QUEUE_TIMEOUT', 5.0)
+        threads = getattr(settings, 'GUNICORN_THREADS', 1)
+        self.budget = getattr(settings, 'ADMISSION_THREAD_BUDGET', max(threads - 1, 1))
+        if self.enabled and threads > 1 and not 1 <= self.budget < threads:
+            raise ImproperlyConfigured(
+                f"ADMISSION_THREAD_BUDGET must be between 1 and GUNICORN_THREADS - 1 ({threads - 1})")
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        slots = getattr(request, 'admission_slots', None)
+        if slots:
+            if response.streaming:
+                # A streamed body is produced after the view returns; hold the slots until it is sent
+                response.streaming_content = _release_after(response.streaming_content, slots)
+            else:
+                _release(slots)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.enabled:
+            return None
+        name = request.resolver_match.url_name
+        if name not in self.limits:
+            return None
+
+        # Taken before queueing, since a queued request holds its thread too
+        budget = get_gate(BUDGET_GATE, self.budget, 0)
+        budget_admitted = budget.acquire(0)
+        if budget_admitted is None:
+            return self._reject(budget)
+
+        gate = get_gate(name, *self.limits[name])
+        admitted = gate.acquire(self.timeout)
+        if admitted is None:
+            budget.release(budget_admitted)
+            return self._reject(gate)
+        request.admission_slots = [(gate, admitted), (budget, budget_admitted)]
+        return None
+
+    def _reject(self, gate):
+        response = JsonResponse({'error': 'Too many concurrent requests for this endpoint, retry later'}, status=429)
+        response['Retry-After'] = str(gate.retry_after())
+        return response
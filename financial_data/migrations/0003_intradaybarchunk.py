@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 22:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial_data', '0002_stockdata_predicted_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntradayBarChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('interval', models.PositiveSmallIntegerField(help_text='Bar length in minutes')),
+                ('bar_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['symbol', 'interval', 'date'], name='financial_d_symbol_8ef9c4_idx')],
+                'unique_together': {('symbol', 'interval', 'date')},
+            },
+        ),
+    ]
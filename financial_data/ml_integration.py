@@ -1,4 +1,3 @@
-import joblib
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -9,28 +8,90 @@ import logging
 from .models import StockData
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from .instrumentation import span, record_cache
+from .model_store import get_model_store
+from .cache_utils import bars_version
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HORIZON = 30
+MAX_HORIZON = 365
+DEFAULT_LOOKBACK_DAYS = 60
+MIN_HISTORY_BARS = 30
+
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_PATHS = 1000
+# Cap on paths x horizon, the size of the simulated price array
+MAX_SIMULATED_VALUES = 5_000_000
+
+
+def validate_forecast_params(horizon, lookback_days):
+    if not isinstance(horizon, int) or not 1 <= horizon <= MAX_HORIZON:
+        raise ValidationError(f"Horizon must be an integer between 1 and {MAX_HORIZON}")
+    if not isinstance(lookback_days, int) or lookback_days <= 0:
+        raise ValidationError("Lookback days must be a positive integer")
+
+
+def validate_band_params(horizon, paths, seed):
+    if not isinstance(paths, int) or paths < 1:
+        raise ValidationError("Paths must be a positive integer")
+    if paths * horizon > MAX_SIMULATED_VALUES:
+        raise ValidationError(f"Paths times horizon must not exceed {MAX_SIMULATED_VALUES}")
+    if not isinstance(seed, int) or seed < 0:
+        raise ValidationError("Seed must be a non-negative integer")
+
+
+def save_predictions(symbol, predictions):
+    """Upsert forecast rows so later reports can plot them against actual prices."""
+    with transaction.atomic():
+        for prediction in predictions:
+            StockData.objects.update_or_create(
+                symbol=symbol,
+                date=prediction['date'],
+                defaults={
+                    'predicted_price': prediction['predicted_price'],
+                    'open_price': 0,  # placeholder
+                    'close_price': 0,  # placeholder
+                    'high_price': 0,  # placeholder
+                    'low_price': 0,  # placeholder
+                    'volume': 0  # placeholder
+                }
+            )
+
 
 class StockPredictor:
-    def __init__(self, symbol):
+    def __init__(self, symbol, persist=True):
         self.symbol = symbol
+        # With persist=False forecasts are computed in memory only and nothing is written
+        self.persist = persist
         self.model = None
         self.scaler = None
-        self._load_model()
+        with span('model_load'):
+            self._load_model()
 
     def _load_model(self):
+        packed = get_model_store().get_model(self.symbol)
+        if packed is not None:
+            self.model, self.scaler = packed
+            self.model_version = get_model_store().version(self.symbol)
+            return
+
+        self.model_version = 'pkl'
+
+        # Models trained before the packed store existed
         try:
             model_path = os.path.join(settings.BASE_DIR, 'financial_data', 'ml_models', f'{self.symbol}_model.pkl')
             scaler_path = os.path.join(settings.BASE_DIR, 'financial_data', 'ml_models', f'{self.symbol}_scaler.pkl')
 
             cache_key = f'ml_model_{self.symbol}'
             cached_model = cache.get(cache_key)
+            record_cache('ml_model', cached_model is not None)
 
             if cached_model:
                 self.model, self.scaler = cached_model
             else:
+                import joblib  # only needed for the legacy pickles
+
                 self.model = joblib.load(model_path)
                 self.scaler = joblib.load(scaler_path)
                 cache.set(cache_key, (self.model, self.scaler), timeout=3600)
@@ -50,7 +111,8 @@ class StockPredictor:
         cutoff_date = datetime.now().date() - timedelta(days=days)
         data = StockData.objects.filter(
             symbol=self.symbol,
-            date__gte=cutoff_date
+            date__gte=cutoff_date,
+            close_price__gt=0  # skip prediction placeholder rows
         ).order_by('-date')
 
         if not data.exists():
@@ -58,37 +120,49 @@ class StockPredictor:
 
         return pd.DataFrame(list(data.values()))
 
-    @transaction.atomic
-    def predict_next_30_days(self):
+    def _get_feature_matrix(self, days=60):
+        """
+        Scaled features of the bars in the lookback window, newest first.
+
+        Cached per symbol until new bars arrive or the model is retrained, so
+        forecasts for different horizons reuse the same prepared history.
+        """
+        cutoff_date = datetime.now().date() - timedelta(days=days)
+        cache_key = (f'features_{self.symbol}_{cutoff_date.isoformat()}'
+                     f'_{bars_version(self.symbol)}_{self.model_version}')
+        features = cache.get(cache_key)
+        record_cache('features', features is not None)
+
+        if features is None:
+            historical_data = self._get_historical_data(days)
+            features = {
+                'dates': list(historical_data['date']),
+                'volume': historical_data['volume'].astype(float).values,
+                'close': historical_data['close_price'].astype(float).values,
+                'scaled': self._prepare_features(historical_data),
+            }
+            cache.set(cache_key, features, timeout=3600)
+        return features
+
+    def predict(self, horizon=DEFAULT_HORIZON, lookback_days=DEFAULT_LOOKBACK_DAYS):
+        validate_forecast_params(horizon, lookback_days)
         try:
-            historical_data = self._get_historical_data()
-            if len(historical_data) < 30:
+            with span('history_fetch'):
+                features = self._get_feature_matrix(lookback_days)
+            if len(features['dates']) < MIN_HISTORY_BARS:
                 raise ValidationError(f"Insufficient historical data for {self.symbol}")
 
-            last_known_data = historical_data.iloc[0]
-            current_date = last_known_data['date']
+            current_date = features['dates'][0]
+            last_volume = features['volume'][0]
             predictions = []
 
-            current_features = self._prepare_features(pd.DataFrame([last_known_data]))
+            current_features = features['scaled'][:1].copy()
 
-            for i in range(30):
+            for i in range(horizon):
                 target_date = current_date + timedelta(days=i + 1)
 
-                predicted_price = self.model.predict(current_features)[0]
-
-                # Store prediction in database
-                stock_data, created = StockData.objects.update_or_create(
-                    symbol=self.symbol,
-                    date=target_date,
-                    defaults={
-                        'predicted_price': round(float(predicted_price), 2),
-                        'open_price': 0,  # placeholder
-                        'close_price': 0,  # placeholder
-                        'high_price': 0,  # placeholder
-                        'low_price': 0,  # placeholder
-                        'volume': 0  # placeholder
-                    }
-                )
+                with span('predict'):
+                    predicted_price = self.model.predict(current_features)[0]
 
                 predictions.append({
                     'date': target_date,
@@ -96,17 +170,92 @@ class StockPredictor:
                 })
 
                 # Update features for next prediction
-                current_features = np.roll(current_features, -1, axis=0)
-                current_features[-1] = self.scaler.transform([[
-                    predicted_price,  # Use as next open
-                    predicted_price * 1.01,  # Estimated high
-                    predicted_price * 0.99,  # Estimated low
-                    predicted_price,  # Use as next close
-                    last_known_data['volume']  # Use last known volume
-                ]])
+                with span('predict'):
+                    current_features = np.roll(current_features, -1, axis=0)
+                    current_features[-1] = self.scaler.transform([[
+                        predicted_price,  # Use as next open
+                        predicted_price * 1.01,  # Estimated high
+                        predicted_price * 0.99,  # Estimated low
+                        predicted_price,  # Use as next close
+                        last_volume  # Use last known volume
+                    ]])
+
+            if self.persist:
+                with span('prediction_write'):
+                    save_predictions(self.symbol, predictions)
 
             return predictions
 
         except Exception as e:
             logger.error(f"Error making predictions for {self.symbol}: {str(e)}")
-            raise ValidationError(f"Error making predictions: {str(e)}")
\ No newline at end of file
+            raise ValidationError(f"Error making predictions: {str(e)}")
+
+    def _step_coefficients(self, volume):
+        """
+        (a, c) such that one forecast step maps a predicted price p to a * p + c.
+
+        The next feature row is linear in p (see predict), and so are the scaler and model.
+        """
+        def step(price):
+            row = [[price, price * 1.01, price * 0.99, price, volume]]
+            return float(self.model.predict(self.scaler.transform(row))[0])
+
+        c = step(0.0)
+        return step(1.0) - c, c
+
+    def predict_bands(self, horizon=DEFAULT_HORIZON, lookback_days=DEFAULT_LOOKBACK_DAYS, paths=DEFAULT_PATHS, seed=0):
+        """
+        Point forecast plus Monte Carlo percentile bands from bootstrapped one-step residuals.
+
+        Every path follows p[k] = a * p[k - 1] + c + e[k], with the e[k] drawn from the
+        model's one-step errors over the lookback window. Unrolled, the paths x horizon
+        price array is the point forecast plus the residual draws times one lower
+        triangular matrix of powers of a, so all paths come from a single matrix product.
+        Bands are cached per model and bars version and never persisted.
+        """
+        validate_forecast_params(horizon, lookback_days)
+        validate_band_params(horizon, paths, seed)
+        cache_key = (f'forecast_bands_{self.symbol}_{horizon}_{lookback_days}_{paths}_{seed}'
+                     f'_{bars_version(self.symbol)}_{self.model_version}')
+        bands = cache.get(cache_key)
+        record_cache('forecast_bands', bands is not None)
+        if bands is not None:
+            return bands
+
+        with span('history_fetch'):
+            features = self._get_feature_matrix(lookback_days)
+        if len(features['dates']) < MIN_HISTORY_BARS:
+            raise ValidationError(f"Insufficient historical data for {self.symbol}")
+
+        with span('simulate'):
+            # Rows are newest first: row i + 1 forecasts the close of row i
+            residuals = features['close'][:-1] - self.model.predict(features['scaled'][1:])
+            a, c = self._step_coefficients(features['volume'][0])
+            first = float(self.model.predict(features['scaled'][:1])[0])
+
+            steps = np.arange(horizon)
+            powers = a ** steps
+            point = first * powers + c * np.concatenate(([0.0], np.cumsum(powers)[:-1]))
+            # propagation[j, k] = a ** (k - j): how the shock at step j carries into step k
+            lag = steps[None, :] - steps[:, None]
+            propagation = np.where(lag >= 0, a ** np.maximum(lag, 0), 0.0)
+
+            rng = np.random.default_rng(seed)
+            shocks = rng.choice(residuals, size=(paths, horizon))
+            simulated = point + shocks @ propagation
+            percentiles = np.percentile(simulated, BAND_PERCENTILES, axis=0)
+
+        current_date = features['dates'][0]
+        bands = [
+            {
+                'date': current_date + timedelta(days=k + 1),
+                'predicted_price': round(float(point[k]), 2),
+                **{f'p{q}': round(float(percentiles[i, k]), 2) for i, q in enumerate(BAND_PERCENTILES)},
+            }
+            for k in range(horizon)
+        ]
+        cache.set(cache_key, bands, timeout=3600)
+        return bands
+
+    def predict_next_30_days(self):
+        return self.predict(horizon=30)
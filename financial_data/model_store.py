@@ -0,0 +1,199 @@
+import fcntl
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+from django.conf import settings
+
+N_FEATURES = 5
+
+# Each symbol is one float64 row: the fitted model and scaler, followed by the
+# sufficient statistics train_ml_model --incremental refits from (n == 0 if unknown)
+FIELDS = [
+    ('coef', N_FEATURES),
+    ('intercept', 1),
+    ('scale', N_FEATURES),
+    ('min', N_FEATURES),
+    ('ztz', (N_FEATURES + 1) ** 2),
+    ('zty', N_FEATURES + 1),
+    ('n', 1),
+    ('data_min', N_FEATURES),
+    ('data_max', N_FEATURES),
+    ('last_date', 1),  # proleptic Gregorian ordinal of the last bar trained on
+]
+LAYOUT = {}
+_offset = 0
+for _name, _size in FIELDS:
+    LAYOUT[_name] = slice(_offset, _offset + _size)
+    _offset += _size
+ROW_WIDTH = _offset
+
+INDEX_FILE = 'models_index.json'
+# Held exclusively by a writer across its read-merge-replace of the index
+LOCK_FILE = 'models_index.lock'
+
+
+class PackedLinearModel:
+    """Row-backed stand-in for a fitted LinearRegression."""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+
+class PackedScaler:
+    """Row-backed stand-in for a fitted MinMaxScaler."""
+
+    def __init__(self, scale, min_):
+        self.scale_ = scale
+        self.min_ = min_
+
+    def transform(self, X):
+        return np.asarray(X, dtype=float) * self.scale_ + self.min_
+
+
+def pack_row(model, scaler):
+    """Pack a linear model and any per-feature affine scaler (MinMaxScaler, StandardScaler)."""
+    row = np.zeros(ROW_WIDTH)
+    offset = np.asarray(scaler.transform(np.zeros((1, N_FEATURES))), dtype=float)[0]
+    scale = np.asarray(scaler.transform(np.ones((1, N_FEATURES))), dtype=float)[0] - offset
+    row[LAYOUT['coef']] = model.coef_
+    row[LAYOUT['intercept']] = model.intercept_
+    row[LAYOUT['scale']] = scale
+    row[LAYOUT['min']] = offset
+    return row
+
+
+class ModelStore:
+    """
+    All per-symbol linear models in one memory-mapped array plus a JSON index.
+
+    Writes go to a new data file and then atomically replace the index, so
+    readers never see a half-written store and keep their existing mapping.
+    Writers in different processes take turns through a lock file, so each
+    merges its rows into the latest index instead of dropping another's.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.rows = np.empty((0, ROW_WIDTH))
+        self.symbols = {}
+        self.versions = {}
+        self.refresh()
+
+    def refresh(self):
+        while True:
+            try:
+                stat = os.stat(self.index_path)
+            except FileNotFoundError:
+                return
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+            if stamp == self._stamp:
+                return
+            with self._lock:
+                with open(self.index_path) as f:
+                    stat = os.fstat(f.fileno())
+                    index = json.load(f)
+                try:
+                    rows = np.load(os.path.join(self.directory, index['data']), mmap_mode='r')
+                except FileNotFoundError:
+                    # A writer replaced the index and removed its data file since it was read
+                    continue
+                self.rows = rows
+                self.symbols = index['symbols']
+                self.versions = index['versions']
+                self._stamp = (stat.st_ino, stat.st_mtime_ns)
+                return
+
+    def __contains__(self, symbol):
+        return symbol in self.symbols
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def row(self, symbol):
+        position = self.symbols.get(symbol)
+        return None if position is None else self.rows[position]
+
+    def version(self, symbol):
+        return self.versions.get(symbol)
+
+    def get_model(self, symbol):
+        row = self.row(symbol)
+        if row is None:
+            return None
+        return (PackedLinearModel(np.array(row[LAYOUT['coef']]), float(row[LAYOUT['intercept']][0])),
+                PackedScaler(np.array(row[LAYOUT['scale']]), np.array(row[LAYOUT['min']])))
+
+    def write(self, updates):
+        """Insert or replace rows for the given {symbol: row} mapping."""
+        if not updates:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Re-read under the lock: another process may have replaced the index since
+            self.refresh()
+            with self._lock:
+                symbols = dict(self.symbols)
+                versions = dict(self.versions)
+                rows = np.array(self.rows)
+                added = []
+                for symbol, row in updates.items():
+                    if symbol in symbols:
+                        rows[symbols[symbol]] = row
+                    else:
+                        symbols[symbol] = len(rows) + len(added)
+                        added.append(row)
+                    versions[symbol] = versions.get(symbol, 0) + 1
+                rows = np.vstack([rows] + added)
+
+                old_data = None
+                if os.path.exists(self.index_path):
+                    with open(self.index_path) as f:
+                        old_data = json.load(f)['data']
+
+                data_name = f'models-{uuid.uuid4().hex[:12]}.npy'
+                np.save(os.path.join(self.directory, data_name), rows)
+                tmp_index = self.index_path + '.tmp'
+                with open(tmp_index, 'w') as f:
+                    json.dump({'data': data_name, 'width': ROW_WIDTH, 'symbols': symbols, 'versions': versions}, f)
+                os.replace(tmp_index, self.index_path)
+
+                # Open mappings of the previous file stay valid after unlinking
+                if old_data and old_data != data_name:
+                    try:
+                        os.remove(os.path.join(self.directory, old_data))
+                    except FileNotFoundError:
+                        pass
+            self.refresh()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def model_dir():
+    return os.path.join(settings.BASE_DIR, 'financial_data', 'ml_models')
+
+
+def get_model_store():
+    directory = model_dir()
+    store = _stores.get(directory)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(directory)
+            if store is None:
+                store = _stores[directory] = ModelStore(directory)
+    else:
+        store.refresh()
+    return store
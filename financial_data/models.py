@@ -19,3 +19,27 @@ class StockData(models.Model):
 
     def __str__(self):
         return f"{self.symbol} - {self.date}"
+
+
+class IntradayBarChunk(models.Model):
+    """
+    One symbol-day of intraday bars packed into a single blob.
+
+    `data` holds the bars as a little-endian structured array (see
+    financial_data.intraday.BAR_DTYPE), so a day of minute bars is one row
+    instead of ~400.
+    """
+    symbol = models.CharField(max_length=10)
+    date = models.DateField()
+    interval = models.PositiveSmallIntegerField(help_text="Bar length in minutes")
+    bar_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = ('symbol', 'interval', 'date')
+        indexes = [
+            models.Index(fields=['symbol', 'interval', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} - {self.date} ({self.interval}min)"
@@ -0,0 +1,183 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+
+from .models import StockData
+from .backtesting import validate_backtest_params, validate_backtest_target
+from .instrumentation import span
+from .equity import DEFAULT_ROLLING_WINDOW, validate_curve_params, equity_curve_points
+from .strategies import IndicatorCache, MovingAverageStrategy
+from .execution import FRICTIONLESS
+
+logger = logging.getLogger(__name__)
+
+MAX_PORTFOLIO_SYMBOLS = 100
+
+
+def validate_portfolio_params(symbols, initial_investment):
+    if not isinstance(symbols, list) or not symbols:
+        raise ValidationError("Symbols must be a non-empty list")
+    if len(symbols) > MAX_PORTFOLIO_SYMBOLS:
+        raise ValidationError(f"A portfolio can hold at most {MAX_PORTFOLIO_SYMBOLS} symbols")
+    if len(set(symbols)) != len(symbols):
+        raise ValidationError("Symbols must be unique")
+    for symbol in symbols:
+        validate_backtest_target(symbol, initial_investment)
+
+
+def get_price_matrix(symbols):
+    """Close prices of all symbols in one query, aligned into a date x symbol frame (NaN where a symbol has no bar)."""
+    rows = list(
+        StockData.objects.filter(symbol__in=symbols, close_price__gt=0)  # skip prediction placeholder rows
+        .order_by('date')
+        .values_list('date', 'symbol', 'close_price')
+    )
+    if not rows:
+        raise ValidationError(f"No data available for symbols {', '.join(symbols)}")
+    prices = pd.DataFrame(rows, columns=['date', 'symbol', 'close_price']).pivot(
+        index='date', columns='symbol', values='close_price').astype(float)
+    missing = [symbol for symbol in symbols if symbol not in prices.columns]
+    if missing:
+        raise ValidationError(f"No data available for symbols {', '.join(missing)}")
+    return prices[symbols]
+
+
+def portfolio_backtest(symbols, initial_investment, buy_ma_window=None, sell_ma_window=None,
+                       max_points=None, rolling_window=DEFAULT_ROLLING_WINDOW, strategy=None, execution=None):
+    logger.info(f"Starting portfolio backtest for {len(symbols)} symbols with initial investment {initial_investment}")
+    validate_portfolio_params(symbols, initial_investment)
+    if strategy is None:
+        validate_backtest_params(symbols[0], initial_investment, buy_ma_window, sell_ma_window)
+        strategy = MovingAverageStrategy(buy_ma_window=buy_ma_window, sell_ma_window=sell_ma_window)
+    validate_curve_params(max_points, rolling_window)
+
+    with span('price_fetch'):
+        prices = get_price_matrix(symbols)
+
+    with span('backtest_compute'):
+        return _run_portfolio_backtest(prices, float(initial_investment), strategy, max_points, rolling_window,
+                                       execution or FRICTIONLESS)
+
+
+def _run_portfolio_backtest(prices, initial_investment, strategy, max_points=None,
+                            rolling_window=DEFAULT_ROLLING_WINDOW, execution=FRICTIONLESS):
+    """
+    Run a strategy on every column of a date x symbol price frame with one shared cash balance.
+
+    Signals for all symbols are evaluated as 2-D arrays. Only dates with a signal
+    are visited to settle trades: sells first, then the available cash is split
+    evenly across the symbols signalling a buy (position_size of it under the execution model).
+    """
+    dates = prices.index
+    symbols = list(prices.columns)
+    close = prices.values
+    buy, sell = strategy.signals(close, IndicatorCache(prices))
+
+    # NaN comparisons are False, so missing bars never signal; like backtest_strategy,
+    # nothing trades until the strategy's warm-up has passed
+    buy_signal = buy.copy()
+    sell_signal = sell & ~buy
+    buy_signal[:strategy.warm_up] = False
+    sell_signal[:strategy.warm_up] = False
+    buy_prices, sell_prices = execution.fill_prices(close)
+    record_costs = not execution.frictionless
+
+    n_dates, n_symbols = close.shape
+    holdings = np.full((n_dates, n_symbols), np.nan)
+    cash_balance = np.full(n_dates, np.nan)
+    holdings[0] = 0.0
+    cash_balance[0] = initial_investment
+
+    shares = np.zeros(n_symbols)
+    cash = initial_investment
+    invested = np.zeros(n_symbols)
+    realized = np.zeros(n_symbols)
+    trades = np.zeros(n_symbols, dtype=int)
+    transaction_history = []
+
+    for t in np.flatnonzero(buy_signal.any(axis=1) | sell_signal.any(axis=1)):
+        for k in np.flatnonzero(sell_signal[t] & (shares > 0)):
+            price = sell_prices[t, k]
+            value = shares[k] * price
+            commission = execution.cost(value)
+            cash += value - commission
+            realized[k] += value - commission - invested[k]
+            invested[k] = 0.0
+            trades[k] += 1
+            transaction = {
+                'date': dates[t].isoformat(),
+                'symbol': symbols[k],
+                'action': 'sell',
+                'price': float(price),
+                'shares': execution.quantity(shares[k]),
+                'value': float(value)
+            }
+            if record_costs:
+                transaction['commission'] = float(commission)
+            transaction_history.append(transaction)
+            shares[k] = 0
+
+        buying = np.flatnonzero(buy_signal[t])
+        if len(buying) and cash > 0:
+            allocation = cash * execution.position_size / len(buying)
+            for k in buying:
+                price = buy_prices[t, k]
+                shares_to_buy = execution.buy_quantity(allocation, price)
+                if shares_to_buy <= 0:
+                    continue
+                value = shares_to_buy * price
+                commission = execution.cost(value)
+                cash -= value + commission
+                invested[k] += value + commission
+                shares[k] += shares_to_buy
+                trades[k] += 1
+                transaction = {
+                    'date': dates[t].isoformat(),
+                    'symbol': symbols[k],
+                    'action': 'buy',
+                    'price': float(price),
+                    'shares': execution.quantity(shares_to_buy),
+                    'value': float(value)
+                }
+                if record_costs:
+                    transaction['commission'] = float(commission)
+                transaction_history.append(transaction)
+
+        holdings[t] = shares
+        cash_balance[t] = cash
+
+    # Carry positions and cash forward between trade dates, and value holdings at the last known price
+    holdings = pd.DataFrame(holdings).ffill().values
+    cash_balance = pd.Series(cash_balance).ffill().values
+    marked = prices.ffill().fillna(0.0).values
+    position_values = holdings * marked
+    equity = cash_balance + position_values.sum(axis=1)
+
+    final_value = float(equity[-1])
+    total_return = (final_value - initial_investment) / initial_investment
+    pnl = realized + position_values[-1] - invested
+
+    logger.info(f"Portfolio backtest completed for {len(symbols)} symbols. Total return: {total_return:.2%}")
+
+    return {
+        'total_return': float(total_return),
+        'max_drawdown': float((1.0 - equity / np.maximum.accumulate(equity)).max()),
+        'trades_executed': int(trades.sum()),
+        'final_value': final_value,
+        'cash': float(cash),
+        'contributions': [
+            {
+                'symbol': symbol,
+                'pnl': float(pnl[k]),
+                'contribution': float(pnl[k] / initial_investment),
+                'trades_executed': int(trades[k]),
+                'shares_held': execution.quantity(shares[k]),
+                'position_value': float(position_values[-1, k]),
+            }
+            for k, symbol in enumerate(symbols)
+        ],
+        'equity_curve': equity_curve_points(dates, equity, rolling_window, max_points),
+        'transaction_history': transaction_history
+    }
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+
+from .backtesting import backtest_strategy
+from .cache_utils import bars_version, bump_bars_version
+from .execution import ExecutionModel
+from .intraday import intraday_version_key
+from .ml_integration import StockPredictor
+from .model_store import get_model_store
+from .strategies import parse_strategy
+
+logger = logging.getLogger(__name__)
+
+RESULT_TIMEOUT = 3600
+# Request counters expire a week after a request is first seen; each symbol tracks its most frequent ones
+REQUEST_COUNTS_TIMEOUT = 7 * 24 * 3600
+MAX_TRACKED_REQUESTS = 50
+
+
+def backtest_cache_key(symbol, initial_investment, strategy_key, options):
+    """Cache key of backtest results, versioned by the bars they were computed from."""
+    key = f'backtest_{symbol}_{initial_investment}_{strategy_key}'
+    if not options['execution'].is_default():
+        key += f"_execution_{options['execution'].cache_key()}"
+    if options['equity_curve']:
+        key += f"_curve_{options['max_points']}_{options['rolling_window']}"
+    if options['bar_size'] is not None:
+        # Rolls over when new intraday bars are stored for the symbol
+        version = bars_version(intraday_version_key(symbol, options['interval']))
+        key += f"_bars_{options['bar_size']}_{options['interval']}_{version}"
+    else:
+        key += f'_{bars_version(symbol)}'
+    return key
+
+
+def model_version(symbol):
+    """The version StockPredictor reports for a symbol's model: the store's, or 'pkl' for a legacy pickle."""
+    version = get_model_store().version(symbol)
+    return 'pkl' if version is None else version
+
+
+def prediction_cache_key(symbol, horizon, lookback_days):
+    """Cache key of a forecast, versioned by the bars and the model it came from."""
+    return f'prediction_{symbol}_{horizon}_{lookback_days}_{bars_version(symbol)}_{model_version(symbol)}'
+
+
+def report_cache_key(symbol, start_date, end_date, initial_investment, buy_ma_window, sell_ma_window):
+    return (f'report_{symbol}_{start_date:%Y-%m-%d}_{end_date:%Y-%m-%d}_{initial_investment}_'
+            f'{buy_ma_window}_{sell_ma_window}_{bars_version(symbol)}_{model_version(symbol)}')
+
+
+def _request_count_key(symbol, entry):
+    return f"request_count_{symbol}_{hashlib.sha1(entry.encode()).hexdigest()}"
+
+
+def record_request(kind, symbol, params):
+    """
+    Count a cacheable request so pre-warming after an ingest can recompute the most frequent ones.
+
+    Each distinct request has its own counter, bumped with an atomic incr; the per-symbol index
+    of tracked requests is only rewritten when a new one is first seen.
+    """
+    entry = json.dumps([kind, params], sort_keys=True)
+    key = _request_count_key(symbol, entry)
+    try:
+        cache.incr(key)
+        return
+    except ValueError:
+        if not cache.add(key, 1, timeout=REQUEST_COUNTS_TIMEOUT):
+            # Another request created the counter first
+            cache.incr(key)
+            return
+
+    index_key = f'request_index_{symbol}'
+    index = cache.get(index_key) or {}
+    index[key] = entry
+    if len(index) > MAX_TRACKED_REQUESTS:
+        counts = cache.get_many(list(index))
+        ranked = sorted(index, key=lambda tracked: counts.get(tracked, 0), reverse=True)
+        # Dropped counters are deleted so the request is re-indexed if it comes back
+        cache.delete_many(ranked[MAX_TRACKED_REQUESTS:])
+        index = {tracked: index[tracked] for tracked in ranked[:MAX_TRACKED_REQUESTS]}
+    cache.set(index_key, index, timeout=REQUEST_COUNTS_TIMEOUT)
+
+
+def popular_requests(symbol, limit):
+    """The `limit` most frequent requests of each kind recorded for a symbol, as (kind, params)."""
+    index = cache.get(f'request_index_{symbol}') or {}
+    counts = cache.get_many(list(index))
+    popular, taken = [], {}
+    for key in sorted(counts, key=counts.get, reverse=True):
+        kind, params = json.loads(index[key])
+        if taken.get(kind, 0) < limit:
+            taken[kind] = taken.get(kind, 0) + 1
+            popular.append((kind, params))
+    return popular
+
+
+def warm_backtest(symbol, params):
+    options = {
+        'equity_curve': params['equity_curve'],
+        'max_points': params['max_points'],
+        'rolling_window': params['rolling_window'],
+        'execution': ExecutionModel(**params['execution']),
+        'bar_size': None,
+        'interval': 1,
+    }
+    if 'strategy' in params:
+        strategy = parse_strategy(params['strategy'])
+        strategy_key = strategy.cache_key()
+        results = backtest_strategy(symbol, params['initial_investment'], strategy=strategy, **options)
+    else:
+        buy_ma_window, sell_ma_window = params['windows']
+        strategy_key = f'{buy_ma_window}_{sell_ma_window}'
+        results = backtest_strategy(symbol, params['initial_investment'], buy_ma_window, sell_ma_window, **options)
+    cache.set(backtest_cache_key(symbol, params['initial_investment'], strategy_key, options), results,
+              timeout=RESULT_TIMEOUT)
+
+
+def warm_prediction(symbol, params):
+    # Computed without writing; the first persisting request stores the cached forecast
+    predictions = StockPredictor(symbol, persist=False).predict(params['horizon'], params['lookback_days'])
+    cache.set(prediction_cache_key(symbol, params['horizon'], params['lookback_days']), predictions,
+              timeout=RESULT_TIMEOUT)
+
+
+def warm_report(symbol, params):
+    from .report_generator import generate_report
+
+    start_date = datetime.strptime(params['start_date'], '%Y-%m-%d')
+    end_date = datetime.strptime(params['end_date'], '%Y-%m-%d')
+    windows = (params['initial_investment'], params['buy_ma_window'], params['sell_ma_window'])
+    report = generate_report(symbol, start_date, end_date, *windows)
+    cache.set(report_cache_key(symbol, start_date, end_date, *windows), report, timeout=RESULT_TIMEOUT)
+
+
+WARMERS = {
+    'backtest': warm_backtest,
+    'prediction': warm_prediction,
+    'report': warm_report,
+}
+
+
+def _warm(symbol, kind, params):
+    try:
+        WARMERS[kind](symbol, params)
+        logger.info(f"Pre-warmed {kind} cache for {symbol}")
+    except (ValidationError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Could not pre-warm {kind} for {symbol}: {e}")
+    except Exception:
+        logger.exception(f"Unexpected error pre-warming {kind} for {symbol}")
+
+
+def _warm_in_pool(symbol, kind, params):
+    try:
+        _warm(symbol, kind, params)
+    finally:
+        # Pool threads hold their own connections, which no request cycle closes
+        connections.close_all()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'PREWARM_WORKERS', 2), thread_name_prefix='prewarm')
+        return _executor
+
+
+def invalidate_symbols(symbols):
+    """Roll the bars version of each symbol, so every cache entry derived from its bars misses."""
+    for symbol in symbols:
+        bump_bars_version(symbol)
+    return []
+
+
+def prewarm_symbols(symbols):
+    """
+    Recompute each symbol's most requested backtests, forecasts and reports in the background.
+
+    Work goes to a pool of PREWARM_WORKERS threads; with PREWARM_WORKERS = 0 it runs inline.
+    Returns the futures of submitted tasks.
+    """
+    limit = getattr(settings, 'PREWARM_TOP_REQUESTS', 3)
+    tasks = [(symbol, kind, params) for symbol in symbols for kind, params in popular_requests(symbol, limit)
+             if kind in WARMERS]
+    if not getattr(settings, 'PREWARM_WORKERS', 2):
+        for task in tasks:
+            _warm(*task)
+        return []
+    executor = _get_executor()
+    return [executor.submit(_warm_in_pool, *task) for task in tasks]
+
+
+# Run in order after new bars are stored; each takes the updated symbols and returns any futures it started
+INGEST_HOOKS = [invalidate_symbols, prewarm_symbols]
+
+
+def register_ingest_hook(hook):
+    INGEST_HOOKS.append(hook)
+    return hook
+
+
+def bars_ingested(symbols):
+    """Run the post-ingest hooks for symbols whose daily bars were just stored."""
+    futures = []
+    for hook in INGEST_HOOKS:
+        try:
+            futures.extend(hook(symbols) or [])
+        except Exception:
+            logger.exception(f"Post-ingest hook {hook.__name__} failed for {', '.join(symbols)}")
+    return futures
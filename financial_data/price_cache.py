@@ -0,0 +1,123 @@
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+from .models import StockData
+from .instrumentation import record_cache
+from .cache_utils import bars_version
+
+PRICE_CACHE_TIMEOUT = 3600
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Buffer layout: flags and bar count, then the float64 closes and the int32 epoch days,
+# so both arrays start on an aligned offset and can be viewed in place
+HEADER = struct.Struct('<II')
+COMPRESSED = 1
+
+
+def pack_series(days, closes, compress=False):
+    body = np.asarray(closes, dtype='<f8').tobytes() + np.asarray(days, dtype='<i4').tobytes()
+    if compress:
+        return HEADER.pack(COMPRESSED, len(closes)) + zlib.compress(body)
+    return HEADER.pack(0, len(closes)) + body
+
+
+def unpack_series(buffer):
+    """(epoch days, closes) as read-only arrays viewing the buffer (or its decompressed body)."""
+    flags, n = HEADER.unpack_from(buffer)
+    if flags & COMPRESSED:
+        body, offset = zlib.decompress(memoryview(buffer)[HEADER.size:]), 0
+    else:
+        body, offset = buffer, HEADER.size
+    closes = np.frombuffer(body, dtype='<f8', count=n, offset=offset)
+    days = np.frombuffer(body, dtype='<i4', count=n, offset=offset + 8 * n)
+    return days, closes
+
+
+def to_dates(days):
+    """Object array of datetime.date for epoch days."""
+    return pd.to_datetime(np.asarray(days, dtype='int64'), unit='D').date
+
+
+class SeriesLRU:
+    """Process-local LRU of packed series buffers, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, buffer = entry
+            if expires < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return buffer
+
+    def set(self, key, buffer, timeout=PRICE_CACHE_TIMEOUT):
+        if len(buffer) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + timeout, buffer)
+            self.nbytes += len(buffer)
+            while self.nbytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= len(entry[1])
+
+
+local_series = SeriesLRU(getattr(settings, 'PRICE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+def get_price_series(symbol):
+    """
+    A symbol's daily bars as (epoch days int32, closes float64) read-only arrays.
+
+    Packed buffers are kept in this process's LRU and in the shared cache under the
+    symbol's bars version, so storing new bars invalidates them.
+    """
+    cache_key = f'stock_data_{symbol}_{bars_version(symbol)}'
+    buffer = local_series.get(cache_key)
+    if buffer is not None:
+        record_cache('stock_data', True)
+        return unpack_series(buffer)
+
+    buffer = cache.get(cache_key)
+    record_cache('stock_data', buffer is not None)
+    if buffer is None:
+        rows = list(StockData.objects.filter(symbol=symbol).order_by('date').values_list('date', 'close_price'))
+        if not rows:
+            raise ValidationError(f"No data available for symbol {symbol}")
+        days = np.fromiter((row[0].toordinal() - EPOCH_ORDINAL for row in rows), dtype=np.int32, count=len(rows))
+        closes = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        buffer = pack_series(days, closes, compress=getattr(settings, 'PRICE_CACHE_COMPRESS', False))
+        cache.set(cache_key, buffer, timeout=PRICE_CACHE_TIMEOUT)
+    local_series.set(cache_key, buffer)
+    return unpack_series(buffer)
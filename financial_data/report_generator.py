@@ -6,11 +6,12 @@ from reportlab.lib.styles import getSampleStyleSheet
 from .models import StockData
 from .backtesting import backtest_strategy
 from .ml_integration import StockPredictor
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+# Figures are built directly rather than through pyplot, whose global current-figure
+# state is not thread-safe; reports are rendered by request and pre-warm threads
+from matplotlib.figure import Figure
 from reportlab.lib.units import inch
 from PIL import Image as PILImage
+from .instrumentation import span
 
 
 def generate_report(symbol, start_date, end_date, initial_investment, buy_ma_window, sell_ma_window):
@@ -20,12 +21,13 @@ def generate_report(symbol, start_date, end_date, initial_investment, buy_ma_win
     if not stock_data.exists():
         raise ValueError(f"No stock data available for {symbol} between {start_date} and {end_date}")
 
+    with span('backtest'):
+        backtest_results = backtest_strategy(symbol, initial_investment, buy_ma_window, sell_ma_window)
 
-    backtest_results = backtest_strategy(symbol, initial_investment, buy_ma_window, sell_ma_window)
-
-
-    predictor = StockPredictor(symbol)
-    predictions = predictor.predict_next_30_days()
+    with span('forecast'):
+        # Reports only need the numbers, so the forecast is not written back to StockData
+        predictor = StockPredictor(symbol, persist=False)
+        predictions = predictor.predict_next_30_days()
 
     # Calculate key metrics
     final_value = backtest_results.get('final_value', initial_investment)
@@ -33,14 +35,39 @@ def generate_report(symbol, start_date, end_date, initial_investment, buy_ma_win
     roi = (total_return / initial_investment) * 100
 
 
-    fig, ax = plt.subplots(figsize=(10, 6))
+    with span('report_fetch'):
+        stock_data = list(stock_data)
+
+    with span('plot'):
+        buf = _plot_prices(symbol, stock_data, predictions)
+
+    report_data = {
+        'symbol': symbol,
+        'start_date': start_date,
+        'end_date': end_date,
+        'initial_investment': initial_investment,
+        'final_portfolio_value': final_value,
+        'total_return': total_return,
+        'roi': roi,
+        'predictions': predictions
+    }
+
+    return report_data, buf
+
+
+def _plot_prices(symbol, stock_data, predictions=()):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
 
     # Actual vs Predicted Prices
-    dates = [d.date for d in stock_data]
     actual_prices = [float(d.close_price) for d in stock_data if float(d.close_price) > 0]
     actual_dates = [d.date for d in stock_data if float(d.close_price) > 0]
-    predicted_prices = [float(d.predicted_price) for d in stock_data if d.predicted_price is not None]
-    predicted_dates = [d.date for d in stock_data if d.predicted_price is not None]
+
+    # Stored predictions in range, overlaid with the in-memory forecast
+    predicted = {d.date: float(d.predicted_price) for d in stock_data if d.predicted_price is not None}
+    predicted.update((p['date'], p['predicted_price']) for p in predictions)
+    predicted_dates = sorted(predicted)
+    predicted_prices = [predicted[d] for d in predicted_dates]
 
     if actual_prices:
         ax.plot(actual_dates, actual_prices, label='Actual')
@@ -54,26 +81,17 @@ def generate_report(symbol, start_date, end_date, initial_investment, buy_ma_win
 
 
     buf = io.BytesIO()
-    plt.savefig(buf, format='png')
+    fig.savefig(buf, format='png')
     buf.seek(0)
-    plt.close(fig)
+    return buf
 
 
-    report_data = {
-        'symbol': symbol,
-        'start_date': start_date,
-        'end_date': end_date,
-        'initial_investment': initial_investment,
-        'final_portfolio_value': final_value,
-        'total_return': total_return,
-        'roi': roi,
-        'predictions': predictions
-    }
-
-    return report_data, buf
+def generate_pdf_report(report_data, plot_buffer):
+    with span('pdf_build'):
+        return _build_pdf(report_data, plot_buffer)
 
 
-def generate_pdf_report(report_data, plot_buffer):
+def _build_pdf(report_data, plot_buffer):
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     styles = getSampleStyleSheet()
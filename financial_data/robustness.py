@@ -0,0 +1,183 @@
+import logging
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+
+from .backtesting import get_stock_data, validate_backtest_target
+from .instrumentation import span
+from .strategies import IndicatorCache
+from .execution import FRICTIONLESS
+
+logger = logging.getLogger(__name__)
+
+RESAMPLE_METHODS = ('block', 'shuffle')
+DEFAULT_RESAMPLES = 500
+MAX_RESAMPLES = 10000
+DEFAULT_BLOCK_SIZE = 20
+SUMMARY_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Resamples are generated and simulated in batches of this many columns, each
+# from its own seed, so results do not depend on how batches are spread over workers
+RESAMPLE_BATCH_SIZE = 250
+
+
+def validate_robustness_params(method, resamples, block_size, seed):
+    if method not in RESAMPLE_METHODS:
+        raise ValidationError(f"Method must be one of: {', '.join(RESAMPLE_METHODS)}")
+    if not isinstance(resamples, int) or not 1 <= resamples <= MAX_RESAMPLES:
+        raise ValidationError(f"Resamples must be an integer between 1 and {MAX_RESAMPLES}")
+    if not isinstance(block_size, int) or block_size < 1:
+        raise ValidationError("Block size must be a positive integer")
+    if not isinstance(seed, int) or seed < 0:
+        raise ValidationError("Seed must be a non-negative integer")
+
+
+def resample_prices(close, resamples, method='block', block_size=DEFAULT_BLOCK_SIZE, rng=None):
+    """
+    (len(close) x resamples) price paths starting at close[0], rebuilt from the
+    series' daily log returns reordered by a circular block bootstrap or a shuffle.
+    """
+    rng = rng or np.random.default_rng()
+    log_returns = np.diff(np.log(close))
+    m = len(log_returns)
+    if m == 0:
+        return np.tile(close[:, None], (1, resamples))
+    if method == 'shuffle':
+        order = rng.permuted(np.tile(np.arange(m), (resamples, 1)), axis=1)
+    else:
+        block_size = min(block_size, m)
+        starts = rng.integers(0, m, size=(resamples, math.ceil(m / block_size)))
+        order = ((starts[:, :, None] + np.arange(block_size)) % m).reshape(resamples, -1)[:, :m]
+    paths = np.cumsum(log_returns[order], axis=1)
+    return close[0] * np.exp(np.concatenate([np.zeros((resamples, 1)), paths], axis=1)).T
+
+
+def batched_backtest(close, initial_investment, strategy, execution=FRICTIONLESS):
+    """
+    backtest_strategy's trading rules run on every column of a (bars x paths) price array at once.
+
+    Returns per-path arrays of total return, max drawdown and trade count.
+    """
+    n, paths = close.shape
+    buy, sell = strategy.signals(close, IndicatorCache(pd.DataFrame(close)))
+    active = (np.arange(n) >= strategy.warm_up)[:, None]
+    buy_signal = np.asarray(buy, dtype=bool) & active
+    sell_signal = np.asarray(sell, dtype=bool) & active
+    buy_prices, sell_prices = execution.fill_prices(close)
+
+    initial_investment = float(initial_investment)
+    cash = np.full(paths, initial_investment)
+    shares = np.zeros(paths)
+    trades = np.zeros(paths, dtype=int)
+    cash_balance = np.full((n, paths), np.nan)
+    holdings = np.full((n, paths), np.nan)
+    cash_balance[0] = cash
+    holdings[0] = shares
+
+    # One step per bar on which any path signals, vectorized across paths
+    for t in np.flatnonzero(buy_signal.any(axis=1) | sell_signal.any(axis=1)):
+        buying = buy_signal[t] & (cash > 0)
+        quantity = execution.buy_quantities(cash * execution.position_size, buy_prices[t])
+        filled = buying & (quantity > 0)
+        value = np.where(filled, quantity * buy_prices[t], 0.0)
+        cash = np.where(filled, cash - value - execution.cost(value), cash)
+        shares = np.where(filled, shares + quantity, shares)
+
+        # As in backtest_strategy, a path only sells when it did not attempt a buy
+        selling = sell_signal[t] & ~buying & (shares > 0)
+        value = np.where(selling, shares * sell_prices[t], 0.0)
+        cash = np.where(selling, cash + value - execution.cost(value), cash)
+        shares = np.where(selling, 0.0, shares)
+        trades += filled | selling
+
+        cash_balance[t] = cash
+        holdings[t] = shares
+
+    equity = pd.DataFrame(cash_balance).ffill().values + pd.DataFrame(holdings).ffill().values * close
+    values = np.vstack([np.full((1, paths), initial_investment), equity[active[:, 0]]])
+    max_drawdown = (1.0 - values / np.maximum.accumulate(values, axis=0)).max(axis=0)
+    final_value = cash + shares * close[-1]
+    return (final_value - initial_investment) / initial_investment, max_drawdown, trades
+
+
+def _simulate_batch(args):
+    close, initial_investment, strategy, execution, method, block_size, seed_sequence, resamples = args
+    prices = resample_prices(close, resamples, method, block_size, np.random.default_rng(seed_sequence))
+    return batched_backtest(prices, initial_investment, strategy, execution)
+
+
+def _distribution(values):
+    percentiles = np.percentile(values, SUMMARY_PERCENTILES)
+    return {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        **{f'p{q}': float(value) for q, value in zip(SUMMARY_PERCENTILES, percentiles)},
+    }
+
+
+def robustness_test(symbol, initial_investment, strategy, method='block', resamples=DEFAULT_RESAMPLES,
+                    block_size=DEFAULT_BLOCK_SIZE, seed=0, execution=None, workers=1):
+    """
+    Distribution of a strategy's return and drawdown over resampled versions of a symbol's price history.
+
+    Batches of resamples are simulated as 2-D arrays, spread over a pool of forked
+    worker processes when workers > 1.
+    """
+    validate_backtest_target(symbol, initial_investment)
+    validate_robustness_params(method, resamples, block_size, seed)
+    execution = execution or FRICTIONLESS
+
+    with span('price_fetch'):
+        close = get_stock_data(symbol)['close_price'].astype(float).values
+    close = close[close > 0]
+    if len(close) < 2:
+        raise ValidationError(f"Insufficient historical data for {symbol}")
+
+    with span('backtest_compute'):
+        actual_return, actual_drawdown, actual_trades = batched_backtest(
+            close[:, None], initial_investment, strategy, execution)
+
+        sizes = [RESAMPLE_BATCH_SIZE] * (resamples // RESAMPLE_BATCH_SIZE)
+        if resamples % RESAMPLE_BATCH_SIZE:
+            sizes.append(resamples % RESAMPLE_BATCH_SIZE)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        batches = [(close, initial_investment, strategy, execution, method, block_size, seed_sequence, size)
+                   for seed_sequence, size in zip(seeds, sizes)]
+
+        if workers > 1 and len(batches) > 1:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=context) as pool:
+                results = list(pool.map(_simulate_batch, batches))
+        else:
+            results = [_simulate_batch(batch) for batch in batches]
+
+        returns = np.concatenate([result[0] for result in results])
+        drawdowns = np.concatenate([result[1] for result in results])
+        trades = np.concatenate([result[2] for result in results])
+
+    logger.info(f"Robustness test for {symbol} over {resamples} {method} resamples: "
+                f"median return {np.median(returns):.2%}")
+
+    return {
+        'symbol': symbol,
+        'strategy': strategy.spec(),
+        'method': method,
+        'block_size': block_size if method == 'block' else None,
+        'resamples': resamples,
+        'seed': seed,
+        'actual': {
+            'total_return': float(actual_return[0]),
+            'max_drawdown': float(actual_drawdown[0]),
+            'trades_executed': int(actual_trades[0]),
+        },
+        'total_return': _distribution(returns),
+        'max_drawdown': _distribution(drawdowns),
+        'mean_trades': float(trades.mean()),
+        'probability_of_loss': float((returns < 0).mean()),
+        # Share of resamples the actual history beat; near 1 suggests the result depends on that exact path
+        'actual_return_rank': float((returns < actual_return[0]).mean()),
+    }
@@ -0,0 +1,105 @@
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.db.models import F, FloatField, Window
+from django.db.models.functions import Cast, RowNumber
+
+from .models import StockData
+from .instrumentation import span
+from .strategies import IndicatorCache
+
+logger = logging.getLogger(__name__)
+
+SIGNALS = ('buy', 'sell')
+TRIGGERS = ('level', 'cross')
+MAX_SCREEN_LOOKBACK = 252
+
+
+def validate_screen_params(signal, trigger, lookback, symbols):
+    if signal not in SIGNALS:
+        raise ValidationError(f"Signal must be one of: {', '.join(SIGNALS)}")
+    if trigger not in TRIGGERS:
+        raise ValidationError(f"Trigger must be one of: {', '.join(TRIGGERS)}")
+    if not isinstance(lookback, int) or not 1 <= lookback <= MAX_SCREEN_LOOKBACK:
+        raise ValidationError(f"Lookback must be an integer between 1 and {MAX_SCREEN_LOOKBACK}")
+    if symbols is not None and (not isinstance(symbols, list) or not symbols
+                                or not all(isinstance(symbol, str) and symbol for symbol in symbols)):
+        raise ValidationError("Symbols must be a non-empty list of symbols")
+
+
+def load_latest_bars(bars, symbols=None):
+    """
+    The latest `bars` closes of every symbol in one query, right-aligned into
+    (bars x symbols) close and date-ordinal matrices (NaN / 0 where a symbol has fewer bars).
+    """
+    data = StockData.objects.filter(close_price__gt=0)  # skip prediction placeholder rows
+    if symbols is not None:
+        data = data.filter(symbol__in=symbols)
+    rows = list(
+        data.annotate(
+            recency=Window(RowNumber(), partition_by=F('symbol'), order_by=F('date').desc()),
+            close=Cast('close_price', FloatField()),  # floats straight from the driver instead of Decimals
+        )
+        .filter(recency__lte=bars)
+        .values_list('symbol', 'date', 'close', 'recency')
+    )
+    if not rows:
+        raise ValidationError("No data available to screen")
+
+    names, codes = np.unique(np.array([row[0] for row in rows], dtype=object), return_inverse=True)
+    position = bars - np.fromiter((row[3] for row in rows), dtype=np.int64, count=len(rows))
+    close = np.full((bars, len(names)), np.nan)
+    close[position, codes] = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    ordinals = np.zeros((bars, len(names)), dtype=np.int64)
+    ordinals[position, codes] = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    return list(names), close, ordinals
+
+
+def screen(strategy, signal='buy', trigger='level', lookback=1, symbols=None):
+    """
+    Symbols whose strategy signal holds (trigger='level') or switched on
+    (trigger='cross') within their last `lookback` bars.
+    """
+    validate_screen_params(signal, trigger, lookback, symbols)
+    # One extra bar gives the signal state before the lookback window, for crossings
+    bars = strategy.history + lookback + 1
+
+    with span('price_fetch'):
+        names, close, ordinals = load_latest_bars(bars, symbols)
+
+    with span('screen_compute'):
+        # Every symbol is one column, so each indicator is a single vectorized pass over all of them
+        buy, sell = strategy.signals(close, IndicatorCache(pd.DataFrame(close)))
+        active = np.asarray(buy if signal == 'buy' else sell, dtype=bool)
+        # Rows before a symbol's warm-up are not tradeable in a backtest either
+        seen = np.isfinite(close).cumsum(axis=0)
+        active &= seen > strategy.warm_up
+        hits = active[-lookback:]
+        if trigger == 'cross':
+            hits = hits & ~active[-lookback - 1:-1]
+
+        matched = np.flatnonzero(hits.any(axis=0))
+        # Most recent qualifying bar of each matched symbol
+        last_hit = lookback - 1 - np.argmax(hits[::-1, matched], axis=0)
+
+    logger.info(f"Screened {len(names)} symbols with {strategy.name}: {len(matched)} matches")
+
+    return {
+        'strategy': strategy.spec(),
+        'signal': signal,
+        'trigger': trigger,
+        'lookback': lookback,
+        'symbols_screened': len(names),
+        'matches': [
+            {
+                'symbol': names[column],
+                'date': date.fromordinal(int(ordinals[-1, column])).isoformat(),
+                'close': float(close[-1, column]),
+                'signal_date': date.fromordinal(int(ordinals[len(close) - lookback + row, column])).isoformat(),
+            }
+            for column, row in zip(matched, last_hit)
+        ],
+    }
@@ -5,6 +5,8 @@ from datetime import datetime
 from dotenv import load_dotenv
 from django.db import transaction
 from .models import StockData
+from .prewarm import bars_ingested
+from .intraday import make_bars, store_intraday_bars, validate_interval
 import logging
 
 load_dotenv()
@@ -64,6 +66,8 @@ def fetch_stock_data(symbol, start_date, end_date):
                     update_fields=['open_price', 'high_price', 'low_price', 'close_price', 'volume'],
                     unique_fields=['symbol', 'date']
                 )
+            # Invalidates the symbol's cached results and pre-warms the popular ones
+            bars_ingested([symbol])
 
             logger.info(f"Successfully fetched and stored data for {symbol}")
             return
@@ -86,3 +90,66 @@ def fetch_stock_data(symbol, start_date, end_date):
             break
 
 
+def fetch_intraday_data(symbol, interval=1, month=None):
+    """Fetch intraday bars (a month of them when month='YYYY-MM' is given) and store them as per-day chunks."""
+    validate_interval(interval)
+    params = {
+        'function': 'TIME_SERIES_INTRADAY',
+        'symbol': symbol,
+        'interval': f'{interval}min',
+        'outputsize': 'full',
+        'apikey': API_KEY
+    }
+    if month:
+        params['month'] = month
+    series_key = f'Time Series ({interval}min)'
+
+    max_retries = 5
+    for attempt in range(max_retries):
+        try:
+            response = requests.get(BASE_URL, params=params, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+
+            if 'Note' in data:
+                # Alpha Vantage returns a 'Note' key when rate limit is hit
+                logger.warning(f"Rate limit hit for {symbol}. Waiting before retry.")
+                time.sleep(60)
+                continue
+
+            if series_key not in data:
+                logger.error(f"Invalid intraday response from Alpha Vantage for symbol {symbol}")
+                return
+
+            bars = make_bars([
+                (
+                    datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S'),
+                    float(values['1. open']),
+                    float(values['2. high']),
+                    float(values['3. low']),
+                    float(values['4. close']),
+                    int(values['5. volume'])
+                )
+                for timestamp, values in data[series_key].items()
+            ])
+            days = store_intraday_bars(symbol, interval, bars)
+
+            logger.info(f"Successfully fetched and stored {len(bars)} {interval}min bars ({days} days) for {symbol}")
+            return
+
+        except requests.Timeout:
+            logger.error(f"Timeout occurred while fetching intraday data for {symbol}")
+        except requests.RequestException as e:
+            logger.error(f"Network error occurred for {symbol}: {e}")
+        except ValueError as e:
+            logger.error(f"Error processing intraday data for {symbol}: {e}")
+        except Exception as e:
+            logger.error(f"An unexpected error occurred for {symbol}: {e}")
+
+        if attempt < max_retries - 1:
+            wait_time = 2 ** attempt
+            logger.info(f"Retrying in {wait_time} seconds...")
+            time.sleep(wait_time)
+        else:
+            logger.error(f"Failed to fetch intraday data for {symbol} after {max_retries} attempts")
+            break
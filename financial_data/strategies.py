@@ -0,0 +1,235 @@
+import inspect
+import json
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+
+def _sma(cache, window):
+    return cache.prices.rolling(window).mean()
+
+
+def _ema(cache, span):
+    return cache.prices.ewm(span=span, adjust=False, min_periods=span).mean()
+
+
+def _rsi(cache, period):
+    # Wilder's smoothing of average gains and losses
+    delta = cache.prices.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+def _rolling_std(cache, window):
+    return cache.prices.rolling(window).std(ddof=0)
+
+
+def _bollinger_upper(cache, window, num_std):
+    return cache.get('sma', window) + num_std * cache.get('std', window)
+
+
+def _bollinger_lower(cache, window, num_std):
+    return cache.get('sma', window) - num_std * cache.get('std', window)
+
+
+def converged_bars(alpha):
+    """Bars after which an exponential average with smoothing alpha has forgotten all but e^-8 of its seed."""
+    return math.ceil(8 / alpha)
+
+
+INDICATORS = {
+    'sma': _sma,
+    'ema': _ema,
+    'rsi': _rsi,
+    'std': _rolling_std,
+    'bollinger_upper': _bollinger_upper,
+    'bollinger_lower': _bollinger_lower,
+}
+
+
+class IndicatorCache:
+    """
+    Indicators of one price series (or a date x symbol frame), each computed at most once.
+
+    Strategies run against the same cache share every indicator they have in common.
+    """
+
+    def __init__(self, prices):
+        self.prices = prices
+        self._values = {}
+
+    def get(self, name, *params):
+        key = (name,) + params
+        if key not in self._values:
+            self._values[key] = np.asarray(INDICATORS[name](self, *params), dtype=float)
+        return self._values[key]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class Strategy(ABC):
+    """
+    Base class for backtest strategies.
+
+    Subclasses list their parameters with defaults (None marks a required one)
+    and turn indicator arrays into boolean buy and sell signal arrays.
+    """
+
+    name = None
+    parameters = {}
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.parameters)
+        if unknown:
+            raise ValidationError(f"Unknown parameters for strategy {self.name}: {', '.join(sorted(unknown))}")
+        self.params = {**self.parameters, **params}
+        for key, value in self.params.items():
+            if value is None:
+                raise ValidationError(f"Strategy {self.name} requires parameter {key}")
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                raise ValidationError(f"Strategy parameter {key} must be a positive number")
+
+    @property
+    @abstractmethod
+    def warm_up(self):
+        """Rows skipped before the first trade."""
+
+    @property
+    def history(self):
+        """Bars of history the latest signals depend on, for evaluating them on a truncated window."""
+        return self.warm_up
+
+    @abstractmethod
+    def signals(self, close, indicators):
+        """Return (buy, sell) boolean arrays shaped like close."""
+
+    def spec(self):
+        return {'name': self.name, 'params': self.params}
+
+    def cache_key(self):
+        return json.dumps(self.spec(), sort_keys=True, separators=(',', ':'))
+
+    def _window(self, key):
+        window = self.params[key]
+        if not isinstance(window, int):
+            raise ValidationError(f"Strategy parameter {key} must be an integer")
+        return window
+
+
+STRATEGIES = {}
+
+
+def register_strategy(cls):
+    if inspect.isabstract(cls):
+        missing = ', '.join(sorted(cls.__abstractmethods__))
+        raise TypeError(f"Strategy {cls.name} must implement {missing}")
+    STRATEGIES[cls.name] = cls
+    return cls
+
+
+@register_strategy
+class MovingAverageStrategy(Strategy):
+    """Buy while the close is below its buy moving average, sell while it is above its sell moving average."""
+
+    name = 'moving_average'
+    parameters = {'buy_ma_window': None, 'sell_ma_window': None}
+
+    @property
+    def warm_up(self):
+        return max(self._window('buy_ma_window'), self._window('sell_ma_window'))
+
+    def signals(self, close, indicators):
+        buy = close < indicators.get('sma', self._window('buy_ma_window'))
+        sell = close > indicators.get('sma', self._window('sell_ma_window'))
+        return buy, sell
+
+
+@register_strategy
+class EMACrossoverStrategy(Strategy):
+    """Buy while the fast EMA is above the slow one, sell while it is below."""
+
+    name = 'ema_crossover'
+    parameters = {'fast': 12, 'slow': 26}
+
+    @property
+    def warm_up(self):
+        return max(self._window('fast'), self._window('slow'))
+
+    @property
+    def history(self):
+        return converged_bars(2 / (self.warm_up + 1))
+
+    def signals(self, close, indicators):
+        fast = indicators.get('ema', self._window('fast'))
+        slow = indicators.get('ema', self._window('slow'))
+        return fast > slow, fast < slow
+
+
+@register_strategy
+class RSIStrategy(Strategy):
+    """Buy when the RSI is oversold, sell when it is overbought."""
+
+    name = 'rsi'
+    parameters = {'period': 14, 'oversold': 30, 'overbought': 70}
+
+    @property
+    def warm_up(self):
+        return self._window('period')
+
+    @property
+    def history(self):
+        return converged_bars(1 / self.warm_up)
+
+    def signals(self, close, indicators):
+        rsi = indicators.get('rsi', self._window('period'))
+        return rsi < self.params['oversold'], rsi > self.params['overbought']
+
+
+@register_strategy
+class BollingerStrategy(Strategy):
+    """Buy below the lower Bollinger band, sell above the upper band."""
+
+    name = 'bollinger'
+    parameters = {'window': 20, 'num_std': 2.0}
+
+    @property
+    def warm_up(self):
+        return self._window('window')
+
+    def signals(self, close, indicators):
+        window, num_std = self._window('window'), float(self.params['num_std'])
+        return (close < indicators.get('bollinger_lower', window, num_std),
+                close > indicators.get('bollinger_upper', window, num_std))
+
+
+def get_strategy(name, params=None):
+    cls = STRATEGIES.get(name)
+    if cls is None:
+        raise ValidationError(f"Strategy must be one of: {', '.join(sorted(STRATEGIES))}")
+    if params is not None and not isinstance(params, dict):
+        raise ValidationError("Strategy parameters must be an object")
+    return cls(**(params or {}))
+
+
+def parse_strategy(value, defaults=None):
+    """
+    Build a strategy from a request value: a name or {"name": ..., "params": {...}}.
+
+    defaults fills parameters the strategy declares but the value leaves out,
+    e.g. the top-level buy_ma_window / sell_ma_window of a backtest request.
+    """
+    if isinstance(value, str):
+        name, params = value, {}
+    elif isinstance(value, dict) and 'name' in value:
+        name, params = value['name'], value.get('params') or {}
+    else:
+        raise ValidationError("Strategy must be a name or an object with a name and params")
+    cls = STRATEGIES.get(name)
+    if cls is not None and isinstance(params, dict):
+        params = {**{key: default for key, default in (defaults or {}).items()
+                     if key in cls.parameters and default is not None}, **params}
+    return get_strategy(name, params)
@@ -0,0 +1,35 @@
+import json
+
+# Number of transactions serialized per chunk handed to the WSGI server
+STREAM_BATCH_SIZE = 500
+
+
+def split_backtest_results(results):
+    summary = {key: value for key, value in results.items() if key != 'transaction_history'}
+    transactions = results.get('transaction_history', [])
+    summary['transaction_count'] = len(transactions)
+    return summary, transactions
+
+
+def _batched(items, batch_size=STREAM_BATCH_SIZE):
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def iter_ndjson(summary, transactions):
+    """One JSON object per line: a summary record followed by one record per transaction."""
+    yield json.dumps({'type': 'summary', **summary}) + '\n'
+    for batch in _batched(transactions):
+        yield ''.join(json.dumps({'type': 'transaction', **t}) + '\n' for t in batch)
+
+
+def iter_json(summary, transactions):
+    """The regular backtest JSON document, emitted in chunks instead of a single dump."""
+    head = json.dumps(summary)
+    yield head[:-1] + (', ' if summary else '') + '"transaction_history": ['
+    first = True
+    for batch in _batched(transactions):
+        chunk = ', '.join(json.dumps(t) for t in batch)
+        yield chunk if first else ', ' + chunk
+        first = False
+    yield ']}'
@@ -1,11 +1,66 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.core.exceptions import ValidationError
 from django.urls import reverse
-from .models import StockData
-from .backtesting import backtest_strategy
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.utils import ConnectionHandler
+from .models import StockData, IntradayBarChunk
+from .backtesting import backtest_strategy, backtest_strategies
+from .strategies import STRATEGIES, IndicatorCache, Strategy, get_strategy, register_strategy
+from .execution import ExecutionModel
+from .intraday import make_bars, store_intraday_bars, load_intraday_bars, resample_bars
+from .stock_data_fetcher import fetch_intraday_data, fetch_stock_data
+from .portfolio import portfolio_backtest
+from .equity import lttb_indices
+from .encoding import negotiate_format
+from .benchmarking import generate_ohlcv, run_benchmarks, check_thresholds
+from .model_store import ModelStore, get_model_store, model_dir
+from .cache_utils import bars_version, bump_bars_version
+from .evaluation import forecast_folds, walk_forward_evaluate
+from .ml_integration import StockPredictor
+from .training import train_symbol, train_symbols, iter_training_chunks, FEATURES as TRAINING_FEATURES
+from .warmup import warm
+from .screener import screen
+from .admission import AdmissionGate, get_gate, ADMISSION_REJECTED
+from .prewarm import (
+    bars_ingested, record_request, backtest_cache_key, popular_requests, prediction_cache_key, report_cache_key, WARMERS,
+)
+from .robustness import batched_backtest, resample_prices, robustness_test
+from .export import ExportStats, export_prices
+from .price_cache import SeriesLRU, get_price_series, pack_series, unpack_series, local_series
+from .db_router import replica_reads
+from .management.commands.run_benchmarks import mirrored_replica
+from .loadtest import (
+    load_mix, build_requests, write_traffic, read_traffic, run_load, summarize, InProcessTransport
+)
 import datetime
+import io
+import joblib
 import json
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import csv
+import msgpack
+import numpy as np
+import pandas as pd
 from unittest.mock import patch
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import MinMaxScaler
+
+# Query-count assertions assume cache lookups are not database queries, as with Redis or Memcached
+# rather than the default database cache
+IN_MEMORY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 
 class BacktestingTestCase(TestCase):
     def setUp(self):
@@ -90,10 +145,1401 @@ class BacktestingTestCase(TestCase):
         result = json.loads(response.content)
         self.assertIn('error', result)
 
+    def _backtest_request(self, **extra):
+        data = {
+            'symbol': self.symbol,
+            'initial_investment': 10000,
+            'buy_ma_window': 3,
+            'sell_ma_window': 5,
+            **extra
+        }
+        return self.client.post(reverse('run_backtest'), json.dumps(data), content_type='application/json')
+
+    def test_api_endpoint_summary_only(self):
+        full = json.loads(self._backtest_request().content)
+        response = self._backtest_request(summary_only=True)
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content)
+        self.assertNotIn('transaction_history', result)
+        self.assertEqual(result['transaction_count'], len(full['transaction_history']))
+        self.assertEqual(result['total_return'], full['total_return'])
+
+    def test_api_endpoint_pagination(self):
+        full = json.loads(self._backtest_request().content)
+        result = json.loads(self._backtest_request(offset=1, limit=2).content)
+        self.assertEqual(result['transaction_history'], full['transaction_history'][1:3])
+        self.assertEqual(result['offset'], 1)
+        self.assertEqual(result['limit'], 2)
+        response = self._backtest_request(offset=-1)
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_endpoint_stream_ndjson(self):
+        full = json.loads(self._backtest_request().content)
+        response = self._backtest_request(stream='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lines[0]['type'], 'summary')
+        self.assertEqual([{k: v for k, v in line.items() if k != 'type'} for line in lines[1:]],
+                         full['transaction_history'])
+
+    def test_api_endpoint_stream_json(self):
+        full = json.loads(self._backtest_request().content)
+        response = self._backtest_request(stream='json')
+        result = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(result['transaction_history'], full['transaction_history'])
+        self.assertEqual(result['transaction_count'], len(full['transaction_history']))
+        self.assertEqual(self._backtest_request(stream='xml').status_code, 400)
+
+    def test_api_endpoint_msgpack(self):
+        full = json.loads(self._backtest_request().content)
+        for _ in range(2):  # second request is served from the encoded cache
+            response = self.client.post(
+                reverse('run_backtest'),
+                json.dumps({'symbol': self.symbol, 'initial_investment': 10000, 'buy_ma_window': 3, 'sell_ma_window': 5}),
+                content_type='application/json',
+                HTTP_ACCEPT='application/x-msgpack'
+            )
+            self.assertEqual(response['Content-Type'], 'application/x-msgpack')
+            result = msgpack.unpackb(response.content)
+            history = result['transaction_history']
+            prices = np.frombuffer(history['columns']['price'], dtype=history['dtypes']['price'])
+            actions = np.frombuffer(history['columns']['action'], dtype=history['dtypes']['action'])
+            dates = np.frombuffer(history['columns']['date'], dtype=history['dtypes']['date'])
+            self.assertEqual(prices.tolist(), [t['price'] for t in full['transaction_history']])
+            self.assertEqual(actions.tolist(), [1 if t['action'] == 'buy' else -1 for t in full['transaction_history']])
+            self.assertEqual(str(datetime.date(1970, 1, 1) + datetime.timedelta(days=int(dates[0]))),
+                             full['transaction_history'][0]['date'])
+            self.assertEqual(result['total_return'], full['total_return'])
+
+
+class ContentNegotiationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_negotiate_format(self):
+        factory = RequestFactory()
+        self.assertEqual(negotiate_format(factory.post('/')), 'json')
+        self.assertEqual(negotiate_format(factory.post('/', HTTP_ACCEPT='application/msgpack')), 'msgpack')
+        self.assertEqual(negotiate_format(
+            factory.post('/', HTTP_ACCEPT='application/json;q=0.9, application/x-msgpack')), 'msgpack')
+        self.assertEqual(negotiate_format(
+            factory.post('/', HTTP_ACCEPT='application/json, application/x-msgpack;q=0.5')), 'json')
+
+    @patch('financial_data.views.StockPredictor')
+    def test_predict_msgpack(self, mock_predictor):
+        mock_predictor.return_value.predict.return_value = [
+            {'date': datetime.date(2024, 1, 2), 'predicted_price': 101.5},
+            {'date': datetime.date(2024, 1, 3), 'predicted_price': 102.25},
+        ]
+        response = self.client.post(reverse('predict_stock_prices'), json.dumps({'symbol': 'TEST'}),
+                                    content_type='application/json', HTTP_ACCEPT='application/x-msgpack')
+        self.assertEqual(response.status_code, 200)
+        result = msgpack.unpackb(response.content)
+        predictions = result['predictions']
+        self.assertEqual(np.frombuffer(predictions['columns']['predicted_price'], dtype='<f8').tolist(), [101.5, 102.25])
+        self.assertEqual(np.frombuffer(predictions['columns']['date'], dtype='<i4').tolist(), [19724, 19725])
+
+        response = self.client.post(reverse('predict_stock_prices'), json.dumps({'symbol': 'TEST'}),
+                                    content_type='application/json')
+        self.assertEqual(json.loads(response.content)['predictions'][0],
+                         {'date': '2024-01-02', 'predicted_price': 101.5})
+
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(1, 11):
+            StockData.objects.create(symbol='TEST', date=datetime.date(2023, 1, i), open_price=100 + i,
+                                     high_price=101 + i, low_price=99 + i, close_price=100 + i, volume=1000)
+
+    def test_server_timing_header(self):
+        response = self.client.post(reverse('run_backtest'), json.dumps({
+            'symbol': 'TEST', 'initial_investment': 10000, 'buy_ma_window': 2, 'sell_ma_window': 3
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        server_timing = response['Server-Timing']
+        self.assertIn('price_fetch;dur=', server_timing)
+        self.assertIn('backtest_compute;dur=', server_timing)
+        self.assertIn('db_queries;desc="1"', server_timing)
+        self.assertIn('total;dur=', server_timing)
+
+    def test_metrics_endpoint(self):
+        self.client.post(reverse('run_backtest'), json.dumps({
+            'symbol': 'TEST', 'initial_investment': 10000, 'buy_ma_window': 2, 'sell_ma_window': 3
+        }), content_type='application/json')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('financial_data_request_duration_seconds_bucket{view="run_backtest",le="+Inf"}', body)
+        self.assertIn('financial_data_stage_duration_seconds_count{stage="price_fetch",view="run_backtest"}', body)
+        self.assertIn('financial_data_cache_requests_total{cache="backtest",result="miss"}', body)
+        self.assertIn('financial_data_cache_hit_ratio{cache="backtest"}', body)
+
+
+class BenchmarkingTestCase(TestCase):
+    def test_generate_ohlcv_is_reproducible(self):
+        first = generate_ohlcv('SYN0000', 1, seed=7, end_date=datetime.date(2024, 6, 28))
+        second = generate_ohlcv('SYN0000', 1, seed=7, end_date=datetime.date(2024, 6, 28))
+        self.assertTrue(first.equals(second))
+        self.assertEqual(len(first), 252)
+        self.assertTrue((first['high_price'] >= first[['open_price', 'close_price']].max(axis=1)).all())
+        self.assertTrue((first['low_price'] <= first[['open_price', 'close_price']].min(axis=1)).all())
+
+    def test_run_benchmarks(self):
+        cache.set('bars_version_SHARED', 7, timeout=None)
+        report = run_benchmarks(n_symbols=2, years=0.5, repeat=1, buy_ma_window=5, sell_ma_window=10)
+        self.assertEqual(cache.get('bars_version_SHARED'), 7)
+        self.assertEqual(StockData.objects.filter(symbol='SYN0001').count(), 126)
+        self.assertEqual(set(report['results']), {
+            'import_views', 'get_stock_data', 'backtest_strategy', 'predict_next_30_days', 'generate_report',
+            'generate_pdf_report', 'view_backtest', 'view_predict', 'view_report'
+        })
+        self.assertEqual(check_thresholds(report, {'backtest_strategy': 1e-9})[0][0], 'backtest_strategy')
+        self.assertEqual(check_thresholds(report, {'backtest_strategy': 1e9}), [])
+        json.dumps(report)
+
+    def test_benchmarks_read_the_test_database_through_the_replica(self):
+        replica_settings = {**settings.DATABASES['default'], 'NAME': 'live_replica'}
+        handler = ConnectionHandler({'default': settings.DATABASES['default'], 'replica': replica_settings})
+        with patch.dict(settings.DATABASES, {'replica': replica_settings}), \
+                patch('financial_data.management.commands.run_benchmarks.connections', handler):
+            with mirrored_replica():
+                self.assertEqual(handler['replica'].settings_dict['NAME'], connection.settings_dict['NAME'])
+            self.assertEqual(handler['replica'].settings_dict['NAME'], 'live_replica')
+
+
+class LoadTestHarnessTestCase(TestCase):
+    def test_build_requests_follows_mix(self):
+        mix = load_mix()
+        mix.update({'endpoints': {'backtest': 1.0}, 'cache_hit_ratio': 0.5})
+        requests = build_requests(mix, 400, seed=1)
+        self.assertEqual(requests, build_requests(mix, 400, seed=1))
+        self.assertTrue(all(r['path'] == reverse('run_backtest') for r in requests))
+        investments = [r['body']['initial_investment'] for r in requests]
+        misses = sum(1 for amount in investments if amount != mix['initial_investment'])
+        self.assertAlmostEqual(misses / len(requests), 0.5, delta=0.1)
+
+    def test_record_and_replay(self):
+        requests = build_requests(load_mix(), 20, seed=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'traffic.jsonl')
+            write_traffic(path, requests)
+            self.assertEqual(read_traffic(path), requests)
+
+    def test_run_load_summary(self):
+        class FakeTransport:
+            def post(self, path, body):
+                if body.get('symbol') == 'BAD':
+                    raise ConnectionError('refused')
+                return 200 if path == reverse('run_backtest') else 500
+
+        requests = [
+            {'endpoint': 'backtest', 'path': reverse('run_backtest'), 'body': {'symbol': 'TEST'}},
+            {'endpoint': 'predict', 'path': reverse('predict_stock_prices'), 'body': {'symbol': 'TEST'}},
+            {'endpoint': 'predict', 'path': reverse('predict_stock_prices'), 'body': {'symbol': 'BAD'}},
+        ]
+        results, elapsed = run_load(FakeTransport(), requests, concurrency=2, rate=1000)
+        summary = summarize(results, elapsed)
+        self.assertEqual(summary['overall']['requests'], 3)
+        self.assertEqual(summary['endpoints']['backtest']['errors'], 0)
+        self.assertEqual(summary['endpoints']['predict']['error_rate'], 1.0)
+        self.assertIn('p99', summary['endpoints']['predict'])
+
+    def test_rate_latency_includes_time_held_back(self):
+        class StallingTransport:
+            calls = 0
+
+            def post(self, path, body):
+                StallingTransport.calls += 1
+                if StallingTransport.calls == 1:
+                    time.sleep(0.3)
+                return 200
+
+        requests = [{'endpoint': 'backtest', 'path': reverse('run_backtest'), 'body': {}}] * 5
+        results, _ = run_load(StallingTransport(), requests, concurrency=1, rate=100)
+        # The requests queued behind the stall were due 10-40ms in, but sent only after 300ms
+        self.assertTrue(all(row['latency'] > 0.2 for row in results))
+
+    def test_in_process_transport(self):
+        StockData.objects.create(symbol='TEST', date=datetime.date(2023, 1, 1), open_price=1, high_price=1,
+                                 low_price=1, close_price=1, volume=1)
+        transport = InProcessTransport()
+        self.assertEqual(transport.post(reverse('run_backtest'), {'symbol': 'TEST'}), 400)
+
+
+class TrainingTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(BASE_DIR=self.tmp.name)
+        self.settings_override.enable()
+        self.df = generate_ohlcv('TEST', 1, seed=3, end_date=datetime.date(2024, 6, 28))
+        self.df['close_price'] = (self.df['close_price'] * 0.5 + self.df['open_price'] * 0.5).round(2)  # keep the fit non-trivial
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in self.df.iloc[:200].to_dict('records')])
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def _load(self):
+        return get_model_store().get_model('TEST')
+
+    def _reference_fit(self, rows):
+        X = rows[TRAINING_FEATURES].astype(float).values
+        scaler = MinMaxScaler()
+        return LinearRegression().fit(scaler.fit_transform(X), X[:, 3]), scaler
+
+    def test_matches_sklearn_fit(self):
+        self.assertEqual(train_symbols(['TEST'])[0]['status'], 'trained')
+        model, scaler = self._load()
+        reference_model, reference_scaler = self._reference_fit(self.df.iloc[:200])
+        X = self.df[TRAINING_FEATURES].astype(float).values
+        np.testing.assert_allclose(model.predict(scaler.transform(X)),
+                                   reference_model.predict(reference_scaler.transform(X)), rtol=1e-6)
+
+    def test_incremental_update_matches_full_refit(self):
+        train_symbols(['TEST'])
+        self.assertEqual(train_symbol('TEST', incremental=True)['status'], 'up_to_date')
+
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in self.df.iloc[200:].to_dict('records')])
+        result = train_symbols(['TEST'], incremental=True)[0]
+        self.assertEqual(result['status'], 'updated')
+        self.assertEqual(result['rows'], len(self.df) - 200)
+
+        model, scaler = self._load()
+        reference_model, reference_scaler = self._reference_fit(self.df)
+        X = self.df[TRAINING_FEATURES].astype(float).values
+        np.testing.assert_allclose(scaler.scale_, reference_scaler.scale_)
+        self.assertEqual(get_model_store().version('TEST'), 2)
+        np.testing.assert_allclose(model.predict(scaler.transform(X)),
+                                   reference_model.predict(reference_scaler.transform(X)), rtol=1e-6)
+
+    def test_incremental_update_retrains_after_corrections(self):
+        train_symbols(['TEST'])
+        StockData.objects.filter(symbol='TEST', date=self.df['date'].iloc[10]).update(close_price=1)
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in self.df.iloc[200:].to_dict('records')])
+        result = train_symbols(['TEST'], incremental=True)[0]
+        self.assertEqual(result['status'], 'retrained')
+        self.assertEqual(result['rows'], len(self.df))
+
+        model, scaler = self._load()
+        corrected = self.df.copy()
+        corrected.loc[10, 'close_price'] = 1
+        reference_model, reference_scaler = self._reference_fit(corrected)
+        X = corrected[TRAINING_FEATURES].astype(float).values
+        np.testing.assert_allclose(model.predict(scaler.transform(X)),
+                                   reference_model.predict(reference_scaler.transform(X)), rtol=1e-6)
+
+    def test_chunked_loading_matches_single_pass(self):
+        chunks = list(iter_training_chunks('TEST', chunk_size=64))
+        self.assertEqual([len(X) for X, _, _ in chunks], [64, 64, 64, 8])
+        self.assertEqual(chunks[0][0].dtype, np.float64)
+        self.assertEqual(chunks[-1][2], self.df['date'].iloc[199])
+        np.testing.assert_array_equal(np.vstack([X for X, _, _ in chunks]),
+                                      self.df.iloc[:200][TRAINING_FEATURES].astype(float).values)
+
+        chunked = train_symbol('TEST', chunk_size=64)
+        whole = train_symbol('TEST')
+        self.assertEqual(chunked['rows'], 200)
+        np.testing.assert_allclose(chunked['row'], whole['row'], rtol=1e-9, atol=1e-6)
+
+    def test_train_command_multiple_symbols(self):
+        out = io.StringIO()
+        err = io.StringIO()
+        with self.assertRaisesRegex(CommandError, '1 of 2 symbol'):
+            call_command('train_ml_model', 'TEST', 'MISSING', stdout=out, stderr=err)
+        self.assertIn('Successfully trained model for TEST', out.getvalue())
+        self.assertIn('No data available for symbol MISSING', err.getvalue())
+        self.assertEqual(train_symbols(['TEST'], incremental=True)[0]['status'], 'up_to_date')
+
+    def test_concurrent_writers_keep_each_others_models(self):
+        row = train_symbol('TEST')['row']
+
+        def write_models(prefix):
+            store = ModelStore(model_dir())
+            for i in range(15):
+                store.write({f'{prefix}{i}': row})
+
+        context = multiprocessing.get_context('fork')
+        writers = [context.Process(target=write_models, args=(prefix,)) for prefix in ('A', 'B', 'C')]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        self.assertEqual([writer.exitcode for writer in writers], [0, 0, 0])
+        self.assertEqual(len(ModelStore(model_dir())), 45)
+
+    def test_pack_models_and_predictor_lookup(self):
+        directory = os.path.join(self.tmp.name, 'financial_data', 'ml_models')
+        os.makedirs(directory)
+        reference_model, reference_scaler = self._reference_fit(self.df)
+        joblib.dump(reference_model, os.path.join(directory, 'OLD_model.pkl'))
+        joblib.dump(reference_scaler, os.path.join(directory, 'OLD_scaler.pkl'))
+        train_symbols(['TEST'])
+
+        call_command('pack_models', '--delete', stdout=io.StringIO())
+        self.assertFalse(os.path.exists(os.path.join(directory, 'OLD_model.pkl')))
+        self.assertEqual(sorted(get_model_store().symbols), ['OLD', 'TEST'])
+
+        predictor = StockPredictor('OLD')
+        X = self.df[TRAINING_FEATURES].astype(float).values
+        np.testing.assert_allclose(predictor.model.predict(predictor.scaler.transform(X)),
+                                   reference_model.predict(reference_scaler.transform(X)))
+        self.assertIsNotNone(StockPredictor('TEST').model)
+
+
+class WalkForwardEvaluationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        df = generate_ohlcv('TEST', 1, seed=5, end_date=datetime.date(2024, 6, 28))
+        df['close_price'] = (df['close_price'] * 0.5 + df['open_price'] * 0.5).round(2)
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in df.to_dict('records')])
+        self.X = df[TRAINING_FEATURES].astype(float).values
+
+    def _reference_forecast(self, end, window, horizon):
+        rows = self.X[end - window + 1:end + 1]
+        scaler = MinMaxScaler()
+        model = LinearRegression().fit(scaler.fit_transform(rows), rows[:, 3])
+        features, predictions = self.X[end], []
+        for _ in range(horizon):
+            price = model.predict(scaler.transform([features]))[0]
+            predictions.append(price)
+            features = [price, price * 1.01, price * 0.99, price, self.X[end, 4]]
+        return predictions
+
+    def test_forecast_folds_match_per_fold_refit(self):
+        ends = np.array([59, 100, 180])
+        predictions = forecast_folds(self.X, ends, 60, 5)
+        for fold, end in enumerate(ends):
+            np.testing.assert_allclose(predictions[fold], self._reference_forecast(end, 60, 5), rtol=1e-6)
+
+    def test_walk_forward_metrics(self):
+        results = walk_forward_evaluate('TEST', train_window=60, horizon=5, step=10)
+        self.assertEqual(results['folds'], len(range(59, len(self.X) - 5, 10)))
+        self.assertEqual([m['step'] for m in results['metrics']], [1, 2, 3, 4, 5])
+        for metric in results['metrics']:
+            self.assertGreaterEqual(metric['rmse'], metric['mae'])
+            self.assertTrue(0.0 <= metric['directional_accuracy'] <= 1.0)
+        parallel = walk_forward_evaluate('TEST', train_window=60, horizon=5, step=10, workers=2)
+        for serial_metric, parallel_metric in zip(results['metrics'], parallel['metrics']):
+            self.assertAlmostEqual(serial_metric['mae'], parallel_metric['mae'], places=6)
+        with self.assertRaises(ValidationError):
+            walk_forward_evaluate('TEST', train_window=300, horizon=5)
+
+    def test_evaluate_endpoint(self):
+        url = reverse('evaluate_model')
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'train_window': 60, 'horizon': 3}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['metrics']), 3)
+        for body in ({'symbol': 'TEST', 'horizon': 0}, {'symbol': 'TEST', 'train_window': 'abc'},
+                     {'symbol': 'TEST', 'step': None}):
+            response = self.client.post(url, json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class ReadOnlyForecastTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(BASE_DIR=self.tmp.name)
+        self.settings_override.enable()
+        df = generate_ohlcv('TEST', 1, seed=7, end_date=datetime.date.today())
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in df.to_dict('records')])
+        train_symbols(['TEST'])
+        self.rows = StockData.objects.count()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def test_predictor_without_persist(self):
+        predictions = StockPredictor('TEST', persist=False).predict_next_30_days()
+        self.assertEqual(len(predictions), 30)
+        self.assertEqual(StockData.objects.count(), self.rows)
+        self.assertEqual(StockPredictor('TEST').predict_next_30_days(), predictions)
+        self.assertEqual(StockData.objects.filter(predicted_price__isnull=False).count(), 30)
+
+    def test_predict_endpoint_persist_parameter(self):
+        url = reverse('predict_stock_prices')
+        response = self.client.post(url + '?persist=false', json.dumps({'symbol': 'TEST'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StockData.objects.count(), self.rows)
+
+        # A persisting request still writes the forecast a read-only request cached
+        response = self.client.post(url, json.dumps({'symbol': 'TEST'}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StockData.objects.filter(predicted_price__isnull=False).count(), 30)
+
+    def test_horizon_and_cached_features(self):
+        predictor = StockPredictor('TEST', persist=False)
+        predictions = predictor.predict(horizon=10, lookback_days=90)
+        self.assertEqual(len(predictions), 10)
+        # Another horizon over the same history reuses the cached feature matrix
+        with self.assertNumQueries(0):
+            longer = predictor.predict(horizon=40, lookback_days=90)
+        self.assertEqual(longer[:10], predictions)
+
+        bump_bars_version('TEST')
+        with self.assertNumQueries(2):
+            predictor.predict(horizon=5, lookback_days=90)
+        with self.assertRaises(ValidationError):
+            predictor.predict(horizon=0)
+
+    def test_predict_endpoint_horizon(self):
+        url = reverse('predict_stock_prices') + '?persist=false'
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'horizon': 7, 'lookback_days': 90}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['predictions']), 7)
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'horizon': 'x'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class PortfolioBacktestTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        end_date = datetime.date(2024, 6, 28)
+        for symbol in ('AAA', 'BBB', 'CCC'):
+            df = generate_ohlcv(symbol, 1, seed=11, end_date=end_date)
+            StockData.objects.bulk_create([StockData(symbol=symbol, **row) for row in df.to_dict('records')])
+
+    def test_single_symbol_matches_backtest_strategy(self):
+        portfolio = portfolio_backtest(['AAA'], 10000, 5, 20)
+        single = backtest_strategy('AAA', 10000, 5, 20)
+        self.assertAlmostEqual(portfolio['final_value'], single['final_value'], places=6)
+        self.assertAlmostEqual(portfolio['max_drawdown'], single['max_drawdown'], places=6)
+        self.assertEqual(portfolio['trades_executed'], single['trades_executed'])
+
+    def test_shared_cash_and_contributions(self):
+        result = portfolio_backtest(['AAA', 'BBB', 'CCC'], 30000, 5, 20)
+        self.assertEqual([c['symbol'] for c in result['contributions']], ['AAA', 'BBB', 'CCC'])
+        self.assertAlmostEqual(sum(c['pnl'] for c in result['contributions']), result['final_value'] - 30000, places=4)
+        self.assertEqual(len(result['equity_curve']), StockData.objects.filter(symbol='AAA').count())
+        self.assertAlmostEqual(result['equity_curve'][-1]['equity'], result['final_value'])
+        self.assertAlmostEqual(max(p['drawdown'] for p in result['equity_curve']), result['max_drawdown'])
+        self.assertGreaterEqual(result['cash'], 0)
+        with self.assertRaises(ValidationError):
+            portfolio_backtest(['AAA', 'MISSING'], 30000, 5, 20)
+
+    def test_api_endpoint(self):
+        url = reverse('run_portfolio_backtest')
+        data = {'symbols': ['AAA', 'BBB'], 'initial_investment': 20000, 'buy_ma_window': 5, 'sell_ma_window': 20}
+        with self.assertNumQueries(1):
+            response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['contributions']), 2)
+        response = self.client.post(url, json.dumps({**data, 'symbols': 'AAA'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cache_key_is_fixed_length_and_versioned(self):
+        url = reverse('run_portfolio_backtest')
+        data = {'symbols': ['AAA', 'BBB', 'CCC'], 'initial_investment': 20000, 'buy_ma_window': 5,
+                'sell_ma_window': 20, 'commission': 1.5, 'slippage_bps': 5}
+        self.client.post(url, json.dumps(data), content_type='application/json')
+        keys = [key for key in cache._cache if 'portfolio_backtest_' in key]
+        self.assertEqual(len(keys), 1)
+        self.assertLess(len(keys[0]), 250)
+        with self.assertNumQueries(0):
+            self.client.post(url, json.dumps(data), content_type='application/json')
+        bump_bars_version('CCC')
+        with self.assertNumQueries(1):
+            self.client.post(url, json.dumps(data), content_type='application/json')
+
+
+class EquityCurveTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        df = generate_ohlcv('TEST', 2, seed=13, end_date=datetime.date(2024, 6, 28))
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in df.to_dict('records')])
+        self.bars = len(df)
+
+    def test_equity_curve_matches_results(self):
+        result = backtest_strategy('TEST', 10000, 5, 20, equity_curve=True, rolling_window=21)
+        curve = result['equity_curve']
+        self.assertEqual(len(curve), self.bars)
+        self.assertAlmostEqual(curve[-1]['equity'], result['final_value'])
+        self.assertAlmostEqual(max(point['drawdown'] for point in curve), result['max_drawdown'])
+        self.assertIsNone(curve[0]['rolling_sharpe'])
+        self.assertIsNotNone(curve[-1]['rolling_volatility'])
+        self.assertNotIn('equity_curve', backtest_strategy('TEST', 10000, 5, 20))
+
+    def test_lttb_downsampling(self):
+        y = np.sin(np.linspace(0, 20, 1000))
+        y[500] = 5.0
+        indices = lttb_indices(y, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertIn(500, indices)
+        self.assertTrue((np.diff(indices) > 0).all())
+        self.assertEqual(len(lttb_indices(y[:10], 50)), 10)
+
+    def test_api_endpoint_max_points(self):
+        data = {'symbol': 'TEST', 'initial_investment': 10000, 'buy_ma_window': 5, 'sell_ma_window': 20,
+                'equity_curve': True, 'max_points': 100, 'summary_only': True}
+        response = self.client.post(reverse('run_backtest'), json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['equity_curve']), 100)
+
+        response = self.client.post(reverse('run_backtest'), json.dumps(data), content_type='application/json',
+                                    HTTP_ACCEPT='application/x-msgpack')
+        curve = msgpack.unpackb(response.content)['equity_curve']
+        self.assertEqual(len(np.frombuffer(curve['columns']['equity'], dtype='<f8')), 100)
+
+        response = self.client.post(reverse('run_backtest'), json.dumps({**data, 'max_points': 1}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class StrategyTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.df = generate_ohlcv('TEST', 2, seed=17, end_date=datetime.date(2024, 6, 28))
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in self.df.to_dict('records')])
+
+    def test_indicators_computed_once(self):
+        close = self.df['close_price'].astype(float)
+        indicators = IndicatorCache(close)
+        np.testing.assert_allclose(indicators.get('sma', 20)[19:], close.rolling(20).mean().values[19:])
+        strategies = [get_strategy('bollinger', {'window': 20}), get_strategy('moving_average', {
+            'buy_ma_window': 20, 'sell_ma_window': 20})]
+        for strategy in strategies:
+            strategy.signals(close.values, indicators)
+        # sma(20) is shared by both strategies and the Bollinger bands
+        self.assertEqual(len(indicators), 4)
+        rsi = indicators.get('rsi', 14)
+        self.assertTrue(np.isnan(rsi[:13]).all())
+        self.assertTrue(((rsi[14:] >= 0) & (rsi[14:] <= 100)).all())
+
+    def test_default_strategy_matches_moving_average(self):
+        strategy = get_strategy('moving_average', {'buy_ma_window': 5, 'sell_ma_window': 20})
+        self.assertEqual(backtest_strategy('TEST', 10000, strategy=strategy), backtest_strategy('TEST', 10000, 5, 20))
+        results = backtest_strategies('TEST', 10000, [get_strategy(name) for name in ('rsi', 'ema_crossover', 'bollinger')])
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertGreater(result['trades_executed'], 0)
+
+    def test_invalid_strategies(self):
+        with self.assertRaises(ValidationError):
+            get_strategy('unknown')
+        with self.assertRaises(ValidationError):
+            get_strategy('rsi', {'period': -1})
+        with self.assertRaises(ValidationError):
+            get_strategy('rsi', {'lookback': 10})
+        with self.assertRaises(ValidationError):
+            get_strategy('moving_average', {'buy_ma_window': 5})
+
+    def test_incomplete_strategy_is_rejected(self):
+        class NoSignals(Strategy):
+            name = 'no_signals'
+
+            @property
+            def warm_up(self):
+                return 1
+
+        with self.assertRaises(TypeError):
+            NoSignals()
+        with self.assertRaisesRegex(TypeError, 'signals'):
+            register_strategy(NoSignals)
+        self.assertNotIn('no_signals', STRATEGIES)
+
+    def test_api_endpoint_strategy(self):
+        url = reverse('run_backtest')
+        data = {'symbol': 'TEST', 'initial_investment': 10000, 'strategy': {'name': 'rsi', 'params': {'period': 10}}}
+        response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('transaction_history', json.loads(response.content))
+
+        data = {'symbol': 'TEST', 'initial_investment': 10000, 'buy_ma_window': 5, 'sell_ma_window': 20,
+                'strategy': ['moving_average', 'bollinger'], 'summary_only': True}
+        response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        entries = json.loads(response.content)['strategies']
+        self.assertEqual([entry['strategy']['name'] for entry in entries], ['moving_average', 'bollinger'])
+        self.assertEqual(entries[0]['strategy']['params'], {'buy_ma_window': 5, 'sell_ma_window': 20})
+        self.assertNotIn('transaction_history', entries[0])
+
+        response = self.client.post(url, json.dumps({**data, 'strategy': 'momentum'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse('run_portfolio_backtest'), json.dumps(
+            {'symbols': ['TEST'], 'initial_investment': 10000, 'strategy': 'ema_crossover'}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+
+class ExecutionModelTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for symbol, seed in (('AAA', 19), ('BBB', 23)):
+            df = generate_ohlcv(symbol, 2, seed=seed, end_date=datetime.date(2024, 6, 28))
+            StockData.objects.bulk_create([StockData(symbol=symbol, **row) for row in df.to_dict('records')])
+
+    def test_costs_reduce_returns(self):
+        frictionless = backtest_strategy('AAA', 10000, 5, 20)
+        costly = backtest_strategy('AAA', 10000, 5, 20, execution=ExecutionModel(commission=1, slippage_bps=10))
+        self.assertLess(costly['final_value'], frictionless['final_value'])
+        buy = costly['transaction_history'][0]
+        self.assertEqual(buy['commission'], 1.0)
+        self.assertNotIn('commission', frictionless['transaction_history'][0])
+        self.assertEqual(backtest_strategy('AAA', 10000, 5, 20, execution=ExecutionModel()), frictionless)
+
+    def test_fractional_and_partial_sizing(self):
+        result = backtest_strategy('AAA', 10000, 5, 20, execution=ExecutionModel(sizing='fractional'))
+        first = result['transaction_history'][0]
+        self.assertIsInstance(first['shares'], float)
+        self.assertAlmostEqual(first['value'], 10000)
+
+        half = backtest_strategy('AAA', 10000, 5, 20, execution=ExecutionModel(position_size=0.5))
+        self.assertLessEqual(half['transaction_history'][0]['value'], 5000)
+        with self.assertRaises(ValidationError):
+            ExecutionModel(position_size=1.5)
+        with self.assertRaises(ValidationError):
+            ExecutionModel(sizing='lots')
+
+    def test_portfolio_costs(self):
+        execution = ExecutionModel(commission_rate=0.001, slippage_bps=5, sizing='fractional')
+        result = portfolio_backtest(['AAA', 'BBB'], 20000, 5, 20, execution=execution)
+        self.assertAlmostEqual(sum(c['pnl'] for c in result['contributions']), result['final_value'] - 20000, places=4)
+        self.assertLess(result['final_value'], portfolio_backtest(['AAA', 'BBB'], 20000, 5, 20,
+                                                                  execution=ExecutionModel(sizing='fractional'))['final_value'])
+
+    def test_api_endpoint_costs(self):
+        url = reverse('run_backtest')
+        data = {'symbol': 'AAA', 'initial_investment': 10000, 'buy_ma_window': 5, 'sell_ma_window': 20,
+                'commission': 2, 'slippage_bps': 5, 'sizing': 'fractional'}
+        response = self.client.post(url, json.dumps(data), content_type='application/json',
+                                    HTTP_ACCEPT='application/x-msgpack')
+        self.assertEqual(response.status_code, 200)
+        history = msgpack.unpackb(response.content)['transaction_history']
+        self.assertEqual(history['dtypes']['shares'], '<f8')
+        self.assertTrue((np.frombuffer(history['columns']['commission'], dtype='<f8') >= 2).all())
+        response = self.client.post(url, json.dumps({**data, 'commission': -1}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class IntradayBarsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        rng = np.random.default_rng(29)
+        opens = [datetime.datetime(2024, 6, day, 9, 30) for day in (24, 25, 26)]
+        times = [start + datetime.timedelta(minutes=m) for start in opens for m in range(390)]
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(times))))
+        self.rows = [(t, c, c * 1.001, c * 0.999, c, int(v))
+                     for t, c, v in zip(times, close, rng.integers(100, 10_000, len(times)))]
+        store_intraday_bars('TEST', 1, make_bars(self.rows))
+
+    def test_chunks_and_resampling(self):
+        self.assertEqual(IntradayBarChunk.objects.filter(symbol='TEST').count(), 3)
+        bars = load_intraday_bars('TEST')
+        self.assertEqual(len(bars), len(self.rows))
+
+        frame = pd.DataFrame([row[1:] for row in self.rows], columns=['open', 'high', 'low', 'close', 'volume'],
+                             index=pd.DatetimeIndex([row[0] for row in self.rows])).astype({'volume': 'int64'})
+        expected = frame.resample('15min').agg(
+            {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+        resampled = resample_bars(bars, '15min')
+        self.assertEqual(len(resampled), len(expected))
+        np.testing.assert_allclose(resampled['high'], expected['high'].values, rtol=1e-6)
+        np.testing.assert_array_equal(resampled['volume'], expected['volume'].values)
+        self.assertEqual(len(resample_bars(bars, '1d')), 3)
+        with self.assertRaises(ValidationError):
+            resample_bars(bars, '7min')
+
+    def test_reingesting_merges_days(self):
+        updated = [(self.rows[0][0], 1.0, 1.0, 1.0, 1.0, 5)]
+        store_intraday_bars('TEST', 1, make_bars(updated))
+        bars = load_intraday_bars('TEST', start_date=datetime.date(2024, 6, 24), end_date=datetime.date(2024, 6, 24))
+        self.assertEqual(len(bars), 390)
+        self.assertEqual(bars['close'][0], 1.0)
+
+    def test_backtest_on_resampled_bars(self):
+        with self.assertNumQueries(1):
+            result = backtest_strategy('TEST', 10000, 5, 20, bar_size='5min', equity_curve=True)
+        self.assertEqual(len(result['equity_curve']), 3 * 78)
+        self.assertIn('T', result['transaction_history'][0]['date'])
+
+        url = reverse('run_backtest')
+        data = {'symbol': 'TEST', 'initial_investment': 10000, 'buy_ma_window': 5, 'sell_ma_window': 20,
+                'bar_size': '5min'}
+        response = self.client.post(url, json.dumps(data), content_type='application/json',
+                                    HTTP_ACCEPT='application/x-msgpack')
+        self.assertEqual(response.status_code, 200)
+        history = msgpack.unpackb(response.content)['transaction_history']
+        self.assertEqual(history['dtypes']['date'], '<i8')
+        response = self.client.post(url, json.dumps({**data, 'bar_size': '5 minutes'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_intraday_endpoint(self):
+        url = reverse('get_intraday_bars')
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'bar_size': '1h', 'start_date': '2024-06-25'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        bars = json.loads(response.content)['bars']
+        self.assertEqual(bars['timestamp'][0], '2024-06-25T09:00:00')
+        self.assertEqual(len(bars['close']), 2 * 7)
+
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'bar_size': '30min'}),
+                                    content_type='application/json', HTTP_ACCEPT='application/x-msgpack')
+        columns = msgpack.unpackb(response.content)['bars']['columns']
+        self.assertEqual(len(np.frombuffer(columns['close'], dtype='<f4')), 3 * 13)
+        response = self.client.post(url, json.dumps({'symbol': 'MISSING'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @patch('financial_data.stock_data_fetcher.requests.get')
+    def test_fetch_intraday_data(self, mock_get):
+        mock_get.return_value.json.return_value = {'Time Series (5min)': {
+            '2024-07-01 09:35:00': {'1. open': '10', '2. high': '11', '3. low': '9', '4. close': '10.5', '5. volume': '100'},
+            '2024-07-01 09:30:00': {'1. open': '9', '2. high': '10', '3. low': '8', '4. close': '10', '5. volume': '200'},
+        }}
+        fetch_intraday_data('TEST', 5)
+        self.assertEqual(mock_get.call_args.kwargs['params']['interval'], '5min')
+        bars = load_intraday_bars('TEST', 5)
+        self.assertEqual(bars['close'].tolist(), [10.0, 10.5])
+
+
+class StartupTestCase(TestCase):
+    def test_views_import_defers_heavy_dependencies(self):
+        script = ("import sys, django; django.setup(); import financial_data.views; "
+                  "print(','.join(m for m in ('matplotlib', 'reportlab', 'PIL', 'joblib') if m in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(output.stdout.strip(), '')
+
+    def test_warm_caches_price_data(self):
+        cache.clear()
+        StockData.objects.create(symbol='WARM', date=datetime.date(2024, 1, 2), open_price=10, high_price=11,
+                                 low_price=9, close_price=10, volume=1000)
+        self.assertEqual(warm(['WARM', 'NONE']), ['WARM'])
+        with patch('financial_data.price_cache.StockData.objects.filter') as query:
+            days, closes = get_price_series('WARM')
+        query.assert_not_called()
+        self.assertEqual(list(closes), [10.0])
+
+
+class ReadReplicaRoutingTestCase(TransactionTestCase):
+    # TestCase would wrap every test in a transaction, which keeps all reads on the primary
+    def setUp(self):
+        replica = patch.dict(settings.DATABASES, {'replica': {**settings.DATABASES['default']}})
+        replica.start()
+        self.addCleanup(replica.stop)
+
+    def test_market_data_reads_use_replica_inside_context(self):
+        self.assertEqual(StockData.objects.all().db, 'default')
+        with replica_reads():
+            self.assertEqual(StockData.objects.all().db, 'replica')
+            self.assertEqual(IntradayBarChunk.objects.all().db, 'replica')
+        self.assertEqual(StockData.objects.all().db, 'default')
+
+    def test_writes_and_transactions_stay_on_primary(self):
+        with replica_reads():
+            self.assertEqual(StockData.objects.create(
+                symbol='TEST', date=datetime.date(2024, 1, 2), open_price=1, high_price=1, low_price=1,
+                close_price=1, volume=1)._state.db, 'default')
+            with transaction.atomic():
+                self.assertEqual(StockData.objects.all().db, 'default')
+
+    def test_without_replica_configured(self):
+        del settings.DATABASES['replica']
+        with replica_reads():
+            self.assertEqual(StockData.objects.all().db, 'default')
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class PriceCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_series.clear()
+        start = datetime.date(2020, 1, 1)
+        self.rows = [StockData(symbol='PACK', date=start + datetime.timedelta(days=i), open_price=100, high_price=101,
+                               low_price=99, close_price=f'{100 + (i % 37) * 0.25:.2f}', volume=1000)
+                     for i in range(500)]
+        StockData.objects.bulk_create(self.rows)
+
+    def test_pack_roundtrip_is_zero_copy(self):
+        days = np.arange(18000, 18010, dtype=np.int32)
+        closes = np.linspace(1.0, 2.0, 10)
+        buffer = pack_series(days, closes)
+        unpacked_days, unpacked_closes = unpack_series(buffer)
+        np.testing.assert_array_equal(unpacked_days, days)
+        np.testing.assert_array_equal(unpacked_closes, closes)
+        self.assertFalse(unpacked_closes.flags.owndata)
+        self.assertFalse(unpacked_closes.flags.writeable)
+
+        compressed_days, compressed_closes = unpack_series(pack_series(days, closes, compress=True))
+        np.testing.assert_array_equal(compressed_days, days)
+        np.testing.assert_array_equal(compressed_closes, closes)
+
+    def test_stock_data_frame_matches_database(self):
+        from .backtesting import get_stock_data
+
+        df = get_stock_data('PACK')
+        self.assertEqual(list(df['date']), [row.date for row in self.rows])
+        self.assertEqual(list(df['close_price']), [float(row.close_price) for row in self.rows])
+        self.assertIsInstance(df['date'][0], datetime.date)
+
+    def test_packed_entry_is_much_smaller_than_row_dicts(self):
+        get_price_series('PACK')
+        packed = next(value for key, value in cache._cache.items() if 'stock_data_PACK' in key)
+        rows = pickle.dumps(list(StockData.objects.filter(symbol='PACK').order_by('date').values('date', 'close_price')))
+        self.assertLess(len(packed), 12 * 500 + 100)  # 12 bytes per bar
+        self.assertLess(len(packed) * 2, len(rows))
+
+    def test_new_bars_invalidate_cached_series(self):
+        self.assertEqual(len(get_price_series('PACK')[1]), 500)
+        StockData.objects.create(symbol='PACK', date=datetime.date(2022, 1, 1), open_price=1, high_price=1,
+                                 low_price=1, close_price=1, volume=1)
+        self.assertEqual(len(get_price_series('PACK')[1]), 500)
+        bump_bars_version('PACK')
+        self.assertEqual(len(get_price_series('PACK')[1]), 501)
+
+    def test_lru_evicts_by_size(self):
+        lru = SeriesLRU(max_bytes=100)
+        lru.set('a', b'x' * 40)
+        lru.set('b', b'x' * 40)
+        lru.get('a')
+        lru.set('c', b'x' * 40)
+        self.assertIsNone(lru.get('b'))
+        self.assertIsNotNone(lru.get('a'))
+        self.assertEqual(lru.nbytes, 80)
+        lru.set('d', b'x' * 200)
+        self.assertIsNone(lru.get('d'))
+        self.assertEqual(len(lru), 2)
+
+
+class ScreenerTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.closes = {}
+        for i in range(6):
+            symbol = f'SCR{i}'
+            df = generate_ohlcv(symbol, 0.5 + 0.25 * i, seed=3, end_date=datetime.date(2024, 6, 28))
+            StockData.objects.bulk_create([StockData(symbol=symbol, **row) for row in df.to_dict('records')])
+            self.closes[symbol] = (df['close_price'].astype(float).values, df['date'].values)
+
+    def expected_matches(self, strategy, signal, trigger, lookback):
+        """Signals from the full history of each symbol, as the backtester computes them."""
+        matches = {}
+        for symbol, (close, dates) in self.closes.items():
+            buy, sell = strategy.signals(close, IndicatorCache(pd.Series(close)))
+            active = (buy if signal == 'buy' else sell) & (np.arange(len(close)) >= strategy.warm_up)
+            hits = active[-lookback:]
+            if trigger == 'cross':
+                hits = hits & ~active[-lookback - 1:-1]
+            if hits.any():
+                matches[symbol] = dates[len(close) - lookback + np.flatnonzero(hits)[-1]].isoformat()
+        return matches
+
+    def test_screen_matches_full_history_signals(self):
+        strategy = get_strategy('moving_average', {'buy_ma_window': 5, 'sell_ma_window': 20})
+        for signal in ('buy', 'sell'):
+            for trigger in ('level', 'cross'):
+                for lookback in (1, 10):
+                    results = screen(strategy, signal, trigger, lookback)
+                    self.assertEqual(results['symbols_screened'], 6)
+                    self.assertEqual({match['symbol']: match['signal_date'] for match in results['matches']},
+                                     self.expected_matches(strategy, signal, trigger, lookback))
+
+    def test_exponential_indicators_converge_on_truncated_history(self):
+        strategy = get_strategy('rsi', {'period': 5, 'oversold': 45, 'overbought': 55})
+        results = screen(strategy, 'buy', 'level', 30)
+        self.assertEqual({match['symbol'] for match in results['matches']},
+                         set(self.expected_matches(strategy, 'buy', 'level', 30)))
+
+    def test_screen_endpoint(self):
+        response = self.client.post(reverse('screen_symbols'), json.dumps({
+            'buy_ma_window': 5, 'sell_ma_window': 20, 'lookback': 5, 'symbols': ['SCR0', 'SCR1'],
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['symbols_screened'], 2)
+        self.assertEqual(data['strategy']['name'], 'moving_average')
+        for match in data['matches']:
+            self.assertEqual(match['date'], '2024-06-28')
+
+        response = self.client.post(reverse('screen_symbols'), json.dumps({
+            'strategy': 'ema_crossover', 'trigger': 'sideways',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        start = datetime.date(2024, 1, 1)
+        StockData.objects.bulk_create([
+            StockData(symbol=symbol, date=start + datetime.timedelta(days=i), open_price=10 + i, high_price=11 + i,
+                      low_price=9 + i, close_price=f'{10.25 + i:.2f}', volume=1000 + i)
+            for symbol in ('EXA', 'EXB', 'EXC') for i in range(30)
+        ])
+        # Prediction placeholder rows are not exported
+        StockData.objects.create(symbol='EXA', date=datetime.date(2024, 3, 1), open_price=0, high_price=0,
+                                 low_price=0, close_price=0, volume=0, predicted_price=50)
+
+    def test_csv_export_streams_in_chunks(self):
+        stats = ExportStats()
+        chunks = list(export_prices(['EXB', 'EXA'], export_format='csv', chunk_size=7, stats=stats))
+        self.assertEqual(len(chunks), 9)  # 60 rows in chunks of 7
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows[0], ['symbol', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'])
+        self.assertEqual(rows[1], ['EXA', '2024-01-01', '10.00', '11.00', '9.00', '10.25', '1000'])
+        self.assertEqual([row[0] for row in rows[1:]], ['EXA'] * 30 + ['EXB'] * 30)
+        self.assertEqual(stats.rows, 60)
+        self.assertEqual(stats.bytes, sum(len(chunk) for chunk in chunks))
+        self.assertGreater(stats.as_dict()['rows_per_second'], 0)
+
+    def test_export_endpoint(self):
+        response = self.client.post(reverse('export_stock_data'), json.dumps({
+            'symbols': ['EXC'], 'start_date': '2024-01-10', 'end_date': '2024-01-19',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row[1] for row in rows[1:]], [f'2024-01-{day}' for day in range(10, 20)])
+
+        response = self.client.post(reverse('export_stock_data'), json.dumps({'symbols': ['NONE']}),
+                                    content_type='application/json')
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 1)
+
+    def test_arrow_export(self):
+        import pyarrow as pa
+
+        data = b''.join(export_prices(['EXA', 'EXB'], export_format='arrow', chunk_size=25))
+        table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+        self.assertEqual(table.num_rows, 60)
+        self.assertEqual(table.column('close_price')[0].as_py(), 10.25)
+        self.assertEqual(table.column('date')[0].as_py(), datetime.date(2024, 1, 1))
+
+    def test_export_validation(self):
+        for body in ({}, {'symbols': []}, {'symbols': ['EXA'], 'format': 'xml'},
+                     {'symbols': ['EXA'], 'start_date': '2024-02-01', 'end_date': '2024-01-01'}):
+            response = self.client.post(reverse('export_stock_data'), json.dumps(body),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        with patch.dict(sys.modules, {'pyarrow': None}):
+            response = self.client.post(reverse('export_stock_data'), json.dumps({'symbols': ['EXA'], 'format': 'arrow'}),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pyarrow', response.json()['error'])
+
+    def test_export_prices_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'prices.csv')
+            stderr = io.StringIO()
+            call_command('export_prices', 'exa', 'EXC', '--start', '2024-01-30', '--output', path, stderr=stderr)
+            with open(path) as f:
+                rows = list(csv.reader(f))
+        self.assertEqual([(row[0], row[1]) for row in rows[1:]], [('EXA', '2024-01-30'), ('EXC', '2024-01-30')])
+        self.assertEqual(json.loads(stderr.getvalue())['rows'], 2)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class ForecastBandsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(BASE_DIR=self.tmp.name)
+        self.settings_override.enable()
+        df = generate_ohlcv('TEST', 1, seed=11, end_date=datetime.date.today())
+        StockData.objects.bulk_create([StockData(symbol='TEST', **row) for row in df.to_dict('records')])
+        train_symbols(['TEST'])
+        self.rows = StockData.objects.count()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def test_bands_match_looped_simulation(self):
+        predictor = StockPredictor('TEST', persist=False)
+        bands = predictor.predict_bands(horizon=20, lookback_days=90, paths=500, seed=3)
+        point = predictor.predict(horizon=20, lookback_days=90)
+        np.testing.assert_allclose([b['predicted_price'] for b in bands], [p['predicted_price'] for p in point],
+                                   atol=0.011)
+
+        # The same draws pushed through the step-by-step recursion
+        features = predictor._get_feature_matrix(90)
+        residuals = features['close'][:-1] - predictor.model.predict(features['scaled'][1:])
+        shocks = np.random.default_rng(3).choice(residuals, size=(500, 20))
+        a, c = predictor._step_coefficients(features['volume'][0])
+        paths = np.empty((500, 20))
+        paths[:, 0] = predictor.model.predict(features['scaled'][:1])[0] + shocks[:, 0]
+        for k in range(1, 20):
+            paths[:, k] = a * paths[:, k - 1] + c + shocks[:, k]
+        expected = np.percentile(paths, [5, 25, 50, 75, 95], axis=0)
+        for i, key in enumerate(['p5', 'p25', 'p50', 'p75', 'p95']):
+            np.testing.assert_allclose([b[key] for b in bands], expected[i], atol=0.006)
+
+        for b in bands:
+            self.assertTrue(b['p5'] <= b['p25'] <= b['p50'] <= b['p75'] <= b['p95'])
+        self.assertGreater(bands[-1]['p95'] - bands[-1]['p5'], bands[0]['p95'] - bands[0]['p5'])
+
+    def test_bands_are_cached_per_model_version(self):
+        predictor = StockPredictor('TEST', persist=False)
+        bands = predictor.predict_bands(horizon=10, paths=100)
+        with self.assertNumQueries(0):
+            self.assertEqual(StockPredictor('TEST', persist=False).predict_bands(horizon=10, paths=100), bands)
+        train_symbols(['TEST'])
+        with patch.object(StockPredictor, '_step_coefficients', wraps=predictor._step_coefficients) as step:
+            StockPredictor('TEST', persist=False).predict_bands(horizon=10, paths=100)
+        step.assert_called_once()
+
+    def test_predict_endpoint_bands(self):
+        url = reverse('predict_stock_prices')
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'bands': True, 'paths': 200, 'horizon': 5}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        predictions = response.json()['predictions']
+        self.assertEqual(len(predictions), 5)
+        self.assertEqual(set(predictions[0]), {'date', 'predicted_price', 'p5', 'p25', 'p50', 'p75', 'p95'})
+        self.assertEqual(StockData.objects.count(), self.rows)
+
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'bands': True, 'paths': 200, 'horizon': 5}),
+                                    content_type='application/json', HTTP_ACCEPT='application/x-msgpack')
+        columns = msgpack.unpackb(response.content)['predictions']['columns']
+        np.testing.assert_array_equal(np.frombuffer(columns['p95'], dtype='<f8'), [p['p95'] for p in predictions])
+
+        response = self.client.post(url, json.dumps({'symbol': 'TEST', 'bands': True, 'paths': 10 ** 6}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RobustnessTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        df = generate_ohlcv('ROB', 2, seed=4, end_date=datetime.date(2024, 6, 28))
+        StockData.objects.bulk_create([StockData(symbol='ROB', **row) for row in df.to_dict('records')])
+        self.close = df['close_price'].astype(float).values
+        self.strategy = get_strategy('moving_average', {'buy_ma_window': 5, 'sell_ma_window': 20})
+
+    def assertMatchesBacktest(self, result, expected):
+        self.assertAlmostEqual(result[0], expected['total_return'], places=10)
+        self.assertAlmostEqual(result[1], expected['max_drawdown'], places=10)
+        self.assertEqual(result[2], expected['trades_executed'])
+
+    def test_actual_path_matches_backtest(self):
+        execution = ExecutionModel(commission=5, commission_rate=0.001, slippage_bps=10)
+        for strategy in (self.strategy, get_strategy('rsi'), get_strategy('bollinger')):
+            for model in (ExecutionModel(), execution, ExecutionModel(sizing='fractional', position_size=0.5)):
+                results = robustness_test('ROB', 10000, strategy, resamples=10, execution=model)
+                actual = results['actual']
+                expected = backtest_strategy('ROB', 10000, strategy=strategy, execution=model)
+                self.assertMatchesBacktest(
+                    (actual['total_return'], actual['max_drawdown'], actual['trades_executed']), expected)
+
+    def test_batched_engine_matches_single_path_runs(self):
+        prices = resample_prices(self.close, 5, 'block', 10, np.random.default_rng(1))
+        self.assertEqual(prices.shape, (len(self.close), 5))
+        self.assertTrue(np.allclose(prices[0], self.close[0]))
+        execution = ExecutionModel(commission=5, slippage_bps=10)
+        returns, drawdowns, trades = batched_backtest(prices, 10000, self.strategy, execution)
+        for column in range(5):
+            single = batched_backtest(prices[:, [column]], 10000, self.strategy, execution)
+            self.assertEqual((returns[column], drawdowns[column], trades[column]),
+                             (single[0][0], single[1][0], single[2][0]))
+
+    def test_shuffle_keeps_total_return_of_prices(self):
+        prices = resample_prices(self.close, 20, 'shuffle', rng=np.random.default_rng(0))
+        self.assertTrue(np.allclose(prices[-1], self.close[-1]))
+
+    def test_results_do_not_depend_on_workers(self):
+        serial = robustness_test('ROB', 10000, self.strategy, resamples=600, seed=7)
+        parallel = robustness_test('ROB', 10000, self.strategy, resamples=600, seed=7, workers=2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(set(serial['total_return']), {'mean', 'std', 'p5', 'p25', 'p50', 'p75', 'p95'})
+        self.assertTrue(0 <= serial['probability_of_loss'] <= 1)
+        self.assertNotEqual(serial, robustness_test('ROB', 10000, self.strategy, resamples=600, seed=8))
+
+    def test_robustness_endpoint(self):
+        response = self.client.post(reverse('run_robustness_test'), json.dumps({
+            'symbol': 'ROB', 'initial_investment': 10000, 'buy_ma_window': 5, 'sell_ma_window': 20,
+            'method': 'shuffle', 'resamples': 50,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['resamples'], 50)
+        self.assertIsNone(data['block_size'])
+        self.assertEqual(data['strategy'], self.strategy.spec())
+
+        for body in ({'symbol': 'ROB', 'initial_investment': 10000, 'method': 'jackknife'},
+                     {'symbol': 'ROB', 'initial_investment': 10000, 'resamples': 0},
+                     {'symbol': 'ROB', 'initial_investment': 10000, 'strategy': ['rsi', 'bollinger']},
+                     {'symbol': 'ROB'}):
+            response = self.client.post(reverse('run_robustness_test'), json.dumps(body),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PREWARM_WORKERS=0, CACHES=IN_MEMORY_CACHES)
+class PostIngestTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(BASE_DIR=self.tmp.name)
+        self.settings_override.enable()
+        for symbol in ('ING', 'OTHER'):
+            df = generate_ohlcv(symbol, 1, seed=5, end_date=datetime.date.today())
+            StockData.objects.bulk_create([StockData(symbol=symbol, **row) for row in df.to_dict('records')])
+        train_symbols(['ING'])
+        self.options = {'equity_curve': False, 'max_points': None, 'rolling_window': 63,
+                        'execution': ExecutionModel(), 'bar_size': None, 'interval': 1}
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def backtest(self, symbol, buy_ma_window=5):
+        response = self.client.post(reverse('run_backtest'), json.dumps({
+            'symbol': symbol, 'initial_investment': 10000, 'buy_ma_window': buy_ma_window, 'sell_ma_window': 20,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_requests_are_ranked_per_kind(self):
+        for _ in range(3):
+            self.backtest('ING', 10)
+        self.backtest('ING', 5)
+        self.client.post(reverse('predict_stock_prices') + '?persist=false', json.dumps({'symbol': 'ING'}),
+                         content_type='application/json')
+        popular = popular_requests('ING', 1)
+        self.assertEqual([kind for kind, _ in popular], ['backtest', 'prediction'])
+        self.assertEqual(popular[0][1]['windows'], [10, 20])
+        self.assertEqual(popular[1][1], {'horizon': 30, 'lookback_days': 60})
+        self.assertEqual(popular_requests('OTHER', 1), [])
+
+    def test_concurrent_requests_keep_every_count(self):
+        def record(kind, params, times):
+            for _ in range(times):
+                record_request(kind, 'CNT', params)
+
+        threads = [threading.Thread(target=record, args=('prediction', {'horizon': 30}, 25)) for _ in range(8)]
+        threads.append(threading.Thread(target=record, args=('prediction', {'horizon': 10}, 150)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(popular_requests('CNT', 1), [('prediction', {'horizon': 30})])
+
+        with patch('financial_data.prewarm.MAX_TRACKED_REQUESTS', 2):
+            record_request('backtest', 'CNT', {'windows': [5, 20]})
+        self.assertEqual(popular_requests('CNT', 2), [('prediction', {'horizon': 30}), ('prediction', {'horizon': 10})])
+
+    def test_ingest_invalidates_and_prewarms_only_updated_symbols(self):
+        self.backtest('ING')
+        self.backtest('OTHER')
+        self.client.post(reverse('predict_stock_prices') + '?persist=false', json.dumps({'symbol': 'ING'}),
+                         content_type='application/json')
+        other_key = backtest_cache_key('OTHER', 10000.0, '5_20', self.options)
+        stale_key = backtest_cache_key('ING', 10000.0, '5_20', self.options)
+
+        last = StockData.objects.filter(symbol='ING').latest('date')
+        StockData.objects.filter(pk=last.pk).update(close_price=last.close_price * 2)
+        bars_ingested(['ING'])
+
+        self.assertEqual(backtest_cache_key('OTHER', 10000.0, '5_20', self.options), other_key)
+        fresh_key = backtest_cache_key('ING', 10000.0, '5_20', self.options)
+        self.assertNotEqual(fresh_key, stale_key)
+        self.assertEqual(cache.get(fresh_key), backtest_strategy('ING', 10000.0, 5, 20))
+        self.assertNotEqual(cache.get(fresh_key), cache.get(stale_key))
+        self.assertEqual(len(cache.get(prediction_cache_key('ING', 30, 60))), 30)
+
+        # The pre-warmed entry serves the next request without touching the database
+        with self.assertNumQueries(0):
+            self.backtest('ING')
+
+    def test_retraining_invalidates_forecasts_and_reports(self):
+        url = reverse('predict_stock_prices')
+        self.client.post(url, json.dumps({'symbol': 'ING'}), content_type='application/json')
+        prediction_key = prediction_cache_key('ING', 30, 60)
+        report_key = report_cache_key('ING', datetime.date(2024, 1, 1), datetime.date(2024, 6, 28), 10000.0, 5, 20)
+        self.assertIsNotNone(cache.get(prediction_key))
+
+        train_symbols(['ING'])
+        self.assertNotEqual(prediction_cache_key('ING', 30, 60), prediction_key)
+        self.assertNotEqual(report_cache_key('ING', datetime.date(2024, 1, 1), datetime.date(2024, 6, 28),
+                                             10000.0, 5, 20), report_key)
+        # The new model's forecast is written, not skipped as already persisted
+        with patch('financial_data.ml_integration.save_predictions') as mock_save:
+            self.client.post(url, json.dumps({'symbol': 'ING'}), content_type='application/json')
+        self.assertTrue(mock_save.called)
+
+    @override_settings(PREWARM_WORKERS=2)
+    def test_prewarm_runs_in_worker_threads(self):
+        self.backtest('ING')
+        self.backtest('ING', 10)
+        threads = []
+        with patch.dict(WARMERS, {'backtest': lambda symbol, params: threads.append(threading.current_thread())}):
+            futures = bars_ingested(['ING'])
+            for future in futures:
+                future.result()
+        self.assertEqual(len(futures), 2)
+        self.assertTrue(all(thread.name.startswith('prewarm') for thread in threads))
+
+    @patch('financial_data.stock_data_fetcher.requests.get')
+    def test_fetch_stock_data_runs_ingest_hooks(self, mock_get):
+        self.backtest('ING')
+        today = datetime.date.today()
+        mock_get.return_value.json.return_value = {'Time Series (Daily)': {
+            today.isoformat(): {'1. open': '10', '2. high': '11', '3. low': '9', '4. close': '10.5', '5. volume': '100'},
+        }}
+        stale_key = backtest_cache_key('ING', 10000.0, '5_20', self.options)
+        fetch_stock_data('ING', today - datetime.timedelta(days=5), today)
+        fresh_key = backtest_cache_key('ING', 10000.0, '5_20', self.options)
+        self.assertNotEqual(fresh_key, stale_key)
+        self.assertEqual(cache.get(fresh_key), backtest_strategy('ING', 10000.0, 5, 20))
+
+
+class AdmissionControlTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def wait_until(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.005)
+
+    def test_gate_queues_then_rejects(self):
+        gate = AdmissionGate('test', 1, 1)
+        first = gate.acquire(timeout=1)
+        self.assertIsNotNone(first)
+
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(gate.acquire(timeout=5)))
+        waiter.start()
+        self.wait_until(lambda: gate.waiting == 1)
+        # Queue full: rejected without waiting
+        self.assertIsNone(gate.acquire(timeout=5))
+
+        gate.release(first)
+        waiter.join()
+        self.assertIsNotNone(results[0])
+        self.assertEqual((gate.in_flight, gate.waiting), (1, 0))
+        gate.release(results[0])
+        self.assertEqual(gate.in_flight, 0)
+
+    def test_gate_wait_times_out(self):
+        gate = AdmissionGate('test', 1, 1)
+        admitted = gate.acquire(timeout=1)
+        self.assertIsNone(gate.acquire(timeout=0.01))
+        self.assertEqual((gate.in_flight, gate.waiting), (1, 0))
+        self.assertGreaterEqual(gate.retry_after(), 1)
+        gate.release(admitted)
+
+    @override_settings(ADMISSION_LIMITS={'get_report': (1, 0)})
+    @patch('financial_data.views.generate_report', return_value=({'symbol': 'TEST'}, None))
+    def test_saturated_endpoint_rejects_without_blocking_others(self, mock_generate_report):
+        body = json.dumps({'symbol': 'TEST', 'start_date': '2023-01-01', 'end_date': '2023-01-31',
+                           'initial_investment': 10000, 'buy_ma_window': 5, 'sell_ma_window': 10})
+        gate = get_gate('get_report', 1, 0)
+        rejected = ADMISSION_REJECTED.value(view='get_report', reason='queue_full')
+        admitted = gate.acquire(timeout=1)
+
+        response = self.client.post(reverse('get_report'), body, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(ADMISSION_REJECTED.value(view='get_report', reason='queue_full'), rejected + 1)
+        mock_generate_report.assert_not_called()
+
+        # Endpoints without a limit are unaffected
+        response = self.client.post(reverse('run_backtest'), 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        gate.release(admitted)
+        response = self.client.post(reverse('get_report'), body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(gate.in_flight, 0)
+        self.assertIn('financial_data_admission_in_flight{view="get_report"} 0',
+                      self.client.get(reverse('metrics')).content.decode())
+
+    @override_settings(GUNICORN_THREADS=4, ADMISSION_THREAD_BUDGET=3, ADMISSION_LIMITS={'get_report': (4, 4)},
+                       CACHES=IN_MEMORY_CACHES)
+    def test_saturated_endpoint_leaves_a_thread_for_ungated_requests(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def slow_report(*args):
+            started.release()
+            release.wait(10)
+            return {'symbol': 'TEST'}, None
+
+        body = json.dumps({'symbol': 'TEST', 'start_date': '2023-01-01', 'end_date': '2023-01-31',
+                           'initial_investment': 10000, 'buy_ma_window': 5, 'sell_ma_window': 10})
+
+        def post_report():
+            return Client().post(reverse('get_report'), body, content_type='application/json').status_code
+
+        # One pool thread per gunicorn thread of a worker
+        with patch('financial_data.views.generate_report', side_effect=slow_report), \
+                ThreadPoolExecutor(max_workers=settings.GUNICORN_THREADS) as pool:
+            reports = [pool.submit(post_report) for _ in range(settings.GUNICORN_THREADS)]
+            for _ in range(3):
+                self.assertTrue(started.acquire(timeout=5))
+            # Even with a generous per-endpoint limit, the budget turns the fourth report away
+            # and the freed thread serves an ungated request while the reports are still running
+            ungated = pool.submit(lambda: Client().get(reverse('metrics')).status_code)
+            self.assertEqual(ungated.result(timeout=5), 200)
+            self.assertFalse(release.is_set())
+            release.set()
+            statuses = sorted(future.result(timeout=10) for future in reports)
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    @override_settings(GUNICORN_THREADS=4, ADMISSION_THREAD_BUDGET=4)
+    def test_budget_must_leave_a_thread_free(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from .middleware import AdmissionControlMiddleware
+
+        with self.assertRaises(ImproperlyConfigured):
+            AdmissionControlMiddleware(lambda request: None)
+
+    @override_settings(ADMISSION_LIMITS={'export_stock_data': (1, 0)})
+    def test_streamed_response_holds_slot_until_sent(self):
+        StockData.objects.create(symbol='EXP', date=datetime.date(2024, 1, 2), open_price=1, high_price=1,
+                                 low_price=1, close_price=1, volume=1)
+        response = self.client.post(reverse('export_stock_data'), json.dumps({'symbols': ['EXP']}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        gate = get_gate('export_stock_data', 1, 0)
+        self.assertEqual(gate.in_flight, 1)
+        b''.join(response.streaming_content)
+        self.assertEqual(gate.in_flight, 0)
+
+
+@override_settings(PREWARM_WORKERS=0)
+@override_settings(PREWARM_WORKERS=0,
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                       'LOCATION': 'test_shared_cache'}})
+class SharedCacheTestCase(TestCase):
+    def setUp(self):
+        # Stands in for Redis: a backend storing entries outside the process
+        call_command('createcachetable', verbosity=0)
+
+    def test_ingest_state_is_shared_between_processes(self):
+        # Each web worker and management command opens its own cache connection;
+        # only what the backend stores outside the process is shared between them
+        worker = caches.create_connection('default')
+        self.assertNotIsInstance(worker, LocMemCache)
+
+        with patch('financial_data.prewarm.cache', worker):
+            record_request('prediction', 'SHR', {'horizon': 30, 'lookback_days': 60})
+            record_request('prediction', 'SHR', {'horizon': 30, 'lookback_days': 60})
+        record_request('prediction', 'SHR', {'horizon': 10, 'lookback_days': 60})
+        self.assertEqual(popular_requests('SHR', 1), [('prediction', {'horizon': 30, 'lookback_days': 60})])
+
+        seen = worker.get_or_set('bars_version_SHR', 1, timeout=None)
+        self.assertEqual(bars_version('SHR'), seen)
+        bars_ingested(['SHR'])
+        self.assertNotEqual(worker.get('bars_version_SHR'), seen)
 
 
 class ReportGenerationTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.report_url = reverse('get_report')
 
@@ -179,6 +1625,23 @@ class ReportGenerationTestCase(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertTrue('Missing required parameter' in json.loads(response.content)['error'])
 
+    def test_plots_rendered_concurrently_match_serial_renders(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from types import SimpleNamespace
+        from .report_generator import _plot_prices
+
+        bars = {}
+        for i, symbol in enumerate(('PLTA', 'PLTB')):
+            df = generate_ohlcv(symbol, 0.25, seed=i, end_date=datetime.date(2024, 6, 28))
+            bars[symbol] = [SimpleNamespace(date=row['date'], close_price=row['close_price'], predicted_price=None)
+                            for row in df.to_dict('records')]
+        expected = {symbol: _plot_prices(symbol, rows).getvalue() for symbol, rows in bars.items()}
+
+        symbols = ['PLTA', 'PLTB'] * 4
+        with ThreadPoolExecutor(max_workers=len(symbols)) as pool:
+            rendered = list(pool.map(lambda symbol: _plot_prices(symbol, bars[symbol]).getvalue(), symbols))
+        self.assertEqual(rendered, [expected[symbol] for symbol in symbols])
+
     @patch('financial_data.views.generate_report')
     def test_get_report_server_error(self, mock_generate_report):
         mock_generate_report.side_effect = Exception('Test error')
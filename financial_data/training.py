@@ -0,0 +1,189 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, FloatField, Sum
+from django.db.models.functions import Cast
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import MinMaxScaler
+
+from .models import StockData
+from .model_store import LAYOUT, get_model_store, pack_row
+from .export import iter_row_chunks
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+TARGET = 'close_price'
+# Bars held in memory at a time while accumulating training statistics
+TRAINING_CHUNK_SIZE = 20000
+
+
+class TrainingStats:
+    """
+    Sufficient statistics of the least-squares problem behind the linear model.
+
+    Keeping Z'Z and Z'y (Z being the features with an intercept column) plus the
+    feature ranges lets the model be refit exactly from only the bars added since
+    the last training run.
+    """
+
+    def __init__(self, ztz=None, zty=None, n=0, data_min=None, data_max=None, last_date=None):
+        size = len(FEATURES) + 1
+        self.ztz = np.zeros((size, size)) if ztz is None else ztz
+        self.zty = np.zeros(size) if zty is None else zty
+        self.n = int(n)
+        self.data_min = np.full(len(FEATURES), np.inf) if data_min is None else data_min
+        self.data_max = np.full(len(FEATURES), -np.inf) if data_max is None else data_max
+        self.last_date = last_date
+
+    def update(self, X, y, last_date):
+        if len(X) == 0:
+            return
+        Z = np.column_stack([np.ones(len(X)), X])
+        self.ztz += Z.T @ Z
+        self.zty += Z.T @ y
+        self.n += len(X)
+        self.data_min = np.minimum(self.data_min, X.min(axis=0))
+        self.data_max = np.maximum(self.data_max, X.max(axis=0))
+        self.last_date = max(self.last_date, last_date) if self.last_date else last_date
+
+    def fit(self):
+        """Solve for the same (scaler, model) pair MinMaxScaler + LinearRegression would produce."""
+        data_range = self.data_max - self.data_min
+        data_range[data_range == 0.0] = 1.0  # MinMaxScaler's handling of constant features
+
+        # Map [1, x] onto [1, x_scaled] so the system is solved in the well-conditioned scaled space
+        transform = np.eye(len(FEATURES) + 1)
+        transform[0, 1:] = -self.data_min / data_range
+        transform[1:, 1:] = np.diag(1.0 / data_range)
+        beta = np.linalg.lstsq(transform.T @ self.ztz @ transform, transform.T @ self.zty, rcond=None)[0]
+
+        scaler = MinMaxScaler()
+        scaler.fit(np.vstack([self.data_min, self.data_max]))
+        scaler.n_samples_seen_ = self.n
+
+        model = LinearRegression()
+        model.coef_ = beta[1:]
+        model.intercept_ = float(beta[0])
+        model.n_features_in_ = len(FEATURES)
+        return model, scaler
+
+    def to_row(self):
+        model, scaler = self.fit()
+        row = pack_row(model, scaler)
+        row[LAYOUT['ztz']] = self.ztz.ravel()
+        row[LAYOUT['zty']] = self.zty
+        row[LAYOUT['n']] = self.n
+        row[LAYOUT['data_min']] = self.data_min
+        row[LAYOUT['data_max']] = self.data_max
+        row[LAYOUT['last_date']] = self.last_date.toordinal()
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        """Statistics stored with a model, or None for models packed without them."""
+        n = int(row[LAYOUT['n']][0])
+        if n == 0:
+            return None
+        size = len(FEATURES) + 1
+        return cls(np.array(row[LAYOUT['ztz']]).reshape(size, size), np.array(row[LAYOUT['zty']]), n,
+                   np.array(row[LAYOUT['data_min']]), np.array(row[LAYOUT['data_max']]),
+                   date.fromordinal(int(row[LAYOUT['last_date']][0])))
+
+
+def iter_training_chunks(symbol, since=None, chunk_size=TRAINING_CHUNK_SIZE):
+    """
+    Yield (X, y, last_date) for consecutive chunks of at most chunk_size bars, oldest first.
+
+    Only the feature columns are fetched, cast to float in the query, through a
+    chunked cursor, so memory stays bounded however long the history is.
+    """
+    data = StockData.objects.filter(symbol=symbol, close_price__gt=0)  # skip prediction placeholder rows
+    if since is not None:
+        data = data.filter(date__gt=since)
+    rows = data.order_by('date').values_list('date', *[Cast(name, FloatField()) for name in FEATURES])
+    for chunk in iter_row_chunks(rows, chunk_size):
+        X = np.array([row[1:] for row in chunk], dtype=np.float64)
+        yield X, X[:, FEATURES.index(TARGET)].copy(), chunk[-1][0]
+
+
+def trained_bars_changed(symbol, stats):
+    """
+    Whether the bars up to stats.last_date differ from the ones the statistics were accumulated from.
+
+    An incremental update only folds in newer bars, so corrections to older ones (which the fetch
+    upsert writes) would otherwise never reach the model. The bar count and per-feature sums, the
+    intercept row of Z'Z, are compared against a single aggregate query.
+    """
+    totals = StockData.objects.filter(symbol=symbol, close_price__gt=0, date__lte=stats.last_date).aggregate(
+        bars=Count('pk'), **{name: Sum(Cast(name, FloatField())) for name in FEATURES})
+    sums = np.array([totals[name] or 0.0 for name in FEATURES])
+    return totals['bars'] != stats.n or not np.allclose(sums, stats.ztz[0, 1:], rtol=1e-9, atol=0)
+
+
+def train_symbol(symbol, incremental=False, chunk_size=TRAINING_CHUNK_SIZE):
+    """
+    Train (or with incremental=True, update) the model for one symbol.
+
+    Returns a status dict; trained models are returned as a packed store row
+    under 'row' rather than written, so parallel workers never race on the store.
+    """
+    try:
+        stats, status = None, 'trained'
+        if incremental:
+            row = get_model_store().row(symbol)
+            stats = TrainingStats.from_row(row) if row is not None else None
+            if stats is not None and trained_bars_changed(symbol, stats):
+                logger.warning(f"Bars already trained on for {symbol} have changed; retraining from scratch")
+                stats, status = None, 'retrained'
+
+        if stats is not None:
+            since, status = stats.last_date, 'updated'
+        else:
+            since = None
+            stats = TrainingStats()
+
+        # The sufficient statistics are sums over bars, so they are accumulated chunk by chunk
+        rows = 0
+        for X, y, last_date in iter_training_chunks(symbol, since, chunk_size):
+            stats.update(X, y, last_date)
+            rows += len(X)
+
+        if rows == 0:
+            return {'symbol': symbol, 'status': 'up_to_date' if since is not None else 'no_data', 'rows': 0}
+        return {'symbol': symbol, 'status': status, 'rows': rows, 'row': stats.to_row()}
+    except Exception as e:
+        logger.error(f"Error during training for {symbol}: {str(e)}")
+        return {'symbol': symbol, 'status': 'error', 'rows': 0, 'error': str(e)}
+
+
+def _train_symbol_args(args):
+    return train_symbol(*args)
+
+
+def train_symbols(symbols, incremental=False, workers=1, chunk_size=TRAINING_CHUNK_SIZE):
+    """Train many symbols, fanning out over a pool of forked worker processes when workers > 1."""
+    if workers <= 1 or len(symbols) <= 1:
+        results = [train_symbol(symbol, incremental, chunk_size) for symbol in symbols]
+    else:
+        # Forked children must not share the parent's database sockets
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        chunksize = max(1, len(symbols) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(_train_symbol_args, [(symbol, incremental, chunk_size) for symbol in symbols],
+                                    chunksize=chunksize))
+
+    trained = {result['symbol']: result.pop('row') for result in results if 'row' in result}
+    get_model_store().write(trained)
+    cache.delete_many([f'ml_model_{symbol}' for symbol in trained])
+    return results
+
+
+def all_symbols():
+    return list(StockData.objects.values_list('symbol', flat=True).distinct().order_by('symbol'))
@@ -1,8 +1,14 @@
 from django.urls import path
-from .views import run_backtest, predict_stock_prices, get_report
+from .views import run_backtest, run_portfolio_backtest, run_robustness_test, screen_symbols, export_stock_data, get_intraday_bars, predict_stock_prices, get_report, evaluate_model
 
 urlpatterns = [
     path('backtest/', run_backtest, name='run_backtest'),
+    path('backtest/portfolio/', run_portfolio_backtest, name='run_portfolio_backtest'),
+    path('backtest/robustness/', run_robustness_test, name='run_robustness_test'),
+    path('screen/', screen_symbols, name='screen_symbols'),
+    path('export/', export_stock_data, name='export_stock_data'),
+    path('intraday/', get_intraday_bars, name='get_intraday_bars'),
     path('predict/', predict_stock_prices, name='predict_stock_prices'),
     path('report/', get_report, name='get_report'),
+    path('evaluate/', evaluate_model, name='evaluate_model'),
 ]
\ No newline at end of file
@@ -1,46 +1,239 @@
 import traceback
 
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 from django.conf import settings
+import hashlib
 import json
 import io
-from reportlab.pdfgen import canvas
 
-from .backtesting import backtest_strategy
-from .ml_integration import StockPredictor
+from .backtesting import backtest_strategy, backtest_strategies
+from .strategies import parse_strategy
+from .execution import parse_execution
+from .intraday import intraday_version_key, parse_bar_size, load_intraday_bars, resample_bars
+from .portfolio import portfolio_backtest
+from .screener import screen
+from .robustness import DEFAULT_RESAMPLES, DEFAULT_BLOCK_SIZE, robustness_test
+from .export import EXPORT_CONTENT_TYPES, export_prices
+from .db_router import replica_reads
+from .ml_integration import StockPredictor, save_predictions, DEFAULT_HORIZON, DEFAULT_LOOKBACK_DAYS, DEFAULT_PATHS
 from django.core.cache import cache
 import logging
 from datetime import datetime
-from .report_generator import generate_report, generate_pdf_report
+from .streaming import split_backtest_results, iter_ndjson, iter_json
+from .encoding import CONTENT_TYPES, negotiate_format, encode_backtest, encode_predictions, encode_bars
+from .instrumentation import record_cache, render_metrics
+from .evaluation import walk_forward_evaluate
+from .cache_utils import bars_version
+from .prewarm import backtest_cache_key, prediction_cache_key, report_cache_key, record_request
+from .equity import DEFAULT_ROLLING_WINDOW
 
 logger = logging.getLogger(__name__)
 
+STREAM_FORMATS = ('ndjson', 'json')
+
+
+def _parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def _parse_page(data):
+    try:
+        offset = int(data.get('offset', 0))
+        limit = data.get('limit')
+        limit = int(limit) if limit is not None else None
+    except (TypeError, ValueError):
+        raise ValidationError("Offset and limit must be integers")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValidationError("Offset and limit must be non-negative")
+    return offset, limit
+
+
+def _parse_curve_options(data):
+    try:
+        max_points = data.get('max_points')
+        max_points = int(max_points) if max_points is not None else None
+        rolling_window = int(data.get('rolling_window', DEFAULT_ROLLING_WINDOW))
+    except (TypeError, ValueError):
+        raise ValidationError("Max points and rolling window must be integers")
+    return max_points, rolling_window
+
+
+def _encoded_response(body, response_format):
+    response = HttpResponse(body, content_type=CONTENT_TYPES[response_format])
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def _parse_strategies(value, data):
+    """Strategies named by a request's "strategy" field: one name/object or a list of them."""
+    # Top-level MA windows fill in the moving_average strategy's parameters
+    defaults = {}
+    try:
+        for key in ('buy_ma_window', 'sell_ma_window'):
+            if data.get(key) is not None:
+                defaults[key] = int(data[key])
+    except (TypeError, ValueError):
+        raise ValidationError("Moving average windows must be integers")
+
+    values = value if isinstance(value, list) else [value]
+    if not values:
+        raise ValidationError("At least one strategy is required")
+    return [parse_strategy(item, defaults) for item in values]
+
+
+def _parse_backtest_options(data):
+    """Keyword arguments for backtest_strategy / backtest_strategies shared by every strategy of a request."""
+    max_points, rolling_window = _parse_curve_options(data)
+    try:
+        interval = int(data.get('interval', 1))
+    except (TypeError, ValueError):
+        raise ValidationError("Interval must be an integer")
+    bar_size = data.get('bar_size')
+    if bar_size is not None:
+        parse_bar_size(bar_size)
+    return {
+        'equity_curve': _parse_bool(data.get('equity_curve', False)),
+        'max_points': max_points,
+        'rolling_window': rolling_window,
+        'execution': parse_execution(data),
+        'bar_size': bar_size,
+        'interval': interval,
+    }
+
+
+def _backtest_request_params(initial_investment, strategies, data, options):
+    """How a single-strategy daily backtest request is recorded for pre-warming."""
+    params = {
+        'initial_investment': initial_investment,
+        'equity_curve': options['equity_curve'],
+        'max_points': options['max_points'],
+        'rolling_window': options['rolling_window'],
+        'execution': options['execution'].spec(),
+    }
+    if strategies is None:
+        params['windows'] = [int(data['buy_ma_window']), int(data['sell_ma_window'])]
+    else:
+        params['strategy'] = strategies[0].spec()
+    return params
+
+
+def _run_strategy_comparison(request, symbol, initial_investment, strategies, summary_only, stream_format,
+                             offset, limit, options):
+    """Several strategies on one symbol, sharing the price fetch and indicator computation."""
+    if stream_format or offset > 0 or limit is not None:
+        raise ValidationError("Streaming and pagination need a single strategy")
+
+    response_format = negotiate_format(request)
+    strategy_keys = '|'.join(strategy.cache_key() for strategy in strategies)
+    cache_key = backtest_cache_key(symbol, initial_investment, f'[{strategy_keys}]', options)
+    encoded_key = f'{cache_key}_{response_format}_{summary_only}'
+
+    body = cache.get(encoded_key)
+    record_cache('backtest_encoded', body is not None)
+    if body is None:
+        all_results = cache.get(cache_key)
+        record_cache('backtest', all_results is not None)
+        if all_results is None:
+            all_results = backtest_strategies(symbol, initial_investment, strategies, **options)
+            cache.set(cache_key, all_results, timeout=3600)  # Cache for 1 hour
+
+        entries = []
+        for strategy, results in zip(strategies, all_results):
+            if summary_only:
+                results = split_backtest_results(results)[0]
+            entries.append({'strategy': strategy.spec(), **results})
+        body = encode_backtest({'symbol': symbol, 'strategies': entries}, response_format)
+        cache.set(encoded_key, body, timeout=3600)
+    return _encoded_response(body, response_format)
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@replica_reads()
 def run_backtest(request):
     try:
         data = json.loads(request.body)
         symbol = data['symbol']
         initial_investment = float(data['initial_investment'])
-        buy_ma_window = int(data['buy_ma_window'])
-        sell_ma_window = int(data['sell_ma_window'])
+        summary_only = _parse_bool(data.get('summary_only', False))
+        stream_format = data.get('stream')
+        offset, limit = _parse_page(data)
+        options = _parse_backtest_options(data)
+
+        if stream_format is not None and stream_format not in STREAM_FORMATS:
+            raise ValidationError(f"Stream format must be one of: {', '.join(STREAM_FORMATS)}")
+
+        strategy_field = data.get('strategy')
+        if strategy_field is None:
+            buy_ma_window = int(data['buy_ma_window'])
+            sell_ma_window = int(data['sell_ma_window'])
+            strategies = None
+        else:
+            strategies = _parse_strategies(strategy_field, data)
 
         logger.info(f"Received backtest request for {symbol}")
 
-        cache_key = f'backtest_{symbol}_{initial_investment}_{buy_ma_window}_{sell_ma_window}'
+        if isinstance(strategy_field, list):
+            return _run_strategy_comparison(request, symbol, initial_investment, strategies, summary_only,
+                                            stream_format, offset, limit, options)
+
+        response_format = negotiate_format(request)
+        if strategies is None:
+            strategy_key = f'{buy_ma_window}_{sell_ma_window}'
+        else:
+            strategy_key = strategies[0].cache_key()
+        cache_key = backtest_cache_key(symbol, initial_investment, strategy_key, options)
+        if options['bar_size'] is None:
+            record_request('backtest', symbol, _backtest_request_params(initial_investment, strategies, data, options))
+        encoded_key = f'{cache_key}_{response_format}_{summary_only}_{offset}_{limit}'
+
+        if not stream_format:
+            body = cache.get(encoded_key)
+            record_cache('backtest_encoded', body is not None)
+            if body is not None:
+                logger.info(f"Cache hit for encoded backtest of {symbol}")
+                return _encoded_response(body, response_format)
+
         results = cache.get(cache_key)
+        record_cache('backtest', results is not None)
 
         if results is None:
-            results = backtest_strategy(symbol, initial_investment, buy_ma_window, sell_ma_window)
+            if strategies is None:
+                results = backtest_strategy(symbol, initial_investment, buy_ma_window, sell_ma_window, **options)
+            else:
+                results = backtest_strategy(symbol, initial_investment, strategy=strategies[0], **options)
             cache.set(cache_key, results, timeout=3600)  # Cache for 1 hour
         else:
             logger.info(f"Cache hit for backtest of {symbol}")
 
-        return JsonResponse(results)
+        paginated = offset > 0 or limit is not None
+        summary, transactions = split_backtest_results(results)
+
+        if summary_only:
+            payload = summary
+        elif paginated:
+            end = offset + limit if limit is not None else None
+            transactions = transactions[offset:end]
+            summary['offset'] = offset
+            summary['limit'] = limit
+            payload = {**summary, 'transaction_history': transactions}
+        else:
+            payload = results
+
+        if stream_format == 'ndjson' and not summary_only:
+            return StreamingHttpResponse(iter_ndjson(summary, transactions), content_type='application/x-ndjson')
+        if stream_format == 'json' and not summary_only:
+            return StreamingHttpResponse(iter_json(summary, transactions), content_type='application/json')
+
+        body = encode_backtest(payload, response_format)
+        cache.set(encoded_key, body, timeout=3600)
+        return _encoded_response(body, response_format)
     except KeyError as e:
         logger.error(f"Missing required parameter: {str(e)}")
         return JsonResponse({'error': f'Missing required parameter: {str(e)}'}, status=400)
@@ -60,6 +253,226 @@ def run_backtest(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@replica_reads()
+def run_portfolio_backtest(request):
+    try:
+        data = json.loads(request.body)
+        symbols = data['symbols']
+        initial_investment = float(data['initial_investment'])
+        max_points, rolling_window = _parse_curve_options(data)
+        execution = parse_execution(data)
+
+        if not isinstance(symbols, list):
+            raise ValidationError("Symbols must be a non-empty list")
+
+        strategy_field = data.get('strategy')
+        if strategy_field is None:
+            buy_ma_window = int(data['buy_ma_window'])
+            sell_ma_window = int(data['sell_ma_window'])
+            strategy = None
+            strategy_key = f'{buy_ma_window}_{sell_ma_window}'
+        elif isinstance(strategy_field, list):
+            raise ValidationError("A portfolio backtest runs a single strategy")
+        else:
+            buy_ma_window = sell_ma_window = None
+            strategy = _parse_strategies(strategy_field, data)[0]
+            strategy_key = strategy.cache_key()
+
+        logger.info(f"Received portfolio backtest request for {len(symbols)} symbols")
+
+        # Hashed, since a basket's symbols and bars versions would overrun memcached's 250-byte key limit
+        basket = json.dumps([[str(symbol), bars_version(symbol)] for symbol in symbols])
+        options = f'{initial_investment}_{strategy_key}_{max_points}_{rolling_window}_{execution.cache_key()}'
+        cache_key = f"portfolio_backtest_{hashlib.sha1(f'{basket}_{options}'.encode()).hexdigest()}"
+        results = cache.get(cache_key)
+        record_cache('portfolio_backtest', results is not None)
+
+        if results is None:
+            results = portfolio_backtest(symbols, initial_investment, buy_ma_window, sell_ma_window,
+                                         max_points, rolling_window, strategy, execution)
+            cache.set(cache_key, results, timeout=3600)  # Cache for 1 hour
+        else:
+            logger.info("Cache hit for portfolio backtest")
+
+        return JsonResponse(results)
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        return JsonResponse({'error': f'Missing required parameter: {str(e)}'}, status=400)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
+    except ValidationError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception("Unexpected error occurred during portfolio backtest")
+        if settings.DEBUG:
+            return JsonResponse({'error': str(e)}, status=500)
+        else:
+            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@replica_reads()
+def run_robustness_test(request):
+    try:
+        data = json.loads(request.body)
+        symbol = data['symbol']
+        initial_investment = float(data['initial_investment'])
+        strategy_field = data.get('strategy', 'moving_average')
+        if isinstance(strategy_field, list):
+            raise ValidationError("A robustness test evaluates a single strategy")
+        strategy = _parse_strategies(strategy_field, data)[0]
+        execution = parse_execution(data)
+        method = data.get('method', 'block')
+        try:
+            resamples = int(data.get('resamples', DEFAULT_RESAMPLES))
+            block_size = int(data.get('block_size', DEFAULT_BLOCK_SIZE))
+            seed = int(data.get('seed', 0))
+        except (TypeError, ValueError):
+            raise ValidationError("Resamples, block size and seed must be integers")
+
+        logger.info(f"Received robustness test request for {symbol}")
+
+        cache_key = (f'robustness_{symbol}_{initial_investment}_{strategy.cache_key()}_{method}_{resamples}_'
+                     f'{block_size}_{seed}_{execution.cache_key()}_{bars_version(symbol)}')
+        results = cache.get(cache_key)
+        record_cache('robustness', results is not None)
+
+        if results is None:
+            results = robustness_test(symbol, initial_investment, strategy, method, resamples, block_size, seed,
+                                      execution)
+            cache.set(cache_key, results, timeout=3600)  # Cache for 1 hour
+        else:
+            logger.info(f"Cache hit for robustness test of {symbol}")
+
+        return JsonResponse(results)
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        return JsonResponse({'error': f'Missing required parameter: {str(e)}'}, status=400)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
+    except ValidationError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception("Unexpected error occurred during robustness test")
+        if settings.DEBUG:
+            return JsonResponse({'error': str(e)}, status=500)
+        else:
+            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@replica_reads()
+def screen_symbols(request):
+    try:
+        data = json.loads(request.body)
+        strategy_field = data.get('strategy', 'moving_average')
+        if isinstance(strategy_field, list):
+            raise ValidationError("A screen evaluates a single strategy")
+        strategy = _parse_strategies(strategy_field, data)[0]
+        try:
+            lookback = int(data.get('lookback', 1))
+        except (TypeError, ValueError):
+            raise ValidationError("Lookback must be an integer")
+
+        logger.info(f"Received screen request for {strategy.name}")
+        results = screen(strategy, data.get('signal', 'buy'), data.get('trigger', 'level'), lookback,
+                         data.get('symbols'))
+        return JsonResponse(results)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
+    except ValidationError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception("Unexpected error occurred during screen")
+        if settings.DEBUG:
+            return JsonResponse({'error': str(e)}, status=500)
+        else:
+            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@replica_reads()
+def export_stock_data(request):
+    try:
+        data = json.loads(request.body)
+        symbols = data['symbols']
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date() if data.get('start_date') else None
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+        export_format = data.get('format', 'csv')
+
+        logger.info(f"Received export request for {len(symbols) if isinstance(symbols, list) else 0} symbols")
+        chunks = export_prices(symbols, start_date, end_date, export_format)
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[export_format])
+        extension = 'arrows' if export_format == 'arrow' else 'csv'
+        response['Content-Disposition'] = f'attachment; filename="prices.{extension}"'
+        return response
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        return JsonResponse({'error': f'Missing required parameter: {str(e)}'}, status=400)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
+    except (ValueError, ValidationError) as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception("Unexpected error occurred during export")
+        if settings.DEBUG:
+            return JsonResponse({'error': str(e)}, status=500)
+        else:
+            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@replica_reads()
+def get_intraday_bars(request):
+    try:
+        data = json.loads(request.body)
+        symbol = data['symbol']
+        bar_size = data.get('bar_size', '1min')
+        interval = int(data.get('interval', 1))
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date() if data.get('start_date') else None
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+
+        logger.info(f"Received intraday bars request for {symbol}")
+
+        parse_bar_size(bar_size)
+        bars = resample_bars(load_intraday_bars(symbol, interval, start_date, end_date), bar_size, interval)
+        response_format = negotiate_format(request)
+        return _encoded_response(encode_bars(symbol, bar_size, bars, response_format), response_format)
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        return JsonResponse({'error': f'Missing required parameter: {str(e)}'}, status=400)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
+    except ValueError as e:
+        logger.error(f"Invalid parameter: {str(e)}")
+        return JsonResponse({'error': f'Invalid parameter: {str(e)}'}, status=400)
+    except ValidationError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception("Unexpected error occurred while loading intraday bars")
+        if settings.DEBUG:
+            return JsonResponse({'error': str(e)}, status=500)
+        else:
+            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@replica_reads()
 def predict_stock_prices(request):
     try:
         data = json.loads(request.body)
@@ -68,30 +481,59 @@ def predict_stock_prices(request):
         if not symbol:
             return JsonResponse({'error': 'Symbol is required'}, status=400)
 
+        # ?persist=false (or "persist": false in the body) forecasts without writing to StockData
+        persist = _parse_bool(request.GET.get('persist', data.get('persist', True)))
+        try:
+            horizon = int(data.get('horizon', DEFAULT_HORIZON))
+            lookback_days = int(data.get('lookback_days', DEFAULT_LOOKBACK_DAYS))
+        except (TypeError, ValueError):
+            raise ValidationError("Horizon and lookback days must be integers")
+
         logger.info(f"Received prediction request for {symbol}")
 
-        cache_key = f'prediction_{symbol}'
+        response_format = negotiate_format(request)
+        if _parse_bool(data.get('bands', False)):
+            # Monte Carlo bands are cached by the predictor and never written to StockData
+            try:
+                paths = int(data.get('paths', DEFAULT_PATHS))
+                seed = int(data.get('seed', 0))
+            except (TypeError, ValueError):
+                raise ValidationError("Paths and seed must be integers")
+            predictions = StockPredictor(symbol, persist=False).predict_bands(horizon, lookback_days, paths, seed)
+            return _encoded_response(encode_predictions(symbol, predictions, response_format), response_format)
+
+        cache_key = prediction_cache_key(symbol, horizon, lookback_days)
+        record_request('prediction', symbol, {'horizon': horizon, 'lookback_days': lookback_days})
+        encoded_key = f'{cache_key}_{response_format}'
+        persisted_key = f'{cache_key}_persisted'
+
+        # A forecast cached by a read-only request still has to be written once for persisting requests
+        needs_write = persist and not cache.get(persisted_key)
+
+        body = cache.get(encoded_key)
+        record_cache('prediction_encoded', body is not None)
+        if body is not None and not needs_write:
+            logger.info(f"Cache hit for encoded prediction of {symbol}")
+            return _encoded_response(body, response_format)
+
         predictions = cache.get(cache_key)
+        record_cache('prediction', predictions is not None)
 
         if predictions is None:
-            predictor = StockPredictor(symbol)
-            predictions = predictor.predict_next_30_days()
+            predictor = StockPredictor(symbol, persist=persist)
+            predictions = predictor.predict(horizon, lookback_days)
             cache.set(cache_key, predictions, timeout=3600)  # Cache for 1 hour
         else:
             logger.info(f"Cache hit for prediction of {symbol}")
+            if needs_write:
+                save_predictions(symbol, predictions)
 
-        response_data = {
-            'symbol': symbol,
-            'predictions': [
-                {
-                    'date': pred['date'].isoformat(),
-                    'predicted_price': pred['predicted_price']
-                }
-                for pred in predictions
-            ]
-        }
+        if persist:
+            cache.set(persisted_key, True, timeout=3600)
 
-        return JsonResponse(response_data)
+        body = encode_predictions(symbol, predictions, response_format)
+        cache.set(encoded_key, body, timeout=3600)
+        return _encoded_response(body, response_format)
 
     except json.JSONDecodeError:
         logger.error("Invalid JSON in request body")
@@ -109,19 +551,108 @@ def predict_stock_prices(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@replica_reads()
+def evaluate_model(request):
+    try:
+        data = json.loads(request.body)
+        symbol = data['symbol']
+        try:
+            train_window = int(data.get('train_window', 252))
+            horizon = int(data.get('horizon', 30))
+            step = int(data.get('step', 1))
+        except (TypeError, ValueError):
+            raise ValidationError("Train window, horizon and step must be integers")
+
+        logger.info(f"Received model evaluation request for {symbol}")
+
+        cache_key = f'evaluation_{symbol}_{train_window}_{horizon}_{step}_{bars_version(symbol)}'
+        results = cache.get(cache_key)
+        record_cache('evaluation', results is not None)
+
+        if results is None:
+            results = walk_forward_evaluate(symbol, train_window, horizon, step)
+            cache.set(cache_key, results, timeout=3600)  # Cache for 1 hour
+        else:
+            logger.info(f"Cache hit for model evaluation of {symbol}")
+
+        return JsonResponse(results)
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        return JsonResponse({'error': f'Missing required parameter: {str(e)}'}, status=400)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
+    except ValidationError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.exception("Unexpected error occurred during model evaluation")
+        if settings.DEBUG:
+            return JsonResponse({'error': str(e)}, status=500)
+        else:
+            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
+
+
+# report_generator pulls in matplotlib, reportlab and PIL, so it is only imported
+# once a report is requested instead of by every process that loads the URLconf
+def generate_report(*args, **kwargs):
+    from . import report_generator
+    return report_generator.generate_report(*args, **kwargs)
+
+
+def generate_pdf_report(*args, **kwargs):
+    from . import report_generator
+    return report_generator.generate_pdf_report(*args, **kwargs)
+
+
+def _error_pdf(error_message):
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer)
+    y = 750
+    for line in error_message.split('\n'):
+        p.drawString(50, y, line)
+        y -= 15
+        if y < 50:
+            p.showPage()
+            y = 750
+    p.showPage()
+    p.save()
+    buffer.seek(0)
+    return HttpResponse(buffer.getvalue(), content_type='application/pdf')
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@replica_reads()
 def get_report(request):
+    symbol = None
+    report_format = 'json'
     try:
         data = json.loads(request.body)
+        report_format = data.get('format', 'json')
         symbol = data['symbol']
         start_date = datetime.strptime(data['start_date'], '%Y-%m-%d')
         end_date = datetime.strptime(data['end_date'], '%Y-%m-%d')
         initial_investment = float(data['initial_investment'])
         buy_ma_window = int(data['buy_ma_window'])
         sell_ma_window = int(data['sell_ma_window'])
-        report_format = data.get('format', 'json')
 
-        report_data, plot_buffer = generate_report(symbol, start_date, end_date, initial_investment, buy_ma_window,
-                                                   sell_ma_window)
+        record_request('report', symbol, {
+            'start_date': data['start_date'], 'end_date': data['end_date'],
+            'initial_investment': initial_investment,
+            'buy_ma_window': buy_ma_window, 'sell_ma_window': sell_ma_window,
+        })
+        cache_key = report_cache_key(symbol, start_date, end_date, initial_investment, buy_ma_window, sell_ma_window)
+        report = cache.get(cache_key)
+        record_cache('report', report is not None)
+        if report is None:
+            report = generate_report(symbol, start_date, end_date, initial_investment, buy_ma_window, sell_ma_window)
+            cache.set(cache_key, report, timeout=3600)  # Cache for 1 hour
+        else:
+            logger.info(f"Cache hit for report of {symbol}")
+        report_data, plot_buffer = report
 
         if report_format == 'pdf':
             pdf = generate_pdf_report(report_data, plot_buffer)
@@ -132,23 +663,24 @@ def get_report(request):
 
         return response
 
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        return JsonResponse({'error': f'Missing required parameter: {str(e)}'}, status=400)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request body")
+        return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
+    except (ValueError, ValidationError) as e:
+        logger.error(f"Invalid report request: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
-        logger.exception(f"Error during report generation for {symbol if 'symbol' in locals() else 'unknown symbol'}")
-        error_message = f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-
+        logger.exception(f"Error during report generation for {symbol or 'unknown symbol'}")
+        if not settings.DEBUG:
+            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
         if report_format == 'pdf':
-            buffer = io.BytesIO()
-            p = canvas.Canvas(buffer)
-            y = 750
-            for line in error_message.split('\n'):
-                p.drawString(50, y, line)
-                y -= 15
-                if y < 50:
-                    p.showPage()
-                    y = 750
-            p.showPage()
-            p.save()
-            buffer.seek(0)
-            return HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        else:
-            return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+            return _error_pdf(f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
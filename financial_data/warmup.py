@@ -0,0 +1,46 @@
+import importlib
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.urls import get_resolver
+
+from .backtesting import get_stock_data
+from .model_store import get_model_store
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the views that need them
+DEFERRED_MODULES = ['financial_data.report_generator']
+
+
+def warm(symbols=None):
+    """
+    Load what workers would otherwise load on their first requests: the URLconf and
+    views, the deferred report dependencies, the model store and cached price data.
+
+    Run in gunicorn's master with preload_app so forked workers share all of it
+    copy-on-write. Returns the symbols whose price data was cached.
+    """
+    get_resolver().url_patterns
+    for name in DEFERRED_MODULES:
+        importlib.import_module(name)
+
+    store = get_model_store()
+    if symbols is None:
+        symbols = list(settings.PRELOAD_SYMBOLS) or sorted(store.symbols)
+
+    warmed = []
+    for symbol in symbols:
+        try:
+            get_stock_data(symbol)
+        except ValidationError:
+            logger.warning(f"No price data to preload for {symbol}")
+            continue
+        warmed.append(symbol)
+
+    # Forked workers must not share the master's database sockets
+    connections.close_all()
+    logger.info(f"Warmed {len(store)} models and price data for {len(warmed)} symbols")
+    return warmed
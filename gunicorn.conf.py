@@ -0,0 +1,19 @@
+from decouple import config
+
+bind = config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = config('GUNICORN_WORKERS', default=2, cast=int)
+timeout = config('GUNICORN_TIMEOUT', default=120, cast=int)
+# Threads per worker (gthread); admission control keeps expensive endpoints from holding all of them
+threads = config('GUNICORN_THREADS', default=4, cast=int)
+
+# Load the app in the master and warm models and price data before forking, so
+# workers start ready and share that memory copy-on-write
+preload_app = config('GUNICORN_PRELOAD', default=False, cast=bool)
+
+
+def when_ready(server):
+    if preload_app:
+        from financial_data.warmup import warm
+
+        symbols = warm()
+        server.log.info(f"Preloaded price data for {len(symbols)} symbols")